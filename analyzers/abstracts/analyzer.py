@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Dict, Tuple
 
 
 class Analyzer(ABC):
@@ -12,6 +13,38 @@ class Analyzer(ABC):
         """
         pass
 
+    def analyze_content(self, content: Dict) -> Dict:
+        """
+        This function analyzes the content of a reader output. By default only the text of the content is analyzed.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        return self.analyze_invoice(content.get("text", ""))
+
+    async def analyze_content_async(self, content: Dict) -> Dict:
+        """
+        This function analyzes the content of a reader output without blocking the event loop.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.analyze_content, content)
+
+    async def analyze_invoice_async(self, invoice_text: str):
+        """
+        This function analyzes the text given to it without blocking the event loop.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.analyze_invoice, invoice_text)
+
+    def warm_up(self):
+        """
+        This function prepares the analyzer before the first invoice, e.g. loads its model. By default there is
+        nothing to prepare.
+        :return: None
+        """
+        pass
+
     @abstractmethod
     def validate_invoice_json(self, data) -> Tuple[bool, str]:
         """
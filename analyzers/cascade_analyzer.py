@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from analyzers.abstracts.analyzer import Analyzer
+from analyzers.invoice_analyzer import InvoiceAnalyzer
+from validators.invoice_validator import InvoiceValidator
+
+
+class CascadeInvoiceAnalyzer(Analyzer):
+    def __init__(self, tiers: List[Analyzer], min_price_accuracy: float | None = None):
+        """
+        Analyzes invoices with the cheapest tier first, e.g. a small model, and escalates an invoice to the next tier
+        only if its result is not valid JSON or fails the arithmetic checks of the validator (line totals, subtotal,
+        VAT). Clean invoices never reach the large models.
+        :param tiers: Analyzers in the order they are tried, from the cheapest to the most accurate
+        :param min_price_accuracy: (Optional) Results with a lower overall price accuracy are escalated, defaults to
+                                   the price accuracy threshold of the validator
+        """
+        if not tiers:
+            raise ValueError("Cascade analyzer needs at least one tier")
+        self.tiers = tiers
+        self.min_price_accuracy = min_price_accuracy
+        self.stats = [{"attempts": 0, "accepted": 0, "escalated": 0, "failed": 0, "latency": 0.0} for _ in tiers]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_models(cls, models: List[str], min_price_accuracy: float | None = None,
+                    **analyzer_kwargs) -> "CascadeInvoiceAnalyzer":
+        """
+        This function creates a cascade of LLM analyzers with the same settings and different models.
+        :param models: Models in the order they are tried, from the smallest to the largest
+        :param min_price_accuracy: (Optional) Results with a lower overall price accuracy are escalated
+        :param analyzer_kwargs: Parameters of the LLM analyzers, e.g. a shared backend and cache
+        :return: Cascade analyzer
+        """
+        return cls([InvoiceAnalyzer(model=model, **analyzer_kwargs) for model in models], min_price_accuracy)
+
+    def _tier_name(self, index: int) -> str:
+        """
+        This function returns the name of a tier for reports.
+        :param index: Index of the tier
+        :return: Model of the tier, or the class name of the analyzer
+        """
+        tier = self.tiers[index]
+        return getattr(tier, "model", None) or f"{index}:{type(tier).__name__}"
+
+    def check_result(self, result: Any) -> Tuple[bool, float]:
+        """
+        This function checks if the result of a tier can be accepted.
+        :param result: Analyzed JSON data
+        :return: If the result is accepted True, otherwise False, and the overall price accuracy of the result (-1 if
+                 the result is not valid JSON)
+        """
+        is_valid, _ = self.validate_invoice_json(result)
+        if not is_valid:
+            return False, -1.0
+
+        validator = InvoiceValidator(result)
+        price_accuracy = validator.calculate_price_accuracy()
+        min_price_accuracy = self.min_price_accuracy
+        if min_price_accuracy is None:
+            min_price_accuracy = validator.price_accuracy_threshold
+        return price_accuracy["overall_price_accuracy"] >= min_price_accuracy, price_accuracy["overall_price_accuracy"]
+
+    def _count(self, index: int, outcome: str, latency: float):
+        """
+        This function counts the outcome of a tier.
+        :param index: Index of the tier
+        :param outcome: accepted, escalated or failed
+        :param latency: Seconds of the analysis
+        :return: None
+        """
+        with self._lock:
+            self.stats[index]["attempts"] += 1
+            self.stats[index][outcome] += 1
+            self.stats[index]["latency"] += latency
+
+    async def _cascade(self, analyze: Callable[[Analyzer], Awaitable[Dict]]) -> Dict:
+        """
+        This function analyzes an invoice tier by tier until a result is accepted. If no result is accepted, the
+        valid result with the highest price accuracy is returned, later tiers win the ties.
+        :param analyze: Function that analyzes the invoice with a tier
+        :return: analyzed JSON data
+        """
+        best = None     # (price accuracy, result)
+        last_error = None
+        for index, tier in enumerate(self.tiers):
+            start = time.perf_counter()
+            # Checking an odd result may raise too, the invoice is escalated instead of aborting the cascade
+            try:
+                result = await analyze(tier)
+                is_accepted, price_accuracy = self.check_result(result)
+            except Exception as e:
+                self._count(index, "failed", time.perf_counter() - start)
+                print(f"Tier {self._tier_name(index)} failed, escalating: {e}")
+                last_error = e
+                continue
+
+            if is_accepted:
+                self._count(index, "accepted", time.perf_counter() - start)
+                return result
+
+            self._count(index, "escalated", time.perf_counter() - start)
+            if index < len(self.tiers) - 1:
+                print(f"Tier {self._tier_name(index)} result is not accepted (price accuracy: {price_accuracy}), "
+                      f"escalating to {self._tier_name(index + 1)}")
+            if best is None or price_accuracy >= best[0]:
+                best = (price_accuracy, result)
+
+        if best is None:
+            raise last_error
+        return best[1]
+
+    def analyze_invoice(self, invoice_text: str):
+        """
+        This function analyzes the text given to it with the cheapest tier that gives an accepted result.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data
+        """
+        return asyncio.run(self.analyze_invoice_async(invoice_text))
+
+    async def analyze_invoice_async(self, invoice_text: str):
+        """
+        This function is the asyncio version of analyze_invoice.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data
+        """
+        return await self._cascade(lambda tier: tier.analyze_invoice_async(invoice_text))
+
+    def analyze_content(self, content: Dict) -> Dict:
+        """
+        This function analyzes the content of a reader output with the cheapest tier that gives an accepted result.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        return asyncio.run(self.analyze_content_async(content))
+
+    async def analyze_content_async(self, content: Dict) -> Dict:
+        """
+        This function is the asyncio version of analyze_content.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        return await self._cascade(lambda tier: tier.analyze_content_async(content))
+
+    def validate_invoice_json(self, data) -> Tuple[bool, str]:
+        """
+        This function checks the data given to it like the last tier does.
+        :param data: data to validate
+        :return: validation result (bool), description
+        """
+        return self.tiers[-1].validate_invoice_json(data)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        This function returns the outcomes of each tier.
+        :return: Attempts, accepted/escalated/failed counts, hit rate (accepted / attempts) and average latency of each
+                 tier by its name
+        """
+        with self._lock:
+            return {self._tier_name(index): {**stats, "latency": round(stats["latency"], 3),
+                                             "hit_rate": round(stats["accepted"] / stats["attempts"], 4)
+                                             if stats["attempts"] else None,
+                                             "average_latency": round(stats["latency"] / stats["attempts"], 3)
+                                             if stats["attempts"] else None}
+                    for index, stats in enumerate(self.stats)}
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """
+        This function returns the LLM metrics of each tier.
+        :return: Metrics of the tiers that have them by the name of the tier
+        """
+        return {self._tier_name(index): tier.get_metrics()
+                for index, tier in enumerate(self.tiers) if hasattr(tier, "get_metrics")}
+
+    def warm_up(self):
+        """
+        This function prepares the first tier, every invoice is analyzed with it. Other tiers are loaded when the
+        first invoice is escalated, so they do not take the memory of the first tier.
+        :return: Result of the first tier
+        """
+        return self.tiers[0].warm_up()
+
+    def close(self):
+        """
+        This function releases the resources of every tier. Tiers created with from_models share one backend, each
+        backend is closed only once after every tier is closed.
+        :return: None
+        """
+        backends = []
+        for tier in self.tiers:
+            backend = getattr(tier, "backend", None)
+            if backend is None:
+                if hasattr(tier, "close"):
+                    tier.close()
+                continue
+            tier.close(close_backend=False)
+            if not any(backend is other for other in backends):
+                backends.append(backend)
+        for backend in backends:
+            backend.close()
@@ -1,7 +1,20 @@
+import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Iterable, List
 from analyzers.abstracts.analyzer import Analyzer
+from analyzers.invoice_chunker import InvoiceChunker
+from analyzers.invoice_schema import invoice_schema_validator, line_items_schema_validator
+from analyzers.json_repairer import get_path, repair_locally, set_path
+from analyzers.json_stream_extractor import JsonStreamExtractor
+from analyzers.prompt_registry import PromptRegistry, PromptTemplate, default_prompt_registry
+from analyzers.schema_validator import SchemaValidator
+from caches.abstracts.cache import Cache
+from llm_backends.abstracts.llm_backend import LLMBackend
+from llm_backends.llm_metrics import LLMMetrics
+from llm_backends.ollama_backend import OllamaBackend
 
 
 class InvoiceAnalyzer(Analyzer):
@@ -11,13 +24,109 @@ class InvoiceAnalyzer(Analyzer):
         api_url="http://localhost:11434/api/generate",
         max_retries=3,
         prompt_path="analyzers/prompts/mvp_prompt.txt",
-        seed=12     # Seed to get deterministic results
+        seed=12,    # Seed to get deterministic results
+        cache: Cache | None = None,    # Cache of the analyzed invoices, None disables caching
+        max_concurrency=4,  # Maximum number of requests in flight in analyze_many
+        stream=False,   # Streams the response and stops generation as soon as the JSON object is complete
+        prompt_name: str | None = None,     # Name of a registered template, used instead of prompt_path if it is given
+        prompt_registry: PromptRegistry | None = None,
+        chunking=False,     # Analyzes long invoices as header/footer and line item chunks concurrently
+        chunk_threshold_chars=6000,     # Invoices with longer text are chunked
+        max_chunk_chars=3000,
+        line_items_prompt_name="line_items_prompt",  # Registered template of the line item chunks
+        structured_output=True,     # Sends the JSON schema as the format of the response, the server constrains decoding
+        max_field_repairs=5,    # Maximum number of fields repaired by the LLM, outputs with more invalid fields are regenerated
+        field_repair_prompt_name="field_repair_prompt",  # Registered template of the field repairs
+        backend: LLMBackend | None = None,  # LLM server(s) of the requests, defaults to the Ollama server at api_url
+        keep_alive: str | int | None = "30m",    # How long the default backend keeps the model loaded between requests
+        unload_on_close=False   # Lets the server unload the model when the analyzer is closed
     ):
         self.model = model
         self.api_url = api_url
         self.max_retries = max_retries
         self.prompt_path = prompt_path
         self.seed = seed
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.stream = stream
+        self.prompt_name = prompt_name
+        self.prompt_registry = prompt_registry or default_prompt_registry
+        self.chunking = chunking
+        self.chunk_threshold_chars = chunk_threshold_chars
+        self.chunker = InvoiceChunker(max_chunk_chars=max_chunk_chars)
+        self.line_items_prompt_name = line_items_prompt_name
+        self.structured_output = structured_output
+        self.max_field_repairs = max_field_repairs
+        self.field_repair_prompt_name = field_repair_prompt_name
+
+        # Connections to the LLM server are pooled by the backend and shared by concurrent requests
+        self.backend = backend or OllamaBackend(api_url, max_concurrency=max_concurrency, keep_alive=keep_alive)
+        self.unload_on_close = unload_on_close
+        self.metrics = LLMMetrics()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _build_options(self, attempt: int = 0) -> Dict:
+        """
+        This function builds generation options of the LLM. Each retry uses its own seed derived from the seed of the
+        analyzer, so the analyzer is never changed and same inputs always get the same outputs.
+        :param attempt: Index of the trial
+        :return: Options of the request
+        """
+        return {
+            "temperature": 0.1,
+            "top_p": 0.9,
+            "repeat_penalty": 1.1,
+            "seed": self.seed + attempt
+        }
+
+    def _generate(self, prompt: str, schema: Dict | None, attempt: int = 0) -> Dict:
+        """
+        This function sends a generation request to the backend.
+        :param prompt: Prompt ready to be given to the LLM
+        :param schema: JSON schema of the response, it is sent as the format if structured output is enabled
+        :param attempt: Index of the trial
+        :return: Result of the backend, with the generated text in "response"
+        """
+        start = time.perf_counter()
+        result = self.backend.generate(self.model, prompt, self._build_options(attempt),
+                                       schema if self.structured_output else None)
+        self.metrics.record(result, time.perf_counter() - start)
+        return result
+
+    def warm_up(self) -> Dict | None:
+        """
+        This function loads the model on the LLM server before the first invoice, e.g. while the first invoices are
+        read. The load time is recorded in the metrics of the analyzer.
+        :return: Result of the server with the load metadata, None if the model could not be loaded
+        """
+        start = time.perf_counter()
+        try:
+            result = self.backend.warm_up(self.model)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Model {self.model} could not be warmed up: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        self.metrics.record(result, elapsed, warm_up=True)
+        print(f"Model {self.model} is warmed up in {elapsed:.2f}s "
+              f"(load: {(result.get('load_duration') or 0) / 1e9:.2f}s)")
+        return result
+
+    def get_metrics(self) -> Dict:
+        """
+        This function returns the load and generation metrics of the requests of the analyzer.
+        :return: Metrics of the requests, see LLMMetrics.get_stats
+        """
+        return self.metrics.get_stats()
+
+    def get_prompt_template(self) -> PromptTemplate:
+        """
+        This function returns the compiled prompt template of the analyzer from the prompt registry. The template is
+        read from the disk once per process, not once per invoice.
+        :return: Compiled prompt template
+        """
+        if self.prompt_name is not None:
+            return self.prompt_registry.get(self.prompt_name)
+        return self.prompt_registry.get_by_path(self.prompt_path)
 
     def build_prompt(self, invoice_text: str) -> str:
         """
@@ -25,13 +134,7 @@ class InvoiceAnalyzer(Analyzer):
         :param invoice_text: invoice text to be prompted
         :return: Prompt ready to be given to the local LLM and analyzed
         """
-        try:
-            with open(self.prompt_path, "r", encoding="utf-8") as file:
-                template = file.read()
-        except FileNotFoundError:
-            raise Exception(f"Prompt file not found: {self.prompt_path}")
-
-        return template.replace("{invoice_text}", invoice_text)
+        return self.get_prompt_template().render(invoice_text)
 
     def extract_json_from_response(self, response_text: str) -> Dict:
         """
@@ -54,7 +157,6 @@ class InvoiceAnalyzer(Analyzer):
                 except json.JSONDecodeError:
                     pass
 
-            self.seed *= 42
             print(response_text)
             raise ValueError("JSON could not be extracted.")
 
@@ -66,31 +168,44 @@ class InvoiceAnalyzer(Analyzer):
         """
         # Creating prompt for invoice
         prompt = self.build_prompt(invoice_text)
+        return self._generate_json(prompt, invoice_schema_validator, invoice_text)
+
+    def _generate_json(self, prompt: str, validator: SchemaValidator = invoice_schema_validator,
+                       source_text: str = "") -> Dict:
+        """
+        This function sends a prompt to the LLM and extracts the JSON data from its response, with retries. The output
+        is validated with the schema and only its invalid fields are repaired, the whole output is generated again only
+        if it cannot be parsed or has too many invalid fields.
+        :param prompt: Prompt ready to be given to the LLM
+        :param validator: Compiled validator of the schema of the output
+        :param source_text: Text the prompt is built from, invalid fields are extracted from it again
+        :return: analyzed JSON data
+        """
+        # Same model, prompt and options give the same output, so the cached output is returned without any request
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.model, prompt, self._build_options(),
+                                            validator.schema if self.structured_output else None)
+            cached_json = self.cache.get(cache_key)
+            if cached_json is not None:
+                return cached_json
 
+        result = {}
         for attempt in range(self.max_retries):
             try:
-                # Determining LLM parameters
-                data = {
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "top_p": 0.9,
-                        "repeat_penalty": 1.1,
-                        "seed": self.seed
-                    }
-                }
-
-                response = requests.post(self.api_url, json=data, timeout=1200)
-                response.raise_for_status()
-                result = response.json()
-
-                if 'response' in result:
-                    parsed_json = self.extract_json_from_response(result['response'])
-                    return parsed_json
+                if self.stream:
+                    parsed_json = self._analyze_streaming(prompt, validator.schema, attempt)
                 else:
-                    print(f"Unexpected response format: {result}")
+                    result = self._generate(prompt, validator.schema, attempt)
+
+                    if 'response' not in result:
+                        raise ValueError(f"Unexpected response format: {result}")
+                    parsed_json = self.extract_json_from_response(result['response'])
+
+                errors = self.repair_json(parsed_json, validator, source_text)
+                if not errors and cache_key is not None:
+                    self.cache.set(cache_key, parsed_json)
+                return parsed_json
 
             # Error handling
             except requests.exceptions.RequestException as e:
@@ -108,26 +223,221 @@ class InvoiceAnalyzer(Analyzer):
 
         raise Exception(f"{self.max_retries} failed after trial")
 
-    def validate_invoice_json(self, data) -> Tuple[bool, str]:
+    def repair_json(self, data: Dict, validator: SchemaValidator, source_text: str) -> List[Dict]:
         """
-        This function checks the existence and correctness of groups in the data given to it.
-        :param data: data to validate
-        :return: validation result (bool), description
+        This function repairs the invalid fields of the data in place. Fields are repaired locally first (missing
+        nullable fields, numbers as strings, other date formats), then the remaining fields are extracted again by the
+        LLM one by one.
+        :param data: Parsed JSON data
+        :param validator: Compiled validator of the schema of the data
+        :param source_text: Text the data is extracted from
+        :return: Errors of the fields that could not be repaired, empty if the data is valid
+        :raises ValueError: If the data cannot be repaired field by field
+        """
+        errors = repair_locally(data, validator)
+        if not errors:
+            return errors
+        if any(not error["path"] for error in errors) or len(errors) > self.max_field_repairs:
+            raise ValueError(f"{len(errors)} invalid fields, first one: {SchemaValidator.format_error(errors[0])}")
+
+        for error in errors:
+            print(f"Repairing field: {SchemaValidator.format_error(error)}")
+            try:
+                set_path(data, error["path"], self._repair_field(data, error, source_text))
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                print(f"Field repair error ({SchemaValidator.format_error(error)}): {e}")
+
+        errors = validator.validate(data)
+        for error in errors:
+            print(f"Invalid field after repair: {SchemaValidator.format_error(error)}")
+        return errors
+
+    def _repair_field(self, data: Dict, error: Dict, source_text: str):
+        """
+        This function extracts a single invalid field from the source text again with the LLM. The response is
+        constrained to the schema of the field, so it is a few tokens instead of the whole invoice.
+        :param data: Parsed JSON data
+        :param error: Validation error of the field
+        :param source_text: Text the data is extracted from
+        :return: Valid value of the field
+        :raises ValueError: If the value is still invalid
         """
-        required_keys = ['supplier_details', 'invoice_details', 'bill_to_details',
-                         'line_items', 'total_details', 'payment_terms']
+        field_validator = SchemaValidator({"type": "object", "properties": {"value": error["schema"]},
+                                           "required": ["value"]})
+        try:
+            current_value = json.dumps(get_path(data, error["path"]), ensure_ascii=False)
+        except (KeyError, IndexError, TypeError):
+            current_value = "missing"
+
+        # Field description is after the invoice text, repairs of the same invoice share the prompt prefix
+        path = ".".join(str(part) for part in error["path"])
+        prompt = (self.prompt_registry.get(self.field_repair_prompt_name).render(source_text) +
+                  f"\nField: {path}\nCurrent value: {current_value} ({error['message']})\n"
+                  f"Value schema: {json.dumps(error['schema'])}\n\n### JSON OUTPUT ONLY:")
+
+        result = self._generate(prompt, field_validator.schema)
+        value = self.extract_json_from_response(result['response'])
 
-        for key in required_keys:
-            if key not in data:
-                return False, f"Missing key: {key}"
+        repair_errors = repair_locally(value, field_validator)
+        if repair_errors:
+            raise ValueError(SchemaValidator.format_error(repair_errors[0]))
+        return value["value"]
 
-        if not isinstance(data['line_items'], list):
-            return False, "line_items must be an array"
+    def _analyze_streaming(self, prompt: str, schema: Dict | None = None, attempt: int = 0) -> Dict:
+        """
+        This function reads the token stream of the LLM and parses the JSON object incrementally. The stream is closed
+        as soon as the top-level object is balanced, so trailing commentary of the LLM is never generated.
+        :param prompt: Prompt ready to be given to the LLM
+        :param schema: JSON schema of the response, it is sent as the format if structured output is enabled
+        :param attempt: Index of the trial
+        :return: analyzed JSON data
+        """
+        extractor = JsonStreamExtractor()
+        response_parts = []
 
+        start = time.perf_counter()
+        tokens = self.backend.stream(self.model, prompt, self._build_options(attempt),
+                                     schema if self.structured_output else None)
         try:
-            float(data['total_details']['total'])
-            float(data['total_details']['subtotal'])
-            float(data['total_details']['vat (20%)'])
-        except (ValueError, TypeError, KeyError):
-            return False, "Total values must be numeric"
+            for token in tokens:
+                response_parts.append(token)
+
+                json_text = extractor.feed(token)
+                if json_text is not None:
+                    try:
+                        # Closing the stream closes the connection, the server stops generating
+                        return json.loads(json_text)
+                    except json.JSONDecodeError:
+                        # Balanced braces but not a valid JSON, searching the next object
+                        extractor.reset()
+        finally:
+            tokens.close()
+            # Streams are closed before the last chunk with the metadata, only the time is recorded
+            self.metrics.record({}, time.perf_counter() - start)
+
+        # Stream ended without a complete object, the whole response is searched like non-streaming mode
+        return self.extract_json_from_response("".join(response_parts))
+
+    def analyze_content(self, content: Dict) -> Dict:
+        """
+        This function analyzes the content of a reader output. Long invoices are chunked if chunking is enabled,
+        otherwise the whole text is analyzed with a single prompt.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        return asyncio.run(self.analyze_content_async(content))
+
+    async def analyze_content_async(self, content: Dict) -> Dict:
+        """
+        This function is the asyncio version of analyze_content. Header/footer and line item chunks are sent to the LLM
+        concurrently, so latency depends on the number of parallel requests instead of the length of the invoice.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        parts = None
+        if self.chunking and len(content.get("text", "")) > self.chunk_threshold_chars:
+            parts = self.chunker.split(content)
+        if parts is None:
+            return await self.analyze_invoice_async(content.get("text", ""))
+
+        # Header and footer are sent once with the main prompt, its line items are replaced with the chunk results
+        header_text = parts["header"] + "\n\n...\n\n" + parts["footer"]
+        line_items_template = self.prompt_registry.get(self.line_items_prompt_name)
+        requests_args = [(self.build_prompt(header_text), invoice_schema_validator, header_text)]
+        requests_args += [(line_items_template.render(chunk), line_items_schema_validator, chunk)
+                          for chunk in parts["line_item_chunks"]]
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self._executor, self._generate_json, *args)
+                                         for args in requests_args))
+        return self.chunker.merge(results[0], results[1:])
+
+    def analyze_many(self, invoice_texts: Iterable[str]) -> List[Dict | None]:
+        """
+        This function analyzes many invoices concurrently. At most max_concurrency requests are sent to the LLM server
+        at the same time.
+        :param invoice_texts: Texts to analyze
+        :return: Analyzed JSON data of each text in the given order, None for the texts that could not be analyzed
+        """
+        return asyncio.run(self.analyze_many_async(invoice_texts))
+
+    async def analyze_invoice_async(self, invoice_text: str):
+        """
+        This function analyzes the text given to it without blocking the event loop. The blocking request runs in the
+        thread pool of the analyzer, so at most max_concurrency requests are in flight at the same time.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.analyze_invoice, invoice_text)
+
+    async def analyze_many_async(self, invoice_texts: Iterable[str]) -> List[Dict | None]:
+        """
+        This function analyzes many invoices concurrently with asyncio. Texts are consumed lazily through a bounded
+        queue, so new texts are only taken when a worker is free (backpressure).
+        :param invoice_texts: Texts to analyze
+        :return: Analyzed JSON data of each text in the given order, None for the texts that could not be analyzed
+        """
+        queue = asyncio.Queue(maxsize=self.max_concurrency)
+        results: Dict[int, Dict | None] = {}
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    index, invoice_text = item
+                    try:
+                        results[index] = await self.analyze_invoice_async(invoice_text)
+                    except Exception as e:
+                        print(f"Invoice {index} could not be analyzed: {e}")
+                        results[index] = None
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+
+        text_count = 0
+        for index, invoice_text in enumerate(invoice_texts):
+            await queue.put((index, invoice_text))
+            text_count += 1
+
+        # One stop signal for each worker
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+        return [results[index] for index in range(text_count)]
+
+    def close(self, close_backend: bool = True):
+        """
+        This function releases the thread pool and the backend of the analyzer.
+        :param close_backend: (Optional) Closes the backend too, False if the backend is shared with other analyzers
+        :return: None
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self.unload_on_close:
+            try:
+                self.backend.release(self.model)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Model {self.model} could not be unloaded: {e}")
+        if close_backend:
+            self.backend.close()
+
+    def validate_invoice_json(self, data) -> Tuple[bool, str]:
+        """
+        This function checks the data given to it with the compiled invoice schema.
+        :param data: data to validate
+        :return: validation result (bool), description of the first invalid field
+        """
+        errors = invoice_schema_validator.validate(data)
+        if errors:
+            return False, SchemaValidator.format_error(errors[0])
         return True, "Valid"
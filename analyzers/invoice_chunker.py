@@ -0,0 +1,122 @@
+import re
+from typing import Any, Dict, List
+
+# Amounts with decimals, e.g. 479.1 or 18,684.90. Rows of line items have at least two of them (price and total)
+_AMOUNT_PATTERN = re.compile(r"\d[\d,]*\.\d+")
+# Text blocks are separated by empty lines, like the tables of the readers
+_BLOCK_SEPARATOR_PATTERN = re.compile(r"\n(?:[ \t]*\n)+")
+
+
+class InvoiceChunker:
+    def __init__(self, max_chunk_chars: int = 3000, min_item_amounts: int = 2):
+        """
+        Splits the reader output of long invoices into the header, the line item region and the footer. The line item
+        region is split into chunks at page and table boundaries, so every chunk fits into the context of the LLM.
+        :param max_chunk_chars: Maximum number of characters of a line item chunk
+        :param min_item_amounts: Minimum number of amounts in a row for the row to be a line item
+        """
+        self.max_chunk_chars = max_chunk_chars
+        self.min_item_amounts = min_item_amounts
+
+    def split(self, content: Dict[str, Any]) -> Dict[str, Any] | None:
+        """
+        This function splits the content of an invoice. Blocks before the first line item block are the header,
+        blocks after the last line item block are the footer (totals and payment terms).
+        :param content: Content of the reader output, with text and pages
+        :return: Header text, footer text and line item chunks, None if no line item is found
+        """
+        blocks = self._blocks(content)
+        item_indexes = [index for index, block in enumerate(blocks) if self._is_item_block(block)]
+        if not item_indexes:
+            return None
+
+        first, last = item_indexes[0], item_indexes[-1]
+        return {
+            "header": "\n\n".join(blocks[:first]),
+            "footer": "\n\n".join(blocks[last + 1:]),
+            "line_item_chunks": self._chunk(blocks[first:last + 1]),
+        }
+
+    @staticmethod
+    def merge(header_json: Dict, chunk_jsons: List[Dict | List]) -> Dict:
+        """
+        This function merges the analyzed header/footer and line item chunks. Line items are concatenated in the order
+        of the chunks, so the same chunks always give the same result.
+        :param header_json: Analyzed JSON data of the header and footer
+        :param chunk_jsons: Analyzed JSON data of each line item chunk in order
+        :return: Analyzed JSON data of the whole invoice
+        """
+        line_items = []
+        for chunk_json in chunk_jsons:
+            items = chunk_json.get("line_items", []) if isinstance(chunk_json, dict) else chunk_json
+            line_items.extend(item for item in (items or []) if isinstance(item, dict))
+
+        merged_json = dict(header_json)
+        merged_json["line_items"] = line_items
+        return merged_json
+
+    @staticmethod
+    def _blocks(content: Dict[str, Any]) -> List[str]:
+        """
+        This function returns the text blocks of the invoice in reading order. Tables of the pages are used if the
+        reader found them, otherwise the page text is split at empty lines.
+        :param content: Content of the reader output
+        :return: Text of each block
+        """
+        blocks = []
+        for page in content.get("pages", []):
+            tables = page.get("tables") or []
+            if tables:
+                for table in tables:
+                    # Rows are text lines (PyPDF2/OCR) or lists of cells (pdfplumber)
+                    rows = [row if isinstance(row, str) else "   ".join(cell or "" for cell in row) for row in table]
+                    blocks.append("\n".join(rows))
+            else:
+                blocks.extend(block.strip() for block in _BLOCK_SEPARATOR_PATTERN.split(page.get("text", ""))
+                              if block.strip())
+
+        if not blocks:
+            blocks = [block.strip() for block in _BLOCK_SEPARATOR_PATTERN.split(content.get("text", ""))
+                      if block.strip()]
+        return blocks
+
+    def _is_item_block(self, block: str) -> bool:
+        """
+        This function checks if a block has line item rows.
+        :param block: Text of the block
+        :return: If the block has a line item row it returns True, otherwise it returns False
+        """
+        return any(len(_AMOUNT_PATTERN.findall(row)) >= self.min_item_amounts for row in block.splitlines())
+
+    def _chunk(self, blocks: List[str]) -> List[str]:
+        """
+        This function groups consecutive blocks into chunks. Blocks are never split unless a single block is larger
+        than a chunk, then it is split between its rows.
+        :param blocks: Text blocks of the line item region
+        :return: Text of each chunk
+        """
+        pieces = []
+        for block in blocks:
+            if len(block) <= self.max_chunk_chars:
+                pieces.append(block)
+                continue
+            rows, size = [], 0
+            for row in block.splitlines():
+                if rows and size + len(row) + 1 > self.max_chunk_chars:
+                    pieces.append("\n".join(rows))
+                    rows, size = [], 0
+                rows.append(row)
+                size += len(row) + 1
+            if rows:
+                pieces.append("\n".join(rows))
+
+        chunks, current, size = [], [], 0
+        for piece in pieces:
+            if current and size + len(piece) + 2 > self.max_chunk_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
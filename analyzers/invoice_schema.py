@@ -0,0 +1,75 @@
+from analyzers.schema_validator import SchemaValidator
+
+# Dates are DD/MM/YYYY and PO numbers are "PO" followed by an integer, like mvp_prompt.txt asks
+DATE_PATTERN = r"^\d{2}/\d{2}/\d{4}$"
+PO_NUMBER_PATTERN = r"^PO\s*-?\s*\d+$"
+
+_STRING = {"type": ["string", "null"]}
+_DATE = {"type": ["string", "null"], "pattern": DATE_PATTERN}
+_PO_NUMBER = {"type": ["string", "null"], "pattern": PO_NUMBER_PATTERN}
+_NUMBER = {"type": ["number", "null"]}
+
+
+def _object(properties: dict) -> dict:
+    """
+    This function creates the schema of an object whose every property is required.
+    :param properties: Schemas of the properties
+    :return: Schema of the object
+    """
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+LINE_ITEM_SCHEMA = _object({
+    "item_name": _STRING,
+    "quantity": _NUMBER,
+    "unit_price": _NUMBER,
+    "total_price": _NUMBER,
+    "po_number": _PO_NUMBER,
+})
+
+# Schema of mvp_prompt.txt. It is sent to the LLM server as the structured output format, and validates the outputs
+INVOICE_SCHEMA = _object({
+    "supplier_details": _object({
+        "company_name": _STRING,
+        "address": _STRING,
+        "tax_number": _STRING,
+        "tel": _STRING,
+        "vat": _STRING,
+    }),
+    "invoice_details": _object({
+        "invoice_number": _STRING,
+        "invoice_date": _DATE,
+        "due_date": _DATE,
+        "po_number": _PO_NUMBER,
+        "customer_id": _STRING,
+    }),
+    "bill_to_details": _object({
+        "company_name": _STRING,
+        "address": _STRING,
+        "tax_id": _STRING,
+        "vat": _STRING,
+    }),
+    "line_items": {"type": "array", "items": LINE_ITEM_SCHEMA},
+    # Totals are needed by the validators, they cannot be null
+    "total_details": _object({
+        "subtotal": {"type": "number"},
+        "vat (20%)": {"type": "number"},
+        "total": {"type": "number"},
+    }),
+    "payment_terms": _object({
+        "payment_method": _STRING,
+        "bank_details": _STRING,
+        "due_date": _DATE,
+        "iban": _STRING,
+        "swift_code": _STRING,
+    }),
+})
+
+# Schema of line_items_prompt.txt
+LINE_ITEMS_SCHEMA = _object({
+    "line_items": {"type": "array", "items": LINE_ITEM_SCHEMA},
+})
+
+# Validators are compiled once per process
+invoice_schema_validator = SchemaValidator(INVOICE_SCHEMA)
+line_items_schema_validator = SchemaValidator(LINE_ITEMS_SCHEMA)
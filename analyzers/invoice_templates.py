@@ -0,0 +1,55 @@
+# Templates of fixed layout invoices for the template analyzer. Each template has:
+# - suppliers: Tax/VAT numbers of the suppliers that use the template, they are the keys of the fingerprint index
+# - layout_pattern: Pattern that must be found in the text for the template to be used
+# - fields: Pattern of every field of the output JSON by "section.field", the first group is the value. Fields without
+#   a pattern are null
+# - required: Fields that must be found, missing fields lower the confidence
+# - line_items: start pattern of a line item and the patterns of its fields
+# - min_confidence: Below this confidence the invoice is analyzed by the LLM
+# Field types: text, lines (joined with ", "), number, date, id (spaces around "-" removed)
+
+INVOICE_TEMPLATES = {
+    "prd_qty_price_total_po": {
+        "suppliers": ["GB123456789"],
+        "layout_pattern": r"PRD-\d{4}\s+.+?Q\s*t\s*y\s*:",
+        "fields": {
+            "supplier_details.company_name": (r"\A\s*([^\n]+?)\s*\n", "text"),
+            "supplier_details.address": (r"\A\s*[^\n]+\n(.*?)\n\s*VAT\s*:", "lines"),
+            "supplier_details.tax_number": None,
+            "supplier_details.tel": (r"(?:Phone|Tel)\s*:\s*([^\n]+?)\s*$", "text"),
+            "supplier_details.vat": (r"VAT\s*:\s*([A-Z]{2}\s?\d+)", "id"),
+            "invoice_details.invoice_number": (r"Invoice\s*Number\s*:\s*([A-Z]+\s*-?\s*\d+)", "id"),
+            "invoice_details.invoice_date": (r"Invoice\s*Date\s*:\s*(\d{2}/\d{2}/\d{4})", "date"),
+            "invoice_details.due_date": (r"Due\s*Date\s*:\s*(\d{2}/\d{2}/\d{4})", "date"),
+            "invoice_details.po_number": None,
+            "invoice_details.customer_id": (r"Customer\s*ID\s*:\s*([A-Z]+\s*-?\s*\d+)", "id"),
+            "bill_to_details.company_name": (r"Bill\s*To\s*:\s*\n\s*([^\n]+?)\s*\n", "text"),
+            "bill_to_details.address": (r"Bill\s*To\s*:\s*\n[^\n]*\n(.*?)\n\s*Tax\s*ID\s*:", "lines"),
+            "bill_to_details.tax_id": (r"Tax\s*ID\s*:\s*([A-Z]{2}\s?\d+)", "id"),
+            "bill_to_details.vat": None,
+            "total_details.subtotal": (r"Sub\s*total\s*:\s*\$?\s*([\d,]+(?:\.\d+)?)", "number"),
+            "total_details.vat (20%)": (r"VAT\s*\(\s*20\s*%\s*\)\s*:\s*\$?\s*([\d,]+(?:\.\d+)?)", "number"),
+            "total_details.total": (r"Total\s*Amount\s*:\s*\$?\s*([\d,]+(?:\.\d+)?)", "number"),
+            "payment_terms.payment_method": (r"Payment\s*Terms\s*:\s*([^\n]+?)\s*$", "text"),
+            "payment_terms.bank_details": (r"Bank\s*Details\s*:\s*([^\n]+?)\s*$", "text"),
+            "payment_terms.due_date": None,
+            "payment_terms.iban": (r"IBAN\s*:\s*([A-Z]{2}\d{2}(?: ?[A-Z0-9]{1,4})+)", "text"),
+            "payment_terms.swift_code": (r"Swift\s*Code\s*:\s*([A-Z0-9]{8,11})\b", "text"),
+        },
+        "required": [
+            "supplier_details.company_name", "invoice_details.invoice_number", "invoice_details.invoice_date",
+            "total_details.subtotal", "total_details.vat (20%)", "total_details.total",
+        ],
+        "line_items": {
+            "start": r"PRD-\d{4}\b",
+            "fields": {
+                "item_name": (r"\APRD-\d{4}\s+(.+?)\s+Q\s*t\s*y\s*:", "text"),
+                "quantity": (r"Q\s*t\s*y\s*:\s*([\d ]+?)\s+P", "number"),
+                "unit_price": (r"P\s*r\s*i\s*c\s*e\s*:\s*\$?\s*([\d,]+(?:\.\d+)?)", "number"),
+                "total_price": (r"T\s*o\s*t\s*a\s*l\s*:\s*\$?\s*([\d,]+(?:\.\d+)?)", "number"),
+                "po_number": (r"PO\s*:\s*(PO\s*-?\s*\d+)", "id"),
+            },
+        },
+        "min_confidence": 0.9,
+    },
+}
@@ -0,0 +1,169 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from analyzers.schema_validator import SchemaValidator
+
+# Marks the values that cannot be repaired locally
+_UNREPAIRABLE = object()
+# Date formats the LLM outputs instead of DD/MM/YYYY
+_DATE_FORMATS = ["%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y", "%Y-%m-%d", "%Y/%m/%d", "%d %B %Y", "%d %b %Y", "%B %d, %Y",
+                 "%b %d, %Y"]
+
+
+def get_path(data: Any, path: Tuple) -> Any:
+    """
+    This function returns the value at the given path of the data.
+    :param data: JSON data
+    :param path: Keys and indexes of the value
+    :return: Value at the path
+    """
+    for part in path:
+        data = data[part]
+    return data
+
+
+def set_path(data: Any, path: Tuple, value: Any):
+    """
+    This function replaces the value at the given path of the data.
+    :param data: JSON data
+    :param path: Keys and indexes of the value, must not be empty
+    :param value: New value
+    :return: None
+    """
+    get_path(data, path[:-1])[path[-1]] = value
+
+
+def _types(schema: Dict[str, Any]) -> List[str]:
+    """
+    This function returns the allowed JSON types of a schema node.
+    :param schema: Schema node
+    :return: Allowed types, empty if every type is allowed
+    """
+    types = schema.get("type", [])
+    return [types] if isinstance(types, str) else types
+
+
+def default_value(schema: Dict[str, Any]) -> Any:
+    """
+    This function creates the value of a missing field, like the prompts ask the LLM to do ("If a field is not present,
+    use null").
+    :param schema: Schema of the field
+    :return: null for nullable fields, empty arrays, objects of default values. _UNREPAIRABLE for required values
+    """
+    types = _types(schema)
+    if "null" in types:
+        return None
+    if "array" in types:
+        return []
+    if "object" in types:
+        value = {}
+        for name in schema.get("required", []):
+            value[name] = default_value(schema.get("properties", {}).get(name, {}))
+            if value[name] is _UNREPAIRABLE:
+                return _UNREPAIRABLE
+        return value
+    return _UNREPAIRABLE
+
+
+def parse_number(text: str) -> int | float:
+    """
+    This function parses an amount written with currency symbols and separators, e.g. "$1,250.00" and "1.250,00 EUR"
+    are both 1250.0. The separator that comes last is the decimal separator, the other one separates thousands. A
+    separator that repeats separates thousands. A single separator followed by exactly three digits is ambiguous, e.g.
+    "1.250" is 1250 in Europe and 1.25 in the US, so it is not parsed unless the integer part cannot be grouped (e.g.
+    "0,125" and "1234.567").
+    :param text: Amount as text
+    :return: Amount as a number
+    :raises ValueError: If the text is not a number or its separators are ambiguous
+    """
+    digits = re.sub(r"[^\d.,\-]", "", text)
+    if "." in digits and "," in digits:
+        decimal_separator = "." if digits.rfind(".") > digits.rfind(",") else ","
+    elif digits.count(",") == 1 or digits.count(".") == 1:
+        decimal_separator = "," if "," in digits else "."
+        if re.fullmatch(r"-?[1-9]\d{0,2}[.,]\d{3}", digits):
+            raise ValueError(f"Ambiguous decimal separator: {text}")
+    else:
+        decimal_separator = None
+
+    thousands_separator = "," if decimal_separator == "." else "." if decimal_separator == "," else ".,"
+    digits = digits.translate(str.maketrans("", "", thousands_separator))
+    if decimal_separator == ",":
+        digits = digits.replace(",", ".")
+    return int(digits) if re.fullmatch(r"-?\d+", digits) else float(digits)
+
+
+def coerce_value(value: Any, schema: Dict[str, Any]) -> Any:
+    """
+    This function converts a value that does not match its schema to the type and format of the schema, e.g. "$1,250.00"
+    and "1.250,00" to 1250.0, "2024-03-15" to "15/03/2024" and "PO 123" to "PO123". Ambiguous amounts like "1.250" are
+    left to the LLM.
+    :param value: Invalid value
+    :param schema: Schema of the value
+    :return: Converted value, _UNREPAIRABLE if it cannot be converted without the LLM
+    """
+    types = _types(schema)
+    if "number" in types and isinstance(value, str):
+        try:
+            return parse_number(value)
+        except ValueError:
+            pass
+    if "string" in types and isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if "string" in types and isinstance(value, str) and value.strip().lower() in ("", "null", "none", "n/a"):
+        return None if "null" in types else _UNREPAIRABLE
+    if "array" in types and isinstance(value, dict):
+        return [value]
+    if "array" in types and value is None:
+        return []
+    if "object" in types and value is None:
+        return default_value(schema)
+    if isinstance(value, str) and "pattern" in schema:
+        value = " ".join(value.split())
+        # Dates in other formats are converted to DD/MM/YYYY
+        for date_format in _DATE_FORMATS:
+            if re.search(schema["pattern"], value):
+                break
+            try:
+                value = datetime.strptime(value, date_format).strftime("%d/%m/%Y")
+            except ValueError:
+                pass
+        # PO numbers like "P.O. No: 123" are converted to PO123
+        match = re.search(r"P\.?\s*O\.?\s*(?:No\.?|#)?\s*[-:]?\s*(\d+)", value, re.I)
+        if match and not re.search(schema["pattern"], value):
+            value = f"PO{match.group(1)}"
+        if not re.search(schema["pattern"], value):
+            return _UNREPAIRABLE
+    if SchemaValidator(schema).validate(value):
+        return _UNREPAIRABLE
+    return value
+
+
+def repair_locally(data: Any, validator: SchemaValidator, max_passes: int = 3) -> List[Dict[str, Any]]:
+    """
+    This function repairs the invalid fields of the data in place without the LLM. Missing fields get their default
+    values and invalid values are converted to the type and format of their schema. Fields of a repaired object or
+    array are only validated in the next pass.
+    :param data: Parsed JSON data
+    :param validator: Compiled validator of the data
+    :param max_passes: Maximum number of validate and repair passes
+    :return: Errors of the fields that could not be repaired
+    """
+    errors = validator.validate(data)
+    for _ in range(max_passes):
+        repaired = False
+        for error in errors:
+            # Root of the data is not an object, only a new generation can fix it
+            if not error["path"]:
+                return errors
+            if error["message"] == "is missing":
+                value = default_value(error["schema"])
+            else:
+                value = coerce_value(get_path(data, error["path"]), error["schema"])
+            if value is not _UNREPAIRABLE:
+                set_path(data, error["path"], value)
+                repaired = True
+        if not repaired:
+            break
+        errors = validator.validate(data)
+    return errors
@@ -0,0 +1,52 @@
+class JsonStreamExtractor:
+    def __init__(self):
+        # State of the scanner, text is fed in pieces as the tokens of the LLM arrive
+        self.reset()
+
+    def reset(self):
+        """
+        This function clears the state, so the next top-level JSON object can be searched.
+        :return: None
+        """
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> str | None:
+        """
+        This function scans the next piece of the streamed text. Braces inside JSON strings are ignored, so the object
+        is completed exactly when its top-level braces are balanced.
+        :param text: Next piece of the response
+        :return: Text of the top-level JSON object once it is complete, otherwise None
+        """
+        start = 0 if self._depth > 0 else None
+
+        for index, char in enumerate(text):
+            if self._depth == 0:
+                # Skipping any text before the object starts
+                if char == '{':
+                    self._depth = 1
+                    start = index
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[start:index + 1])
+                    return "".join(self._parts)
+
+        if start is not None:
+            self._parts.append(text[start:])
+        return None
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from typing import Dict
+
+
+class PromptTemplate:
+    placeholder = "{invoice_text}"
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self._parts = ("", "")     # Static parts before and after the invoice text, replaced together on reload
+        self.modified_time = None
+        self.load()
+
+    def load(self):
+        """
+        This function reads the template file and precompiles it into the static parts around the invoice text. The
+        prefix (the long instruction block) is the same for every invoice, so the LLM server can reuse its prompt
+        (KV) cache for it.
+        :return: None
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                template = file.read()
+            modified_time = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            raise Exception(f"Prompt file not found: {self.path}")
+
+        placeholder_count = template.count(self.placeholder)
+        if placeholder_count != 1:
+            raise ValueError(f"Prompt template {self.path} must contain {self.placeholder} exactly once, "
+                             f"found {placeholder_count}")
+
+        self._parts = tuple(template.split(self.placeholder))
+        self.modified_time = modified_time
+
+    @property
+    def prefix(self) -> str:
+        """
+        This function returns the static part of the prompt before the invoice text.
+        :return: Prefix of the prompt
+        """
+        return self._parts[0]
+
+    @property
+    def suffix(self) -> str:
+        """
+        This function returns the static part of the prompt after the invoice text.
+        :return: Suffix of the prompt
+        """
+        return self._parts[1]
+
+    def is_changed(self) -> bool:
+        """
+        This function checks if the template file is changed on the disk after it is loaded.
+        :return: If the file is changed it returns True, otherwise it returns False
+        """
+        try:
+            return os.path.getmtime(self.path) != self.modified_time
+        except FileNotFoundError:
+            return False
+
+    def render(self, invoice_text: str) -> str:
+        """
+        This function builds the prompt with given invoice text.
+        :param invoice_text: invoice text to be prompted
+        :return: Prompt ready to be given to the local LLM
+        """
+        prefix, suffix = self._parts
+        return prefix + invoice_text + suffix
+
+
+class PromptRegistry:
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval    # Seconds between two checks of a template file on the disk
+        self._paths: Dict[str, str] = {}
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._last_checks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str):
+        """
+        This function registers a template file with a name, e.g. per supplier or per language. The file is loaded at
+        the first use.
+        :param name: Name of the template
+        :param path: Path of the template file
+        :return: None
+        """
+        with self._lock:
+            if self._paths.get(name) != path:
+                self._paths[name] = path
+                self._templates.pop(name, None)
+
+    def register_folder(self, folder_path: str):
+        """
+        This function registers every .txt template in the given folder by its filename without extension.
+        :param folder_path: Folder of the template files
+        :return: None
+        """
+        for filename in sorted(os.listdir(folder_path)):
+            if filename.endswith(".txt"):
+                self.register(os.path.splitext(filename)[0], os.path.join(folder_path, filename))
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        This function returns the compiled template with the given name. Templates are loaded once per process and
+        reloaded only if their file is changed on the disk.
+        :param name: Name of the template
+        :return: Compiled template
+        """
+        with self._lock:
+            if name not in self._paths:
+                raise KeyError(f"Prompt template is not registered: {name}")
+
+            template = self._templates.get(name)
+            if template is None:
+                template = PromptTemplate(name, self._paths[name])
+                self._templates[name] = template
+                self._last_checks[name] = time.monotonic()
+            elif time.monotonic() - self._last_checks[name] >= self.check_interval:
+                self._last_checks[name] = time.monotonic()
+                if template.is_changed():
+                    template.load()
+            return template
+
+    def get_by_path(self, path: str) -> PromptTemplate:
+        """
+        This function returns the compiled template of the given file, the file is registered with its path as name.
+        :param path: Path of the template file
+        :return: Compiled template
+        """
+        self.register(path, path)
+        return self.get(path)
+
+
+# Templates are shared by every analyzer of the process
+default_prompt_registry = PromptRegistry()
+default_prompt_registry.register_folder(os.path.join(os.path.dirname(__file__), "prompts"))
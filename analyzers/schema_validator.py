@@ -0,0 +1,87 @@
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+# Python types of the JSON schema types
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+class SchemaValidator:
+    def __init__(self, schema: Dict[str, Any]):
+        """
+        Validator of a JSON schema subset (type, properties, required, items, pattern, enum). The schema is compiled
+        once into nested check functions and patterns, so validating a document does not interpret the schema again.
+        :param schema: JSON schema
+        """
+        self.schema = schema
+        self._check = self._compile(schema)
+
+    def validate(self, data: Any) -> List[Dict[str, Any]]:
+        """
+        This function validates the data with the compiled schema.
+        :param data: Data to validate
+        :return: Errors with the path of the failed field, the message and the schema of the field. Empty if the data
+                 is valid
+        """
+        errors = []
+        self._check(data, (), errors)
+        return errors
+
+    @staticmethod
+    def format_error(error: Dict[str, Any]) -> str:
+        """
+        This function converts an error to a readable description.
+        :param error: Error of validate
+        :return: Description of the error, e.g. "total_details.total must be number"
+        """
+        path = ".".join(str(part) for part in error["path"]) or "data"
+        return f"{path} {error['message']}"
+
+    def _compile(self, schema: Dict[str, Any]) -> Callable[[Any, Tuple, List], None]:
+        """
+        This function compiles a schema node into a check function.
+        :param schema: Schema node
+        :return: Function that appends the errors of a value to the given list
+        """
+        types = schema.get("type")
+        types = [types] if isinstance(types, str) else types
+        python_types = tuple(_JSON_TYPES[json_type] for json_type in types) if types else None
+        allows_bool = types is None or "boolean" in types
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+        enum = schema.get("enum")
+        properties = {name: self._compile(property_schema)
+                      for name, property_schema in schema.get("properties", {}).items()}
+        property_schemas = schema.get("properties", {})
+        required = schema.get("required", [])
+        check_item = self._compile(schema["items"]) if "items" in schema else None
+
+        def check(value: Any, path: Tuple, errors: List[Dict[str, Any]]):
+            # bool is a subclass of int in Python, but it is not a number in JSON
+            if python_types is not None and (not isinstance(value, python_types)
+                                             or (isinstance(value, bool) and not allows_bool)):
+                errors.append({"path": path, "message": f"must be {' or '.join(types)}", "schema": schema})
+                return
+            if enum is not None and value not in enum:
+                errors.append({"path": path, "message": f"must be one of {enum}", "schema": schema})
+            if pattern is not None and isinstance(value, str) and not pattern.search(value):
+                errors.append({"path": path, "message": f"must match {pattern.pattern}", "schema": schema})
+            if isinstance(value, dict):
+                for name in required:
+                    if name not in value:
+                        errors.append({"path": path + (name,), "message": "is missing",
+                                       "schema": property_schemas.get(name, {})})
+                for name, check_property in properties.items():
+                    if name in value:
+                        check_property(value[name], path + (name,), errors)
+            if check_item is not None and isinstance(value, list):
+                for index, item in enumerate(value):
+                    check_item(item, path + (index,), errors)
+
+        return check
@@ -0,0 +1,247 @@
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+from analyzers.abstracts.analyzer import Analyzer
+from analyzers.invoice_analyzer import InvoiceAnalyzer
+from analyzers.invoice_templates import INVOICE_TEMPLATES
+
+# Tax/VAT numbers in the header of an invoice, e.g. GB123456789. They are the supplier fingerprints of the index
+_SUPPLIER_ID_PATTERN = re.compile(r"\b[A-Z]{2}\s?\d{6,14}\b")
+# Sections of the output JSON in the order of mvp_prompt.txt
+_SECTIONS = ["supplier_details", "invoice_details", "bill_to_details", "line_items", "total_details", "payment_terms"]
+
+
+def _normalize_id(value: str) -> str:
+    """
+    This function removes the spaces of an id, OCR and PDF text layers often split ids like "INV -53470".
+    :param value: Raw id
+    :return: Normalized id
+    """
+    return re.sub(r"\s*-\s*", "-", re.sub(r"(?<=[A-Z])\s+(?=\d)", "", value.strip()))
+
+
+def _convert(value: str, value_type: str) -> Any:
+    """
+    This function converts a matched text to the type of its field.
+    :param value: Matched text
+    :param value_type: text, lines, number, date or id
+    :return: Converted value
+    """
+    if value_type == "lines":
+        return ", ".join(line.strip() for line in value.splitlines() if line.strip())
+    if value_type == "number":
+        digits = re.sub(r"[\s,]", "", value)
+        return int(digits) if digits.isdigit() else float(digits)
+    if value_type == "id":
+        return _normalize_id(" ".join(value.split()))
+    return " ".join(value.split())
+
+
+class InvoiceTemplate:
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        """
+        Compiled template of a fixed layout invoice. Patterns are compiled once when the template is created.
+        :param name: Name of the template
+        :param spec: Specification of the template, see analyzers/invoice_templates.py
+        """
+        flags = re.M | re.S
+        self.name = name
+        self.suppliers = [_normalize_id(supplier) for supplier in spec.get("suppliers", [])]
+        self.layout_pattern = re.compile(spec["layout_pattern"], flags)
+        self.fields = {path: (re.compile(field[0], flags), field[1]) if field else None
+                       for path, field in spec["fields"].items()}
+        self.required = spec.get("required", [])
+        self.item_start_pattern = re.compile(spec["line_items"]["start"], flags)
+        self.item_fields = {name: (re.compile(pattern, flags), value_type)
+                            for name, (pattern, value_type) in spec["line_items"]["fields"].items()}
+        self.min_confidence = spec.get("min_confidence", 0.9)
+
+    def matches_layout(self, text: str) -> bool:
+        """
+        This function checks if the text has the layout of the template.
+        :param text: Text of the invoice
+        :return: If the layout matches it returns True, otherwise it returns False
+        """
+        return self.layout_pattern.search(text) is not None
+
+    def extract(self, text: str) -> Tuple[Dict, float]:
+        """
+        This function extracts the invoice JSON from the text with the patterns of the template.
+        :param text: Text of the invoice
+        :return: Extracted JSON data in the schema of mvp_prompt.txt, and the confidence of the extraction in the range
+                 of 0-1 (the lower of the found required fields and the completely extracted line items ratios)
+        """
+        data = {section: ([] if section == "line_items" else {}) for section in _SECTIONS}
+        for path, field in self.fields.items():
+            section, name = path.split(".", 1)
+            match = field[0].search(text) if field else None
+            data[section][name] = _convert(match.group(1), field[1]) if match else None
+
+        starts = [match.start() for match in self.item_start_pattern.finditer(text)]
+        complete_items = 0
+        for start, end in zip(starts, starts[1:] + [len(text)]):
+            segment = text[start:end]
+            item = {}
+            for name, (pattern, value_type) in self.item_fields.items():
+                match = pattern.search(segment)
+                item[name] = _convert(match.group(1), value_type) if match else None
+            complete_items += all(value is not None for value in item.values())
+            data["line_items"].append(item)
+
+        if not starts:
+            return data, 0.0
+        found_required = sum(data[path.split(".", 1)[0]][path.split(".", 1)[1]] is not None for path in self.required)
+        confidence = min(found_required / max(len(self.required), 1), complete_items / len(starts))
+        return data, round(confidence, 4)
+
+
+class InvoiceTemplateIndex:
+    _default = None
+
+    def __init__(self, templates: Dict[str, Dict[str, Any]] | None = None, header_chars: int = 1000):
+        """
+        Compiled templates indexed by the supplier fingerprints (tax/VAT numbers) they are used for.
+        :param templates: (Optional) Template specifications by name, defaults to analyzers/invoice_templates.py
+        :param header_chars: Supplier fingerprints are searched in this many characters at the start of the text
+        """
+        self.templates = {name: InvoiceTemplate(name, spec) for name, spec in (templates or INVOICE_TEMPLATES).items()}
+        self.header_chars = header_chars
+        self.supplier_index: Dict[str, InvoiceTemplate] = {}
+        for template in self.templates.values():
+            for supplier in template.suppliers:
+                self.supplier_index[supplier] = template
+
+    @classmethod
+    def default(cls) -> "InvoiceTemplateIndex":
+        """
+        This function returns the index of the default templates. Templates are compiled once per process.
+        :return: Shared index
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def match(self, text: str) -> InvoiceTemplate | None:
+        """
+        This function finds the template of an invoice. The supplier fingerprints in the header are looked up in the
+        index first, then templates are tried by their layout.
+        :param text: Text of the invoice
+        :return: Template of the invoice, None if no template matches
+        """
+        for match in _SUPPLIER_ID_PATTERN.finditer(text[:self.header_chars]):
+            template = self.supplier_index.get(_normalize_id(match.group()))
+            if template is not None and template.matches_layout(text):
+                return template
+
+        for template in self.templates.values():
+            if template.matches_layout(text):
+                return template
+        return None
+
+
+class TemplateAnalyzer(Analyzer):
+    def __init__(self, fallback: Analyzer | None = None, template_index: InvoiceTemplateIndex | None = None):
+        """
+        Analyzes fixed layout invoices with regex templates, without any LLM call. Invoices without a template, with a
+        low confidence or with an invalid result are analyzed by the fallback analyzer.
+        :param fallback: (Optional) Analyzer of the invoices that cannot be analyzed with a template
+        :param template_index: (Optional) Index of the templates, defaults to the shared index
+        """
+        self.fallback = fallback or InvoiceAnalyzer()
+        self.template_index = template_index or InvoiceTemplateIndex.default()
+        self.stats = {"template": 0, "fallback": 0}
+        self._lock = threading.Lock()
+
+    def extract(self, invoice_text: str) -> Dict | None:
+        """
+        This function analyzes the text with its template.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data, None if the template result cannot be used
+        """
+        template = self.template_index.match(invoice_text)
+        if template is None:
+            return None
+
+        data, confidence = template.extract(invoice_text)
+        if confidence < template.min_confidence:
+            print(f"Template {template.name} confidence is low ({confidence}), using the fallback analyzer")
+            return None
+
+        is_valid, message = self.validate_invoice_json(data)
+        if not is_valid:
+            print(f"Template {template.name} result is invalid ({message}), using the fallback analyzer")
+            return None
+        return data
+
+    def _count(self, path: str):
+        """
+        This function counts the invoices analyzed by each path.
+        :param path: template or fallback
+        :return: None
+        """
+        with self._lock:
+            self.stats[path] += 1
+
+    def analyze_invoice(self, invoice_text: str):
+        """
+        This function analyzes the text given to it with its template, or with the fallback analyzer.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data
+        """
+        data = self.extract(invoice_text)
+        if data is not None:
+            self._count("template")
+            return data
+        self._count("fallback")
+        return self.fallback.analyze_invoice(invoice_text)
+
+    async def analyze_invoice_async(self, invoice_text: str):
+        """
+        This function is the asyncio version of analyze_invoice. Templates are applied in the event loop, they take
+        milliseconds.
+        :param invoice_text: text to analyze
+        :return: analyzed JSON data
+        """
+        data = self.extract(invoice_text)
+        if data is not None:
+            self._count("template")
+            return data
+        self._count("fallback")
+        return await self.fallback.analyze_invoice_async(invoice_text)
+
+    async def analyze_content_async(self, content: Dict) -> Dict:
+        """
+        This function analyzes the content of a reader output with its template, or with the fallback analyzer.
+        :param content: Content of the reader output, with text and pages
+        :return: analyzed JSON data
+        """
+        data = self.extract(content.get("text", ""))
+        if data is not None:
+            self._count("template")
+            return data
+        self._count("fallback")
+        return await self.fallback.analyze_content_async(content)
+
+    def validate_invoice_json(self, data) -> Tuple[bool, str]:
+        """
+        This function checks the existence and correctness of groups in the data given to it, like the fallback
+        analyzer does.
+        :param data: data to validate
+        :return: validation result (bool), description
+        """
+        return self.fallback.validate_invoice_json(data)
+
+    def warm_up(self):
+        """
+        This function prepares the fallback analyzer, invoices without a template still need it.
+        :return: Result of the fallback analyzer
+        """
+        return self.fallback.warm_up()
+
+    def close(self):
+        """
+        This function releases the resources of the fallback analyzer.
+        :return: None
+        """
+        if hasattr(self.fallback, "close"):
+            self.fallback.close()
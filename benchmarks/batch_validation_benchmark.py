@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+# The benchmark can be run as a script (python benchmarks/batch_validation_benchmark.py) or as a module
+# (python -m benchmarks.batch_validation_benchmark), the project root is needed for the imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validators.batch_invoice_validator import BatchInvoiceValidator
+from validators.invoice_validator import InvoiceValidator
+
+
+def load_analyzed_invoices(analyzed_outputs_folder_path: str) -> Dict[str, Dict]:
+    """
+    This function reads the analyzed invoices of a previous run.
+    :param analyzed_outputs_folder_path: Folder of the analyzed JSON outputs
+    :return: Analyzed invoices by JSON filename
+    """
+    invoices = {}
+    for filename in sorted(os.listdir(analyzed_outputs_folder_path)):
+        if filename.endswith('.json'):
+            with open(os.path.join(analyzed_outputs_folder_path, filename), "r", encoding="utf-8") as f:
+                invoices[filename] = json.load(f)
+    return invoices
+
+
+def _without_timestamp(report: Dict) -> str:
+    """
+    This function serializes a report without its timestamp, so reports of two runs can be compared.
+    :param report: Report of an invoice
+    :return: Serialized report
+    """
+    validation_report = dict(report["validation_report"])
+    validation_report["metadata"] = {key: value for key, value in validation_report["metadata"].items()
+                                     if key != "validation_timestamp"}
+    return json.dumps({**report, "validation_report": validation_report}, sort_keys=True, ensure_ascii=False)
+
+
+def benchmark_batch_validation(invoices: Dict[str, Dict], ground_truth_pos: Dict[str, List[str]],
+                               copies: int = 1000) -> Dict:
+    """
+    This function measures the validation of an archive with the invoice validator one invoice at a time and with
+    the batch validator, and checks that both create the same reports.
+    :param invoices: Analyzed invoices by JSON filename
+    :param ground_truth_pos: Ground truth POs by JSON filename
+    :param copies: The invoices are repeated this many times to simulate an archive
+    :return: Invoice count, seconds of each validator and the number of reports that are different
+    """
+    filenames = list(invoices) * copies
+    archive = [invoices[filename] for filename in filenames]
+    ground_truths = [ground_truth_pos.get(filename, []) for filename in filenames]
+
+    start = time.perf_counter()
+    reports = [InvoiceValidator(invoice, ground_truth).generate_report(filename)
+               for invoice, ground_truth, filename in zip(archive, ground_truths, filenames)]
+    invoice_validator_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_reports = BatchInvoiceValidator(archive, ground_truths).generate_reports(filenames)
+    batch_validator_seconds = time.perf_counter() - start
+
+    return {
+        "invoices": len(archive),
+        "invoice_validator_seconds": round(invoice_validator_seconds, 3),
+        "batch_validator_seconds": round(batch_validator_seconds, 3),
+        "different_reports": sum(_without_timestamp(report) != _without_timestamp(batch_report)
+                                 for report, batch_report in zip(reports, batch_reports)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compares per invoice and batch validation of analyzed invoices.")
+    parser.add_argument("--analyzed-outputs", default="outputs/analyzed_outputs")
+    parser.add_argument("--ground-truth", default="ground_truth_pos.json", help="JSON file of the ground truth POs")
+    parser.add_argument("--copies", type=int, default=1000, help="Times the invoices are repeated")
+    args = parser.parse_args()
+
+    ground_truth_pos = {}
+    if os.path.exists(args.ground_truth):
+        with open(args.ground_truth, "r", encoding="utf-8") as f:
+            ground_truth_pos = json.load(f)
+
+    result = benchmark_batch_validation(load_analyzed_invoices(args.analyzed_outputs), ground_truth_pos, args.copies)
+    print(f"{result['invoices']} invoices  invoice validator: {result['invoice_validator_seconds']}s  "
+          f"batch validator: {result['batch_validator_seconds']}s  different reports: {result['different_reports']}")
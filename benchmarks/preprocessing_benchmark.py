@@ -0,0 +1,101 @@
+import argparse
+import difflib
+import os
+import time
+from typing import Dict, List
+from readers.scanned_pdf_reader import ScannedPDFReader
+from utils import PREPROCESSING_PROFILES, preprocess_image, ocr_text_with_paragraphs
+
+
+def text_accuracy(reference_text: str, ocr_text: str) -> float:
+    """
+    This function calculates character level similarity of the OCR text to the reference text.
+    :param reference_text: Correct text of the document
+    :param ocr_text: Text read with OCR
+    :return: Similarity percentage in the range of 0-100
+    """
+    # Whitespace differences are not OCR errors
+    reference_text = " ".join(reference_text.split())
+    ocr_text = " ".join(ocr_text.split())
+    return difflib.SequenceMatcher(None, reference_text, ocr_text, autojunk=False).ratio() * 100
+
+
+def benchmark_preprocessing_profiles(corpus_folder_path: str, profiles: List[str] | None = None,
+                                     ocr_config: str = '--oem 3 --psm 6', roi: bool = True) -> Dict[str, Dict]:
+    """
+    This function measures speed and OCR accuracy of each preprocessing profile on a corpus. The corpus folder has
+    PDF files and their reference texts with the same name and .txt extension.
+    :param corpus_folder_path: Folder of the corpus
+    :param profiles: (Optional) Names of the profiles to compare, defaults to all profiles
+    :param ocr_config: Tesseract OCR configuration string
+    :param roi: (Optional) Preprocesses the text regions of the pages like the scanned PDF reader does, with the
+                denoising decision of the whole page. Whole pages are preprocessed if it is False
+    :return: Preprocessing seconds, OCR seconds and mean accuracy of each profile
+    """
+    profiles = profiles or list(PREPROCESSING_PROFILES)
+    results = {profile: {"preprocessing_seconds": 0.0, "ocr_seconds": 0.0, "accuracies": []} for profile in profiles}
+
+    for filename in sorted(os.listdir(corpus_folder_path)):
+        if not filename.endswith('.pdf'):
+            continue
+        reference_path = os.path.join(corpus_folder_path, os.path.splitext(filename)[0] + '.txt')
+        if not os.path.exists(reference_path):
+            print(f"Reference text not found, skipping: {filename}")
+            continue
+        with open(reference_path, "r", encoding="utf-8") as f:
+            reference_text = f.read()
+
+        # Pages are rendered once and shared by every profile
+        reader = ScannedPDFReader(os.path.join(corpus_folder_path, filename), max_workers=1, roi=roi)
+        page_count = reader.document.page_count
+        if roi:
+            pages = [reader._page_to_regions(page_number)[:2] for page_number in range(page_count)]
+        else:
+            pages = [([(reader._page_to_image(page_number), (0, 0))], reader.dpi) for page_number in range(page_count)]
+
+        for profile in profiles:
+            page_texts = []
+            for page_number, (regions, dpi) in enumerate(pages):
+                # Denoising is decided on the whole page like the reader does, None decides it on the page image
+                denoise = None
+                if roi:
+                    reader.preprocessing_profile = profile
+                    _, _, denoise = reader._plan_page(reader.document.fitz.load_page(page_number))
+
+                region_texts = []
+                for image, _ in regions:
+                    start = time.perf_counter()
+                    processed_image = preprocess_image(image, profile, denoise)
+                    results[profile]["preprocessing_seconds"] += time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    region_texts.append(ocr_text_with_paragraphs(processed_image, ocr_config=ocr_config, dpi=dpi))
+                    results[profile]["ocr_seconds"] += time.perf_counter() - start
+                page_texts.append("\n\n".join(region_texts))
+
+            results[profile]["accuracies"].append(text_accuracy(reference_text, "\n".join(page_texts)))
+        reader.close()
+
+    return {
+        profile: {
+            "preprocessing_seconds": round(result["preprocessing_seconds"], 3),
+            "ocr_seconds": round(result["ocr_seconds"], 3),
+            "mean_accuracy": round(sum(result["accuracies"]) / len(result["accuracies"]), 2)
+            if result["accuracies"] else None,
+            "documents": len(result["accuracies"]),
+        }
+        for profile, result in results.items()
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compares speed and OCR accuracy of the preprocessing profiles.")
+    parser.add_argument("corpus", help="Folder of PDF files and their reference .txt files")
+    parser.add_argument("--profiles", nargs="*", choices=sorted(PREPROCESSING_PROFILES))
+    parser.add_argument("--no-roi", action="store_true", help="Preprocesses whole pages instead of text regions")
+    args = parser.parse_args()
+
+    for profile, result in benchmark_preprocessing_profiles(args.corpus, args.profiles, roi=not args.no_roi).items():
+        print(f"{profile:<12} preprocessing: {result['preprocessing_seconds']:>8}s  "
+              f"ocr: {result['ocr_seconds']:>8}s  accuracy: {result['mean_accuracy']}%  "
+              f"({result['documents']} documents)")
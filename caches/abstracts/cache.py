@@ -0,0 +1,35 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class Cache(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """
+        This function returns the cached value of the given key.
+        :param key: Key of the value
+        :return: Cached value, None if the key is not cached
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        """
+        This function stores the given value with the given key.
+        :param key: Key of the value
+        :param value: JSON serializable value to cache
+        :return: None
+        """
+        pass
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        This function creates a content addressed key from the given parts. Same parts always create the same key.
+        :param parts: JSON serializable parts of the key
+        :return: SHA-256 hex digest of the parts
+        """
+        serialized = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
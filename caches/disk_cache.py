@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+from typing import Any, List, Tuple
+from caches.abstracts.cache import Cache
+
+
+class DiskCache(Cache):
+    def __init__(self, folder_path: str, max_size_bytes: int = 512 * 1024 * 1024, max_entries: int | None = None,
+                 ttl_seconds: float | None = None, evict_fraction: float = 0.1):
+        """
+        Persistent cache that keeps every value in a JSON file. When the cache exceeds its size or entry limit, least
+        recently used entries are deleted. Entries older than the time to live are never returned.
+        :param folder_path: Folder of the cache files
+        :param max_size_bytes: Maximum total size of the cache files
+        :param max_entries: (Optional) Maximum number of entries
+        :param ttl_seconds: (Optional) Time to live of an entry in seconds, entries never expire if it is None
+        :param evict_fraction: (Optional) Share of the limits freed by each eviction, so the folder is not listed again
+                               at every following set
+        """
+        self.folder_path = folder_path
+        self.max_size_bytes = max_size_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evict_fraction = evict_fraction
+        os.makedirs(self.folder_path, exist_ok=True)
+
+        # Number and total size of the entries, counted with a single scan at the first set. Entries written or
+        # deleted by other processes are counted at the next eviction, which scans the folder again
+        self._entry_count: int | None = None
+        self._total_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        """
+        This function returns the path of the cache file of the given key.
+        :param key: Key of the value
+        :return: Path of the cache file
+        """
+        return os.path.join(self.folder_path, key + ".json")
+
+    def get(self, key: str) -> Any | None:
+        """
+        This function returns the cached value of the given key and marks it as recently used.
+        :param key: Key of the value
+        :return: Cached value, None if the key is not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # Expired entries are deleted instead of returned
+        if self.ttl_seconds is not None and time.time() - entry["created_at"] > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+
+        # Modification time is used as the last access time for eviction. The entry may be evicted by another process
+        # after it is read, it is still a hit
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry["value"]
+
+    def set(self, key: str, value: Any):
+        """
+        This function stores the given value with the given key and evicts old entries if the cache is too big.
+        :param key: Key of the value
+        :param value: JSON serializable value to cache
+        :return: None
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        # Writing to a temporary file first, so a half written file is never read (even by other processes)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "value": value}, f, ensure_ascii=False)
+            size = f.tell()
+
+        with self._lock:
+            if self._entry_count is None:
+                entries = self._entries()
+                self._entry_count = len(entries)
+                self._total_size = sum(entry_size for _, entry_size, _ in entries)
+            try:
+                # Replaced entries are counted once
+                replaced_size = os.stat(path).st_size
+                self._entry_count -= 1
+                self._total_size -= replaced_size
+            except FileNotFoundError:
+                pass
+            os.replace(temp_path, path)
+            self._entry_count += 1
+            self._total_size += size
+
+            if self._total_size > self.max_size_bytes or \
+                    (self.max_entries is not None and self._entry_count > self.max_entries):
+                self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """
+        This function lists the entries of the cache.
+        :return: Last access time, size and path of each entry
+        """
+        entries = []
+        for filename in os.listdir(self.folder_path):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.folder_path, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """
+        This function deletes least recently used entries until the cache is below its size and entry limits by the
+        evict fraction, so the next evictions are needed only after many more sets. The folder is scanned again, the
+        counts of the cache are updated with the entries of other processes too.
+        :return: None
+        """
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+        entry_count = len(entries)
+        max_size_bytes = self.max_size_bytes * (1 - self.evict_fraction)
+        max_entries = None if self.max_entries is None else int(self.max_entries * (1 - self.evict_fraction))
+
+        for _, size, path in sorted(entries):
+            if total_size <= max_size_bytes and (max_entries is None or entry_count <= max_entries):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            entry_count -= 1
+
+        self._entry_count = entry_count
+        self._total_size = total_size
@@ -0,0 +1,117 @@
+import threading
+from abc import abstractmethod
+from typing import Dict, Iterator
+import requests
+from requests.adapters import HTTPAdapter
+from llm_backends.abstracts.llm_backend import LLMBackend
+
+
+class HTTPBackend(LLMBackend):
+    def __init__(
+        self,
+        api_url: str,
+        model: str | None = None,   # Model of this server, overrides the model of the requests if it is given
+        max_concurrency: int = 4,   # Maximum number of requests in flight to this server
+        timeout: float = 1200
+    ):
+        """
+        Backend of an LLM server over HTTP. Connections are pooled and kept alive, concurrent requests share them. At
+        most max_concurrency requests are in flight, the others wait for a free slot.
+        :param api_url: URL of the generation endpoint
+        :param model: (Optional) Model of this server
+        :param max_concurrency: Maximum number of requests in flight to this server
+        :param timeout: Seconds to wait for the server
+        """
+        self.api_url = api_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # The connection pool only limits the kept connections, this limits the requests
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def endpoint(self) -> str:
+        """
+        This function returns the address of the backend for logs.
+        :return: URL of the generation endpoint
+        """
+        return self.api_url
+
+    def generate(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Dict:
+        """
+        This function generates the whole response of the prompt when a slot of the server is free.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: (Optional) JSON schema the response is constrained to
+        :return: Result with the generated text in "response" and the metadata of the server
+        """
+        with self._semaphore:
+            return self._generate(model, prompt, options, schema)
+
+    def stream(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Iterator[str]:
+        """
+        This function generates the response of the prompt token by token when a slot of the server is free. The slot
+        is held until the generator is exhausted or closed.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: (Optional) JSON schema the response is constrained to
+        :return: Generated tokens
+        """
+        with self._semaphore:
+            yield from self._stream(model, prompt, options, schema)
+
+    @abstractmethod
+    def _generate(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> Dict:
+        """
+        This function sends the request of generate to the server.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema the response is constrained to
+        :return: Result with the generated text in "response" and the metadata of the server
+        """
+        pass
+
+    @abstractmethod
+    def _stream(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> Iterator[str]:
+        """
+        This function sends the request of stream to the server and reads its tokens.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema the response is constrained to
+        :return: Generated tokens
+        """
+        pass
+
+    def _health_url(self) -> str:
+        """
+        This function returns the URL that is requested to check the health of the server.
+        :return: URL of a cheap endpoint of the server
+        """
+        return self.api_url
+
+    def is_healthy(self) -> bool:
+        """
+        This function checks if the server answers a cheap request in a few seconds.
+        :return: If the server is reachable it returns True, otherwise it returns False
+        """
+        try:
+            response = self.session.get(self._health_url(), timeout=5)
+            return response.ok
+        except requests.exceptions.RequestException:
+            return False
+
+    def close(self):
+        """
+        This function closes the pooled connections of the backend.
+        :return: None
+        """
+        self.session.close()
@@ -0,0 +1,70 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator
+
+
+class LLMBackend(ABC):
+    # Name of the backend in the CLI
+    name = ""
+
+    @abstractmethod
+    def generate(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Dict:
+        """
+        This function generates the whole response of the prompt.
+        :param model: Model of the request, backends with their own model ignore it
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options (temperature, top_p, repeat_penalty, seed)
+        :param schema: (Optional) JSON schema the response is constrained to
+        :return: Result with the generated text in "response" and the metadata of the server (eval_count etc.)
+        """
+        pass
+
+    @abstractmethod
+    def stream(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Iterator[str]:
+        """
+        This function generates the response of the prompt token by token. Closing the generator stops the generation.
+        :param model: Model of the request, backends with their own model ignore it
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options (temperature, top_p, repeat_penalty, seed)
+        :param schema: (Optional) JSON schema the response is constrained to
+        :return: Generated tokens
+        """
+        pass
+
+    @property
+    def endpoint(self) -> str:
+        """
+        This function returns the address of the backend for logs.
+        :return: Address of the backend
+        """
+        return self.name
+
+    def warm_up(self, model: str) -> Dict:
+        """
+        This function loads the model on the server before the first request, so the first invoice does not pay the
+        load time.
+        :param model: Model to load
+        :return: Result of the server with the load metadata (load_duration), empty if the backend has nothing to load
+        """
+        return {}
+
+    def release(self, model: str):
+        """
+        This function lets the server unload the model.
+        :param model: Model to unload
+        :return: None
+        """
+        pass
+
+    def is_healthy(self) -> bool:
+        """
+        This function checks if the backend can answer requests, without generating anything.
+        :return: If the backend is reachable it returns True, otherwise it returns False
+        """
+        return True
+
+    def close(self):
+        """
+        This function releases the resources of the backend.
+        :return: None
+        """
+        pass
@@ -0,0 +1,53 @@
+from typing import Dict, List, Type
+from llm_backends.abstracts.llm_backend import LLMBackend
+from llm_backends.llm_backend_pool import LLMBackendPool
+from llm_backends.ollama_backend import OllamaBackend
+from llm_backends.openai_backend import OpenAICompatibleBackend
+from llm_backends.stub_backend import StubBackend
+
+# Backends of the LLM servers that can be given in the CLI
+LLM_BACKENDS: Dict[str, Type[LLMBackend]] = {
+    OllamaBackend.name: OllamaBackend,
+    OpenAICompatibleBackend.name: OpenAICompatibleBackend,
+    StubBackend.name: StubBackend,
+}
+DEFAULT_LLM_BACKEND = OllamaBackend.name
+# Generation endpoints of the servers on their default ports
+DEFAULT_API_URLS = {
+    OllamaBackend.name: "http://localhost:11434/api/generate",
+    OpenAICompatibleBackend.name: "http://localhost:8000/v1/chat/completions",
+}
+
+
+class LLMBackendFactory:
+    @staticmethod
+    def names() -> List[str]:
+        """
+        This function returns the names that can be given to create_backend.
+        :return: Names of the backends
+        """
+        return list(LLM_BACKENDS)
+
+    @staticmethod
+    def create_backend(name: str = DEFAULT_LLM_BACKEND, api_urls: List[str] | None = None,
+                       max_concurrency: int = 4, keep_alive: str | int | None = None) -> LLMBackend:
+        """
+        This function creates the backend of the given servers. Several servers are load balanced by a pool.
+        :param name: Name of the backend
+        :param api_urls: (Optional) Generation endpoints of the servers, defaults to the local server on its default port
+        :param max_concurrency: Maximum number of requests in flight to each server
+        :param keep_alive: (Optional) How long the model stays loaded after each request, only Ollama servers support it
+        :return: Backend of a single server, or the pool of the servers
+        """
+        if name not in LLM_BACKENDS:
+            raise ValueError(f"Unknown LLM backend: {name}")
+        if name == StubBackend.name:
+            return StubBackend(max_concurrency=max_concurrency)
+
+        api_urls = api_urls or [DEFAULT_API_URLS[name]]
+        if name == OllamaBackend.name:
+            backends = [OllamaBackend(api_url, max_concurrency=max_concurrency, keep_alive=keep_alive)
+                        for api_url in api_urls]
+        else:
+            backends = [LLM_BACKENDS[name](api_url, max_concurrency=max_concurrency) for api_url in api_urls]
+        return backends[0] if len(backends) == 1 else LLMBackendPool(backends)
@@ -0,0 +1,353 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List
+import requests
+from llm_backends.abstracts.llm_backend import LLMBackend
+
+
+class _Node:
+    def __init__(self, backend: LLMBackend):
+        """
+        State of a backend in the pool.
+        :param backend: Backend of the node
+        """
+        self.backend = backend
+        # The backend limits its own requests too, the pool only sends requests to nodes with a free slot
+        self.max_concurrency = getattr(backend, "max_concurrency", 4)
+        self.in_flight = 0
+        self.latency = None     # EWMA of the normalized latency, None until the first request is answered
+        self.unhealthy_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def is_healthy(self, now: float) -> bool:
+        """
+        This function checks if the node is out of its cooldown.
+        :param now: Current monotonic time
+        :return: If the node can be used it returns True, otherwise it returns False
+        """
+        return now >= self.unhealthy_until
+
+
+class LLMBackendPool(LLMBackend):
+    name = "pool"
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        slow_factor: float = 3.0,   # Nodes slower than this many times the fastest healthy node are marked unhealthy
+        cooldown: float = 30.0,     # Seconds an unhealthy node is not used
+        latency_alpha: float = 0.3,     # Weight of the last request in the latency average
+        request_deadline: float | None = 300.0  # Seconds a request waits for its node before it is sent to another node
+    ):
+        """
+        Load balancer of several LLM servers, e.g. local GPU/CPU hosts serving the same model. Requests go to the node
+        with the lowest expected wait, each node has its own concurrency limit. Failed and stalled nodes are marked
+        unhealthy and their requests fail over to the other nodes, so a batch keeps going when one server stalls.
+        :param backends: Backends of the servers
+        :param slow_factor: Nodes slower than this many times the fastest healthy node are marked unhealthy
+        :param cooldown: Seconds an unhealthy node is not used, then it is checked again
+        :param latency_alpha: Weight of the last request in the exponentially weighted latency average
+        :param request_deadline: (Optional) Seconds a request waits for its node. A node that does not answer in time
+                                 is marked unhealthy and the request is sent to another node, the first answer is used.
+                                 It should be shorter than the timeout of the backends, None disables it
+        """
+        if not backends:
+            raise ValueError("LLM backend pool needs at least one backend")
+        self.nodes = [_Node(backend) for backend in backends]
+        self.slow_factor = slow_factor
+        self.cooldown = cooldown
+        self.latency_alpha = latency_alpha
+        self.request_deadline = request_deadline
+        self._lock = threading.Lock()
+        # Notified when a slot is freed or a node is marked unhealthy
+        self._nodes_changed = threading.Condition(self._lock)
+        # Requests are sent from these threads, so the caller can stop waiting for a stalled node. Every thread holds a
+        # slot of a node, so there is always a free thread for a request with a slot
+        self._executor = ThreadPoolExecutor(max_workers=sum(node.max_concurrency for node in self.nodes))
+
+    @property
+    def endpoint(self) -> str:
+        """
+        This function returns the addresses of the backends for logs.
+        :return: Addresses of the backends
+        """
+        return ", ".join(node.backend.endpoint for node in self.nodes)
+
+    def _select(self, excluded: List[_Node], block: bool = True) -> _Node | None:
+        """
+        This function picks the node of the next request. Healthy nodes are preferred, and if all of them are full the
+        request waits for the first free slot of any of them. The node with the lowest (in flight requests + 1) *
+        latency is picked. Nodes out of their cooldown are checked first.
+        :param excluded: Nodes that already failed the request
+        :param block: If it is False, None is returned instead of waiting for a free slot
+        :return: Node of the request, None if every node is excluded
+        """
+        now = time.monotonic()
+        with self._lock:
+            recovered = [node for node in self.nodes
+                         if node not in excluded and node.unhealthy_until and node.is_healthy(now)]
+
+        # Health checks are requests, they are sent without holding the lock
+        for node in recovered:
+            healthy = node.backend.is_healthy()
+            with self._lock:
+                if healthy:
+                    print(f"LLM backend is healthy again: {node.backend.endpoint}")
+                    node.unhealthy_until = 0.0
+                    node.latency = None
+                else:
+                    node.unhealthy_until = time.monotonic() + self.cooldown
+
+        with self._nodes_changed:
+            while True:
+                now = time.monotonic()
+                candidates = [node for node in self.nodes if node not in excluded]
+                if not candidates:
+                    return None
+                # Unhealthy nodes are used only if no healthy node is left, the batch is never stopped by the pool
+                candidates = [node for node in candidates if node.is_healthy(now)] or candidates
+                candidates = [node for node in candidates if node.in_flight < node.max_concurrency]
+                if candidates:
+                    break
+                if not block:
+                    return None
+                self._nodes_changed.wait()
+
+            known = [node.latency for node in self.nodes if node.latency is not None]
+            default_latency = min(known) if known else 1.0
+            node = min(candidates, key=lambda n: (n.in_flight + 1) * (default_latency if n.latency is None
+                                                                      else n.latency))
+            node.in_flight += 1
+            node.requests += 1
+            return node
+
+    def _release(self, node: _Node, elapsed: float | None, size: int):
+        """
+        This function updates the state of a node after its request. Latency is normalized by the size of the prompt
+        and the response (seconds per 1000 characters), so short and long requests are comparable.
+        :param node: Node of the request
+        :param elapsed: Seconds of the request, None if the request failed
+        :param size: Characters of the prompt and the response
+        :return: None
+        """
+        with self._nodes_changed:
+            node.in_flight -= 1
+            self._nodes_changed.notify_all()
+            if elapsed is None:
+                node.failures += 1
+                node.unhealthy_until = time.monotonic() + self.cooldown
+                return
+
+            latency = elapsed / (1 + size / 1000)
+            node.latency = latency if node.latency is None else \
+                self.latency_alpha * latency + (1 - self.latency_alpha) * node.latency
+
+            now = time.monotonic()
+            others = [other.latency for other in self.nodes
+                      if other is not node and other.latency is not None and other.is_healthy(now)]
+            if others and node.latency > self.slow_factor * min(others):
+                print(f"LLM backend is slow ({node.latency:.2f}s per 1000 characters), "
+                      f"marked unhealthy: {node.backend.endpoint}")
+                node.unhealthy_until = now + self.cooldown
+
+    def _mark_stalled(self, node: _Node):
+        """
+        This function marks a node unhealthy when its request is not answered before the deadline. The request keeps
+        its slot until it is answered or it times out.
+        :param node: Node of the request
+        :return: None
+        """
+        print(f"LLM backend did not answer in {self.request_deadline:g}s, marked unhealthy: {node.backend.endpoint}")
+        with self._nodes_changed:
+            node.unhealthy_until = time.monotonic() + self.cooldown
+            self._nodes_changed.notify_all()
+
+    def _close_stalled(self, tokens: Iterator[str], node: _Node):
+        """
+        This function closes the token stream of a stalled node when its first token arrives or it fails, and releases
+        the slot of the node.
+        :param tokens: Token stream of the node
+        :param node: Node of the stream
+        :return: None
+        """
+        tokens.close()
+        self._release(node, None, 0)
+
+    def _send(self, node: _Node, request: Callable[[LLMBackend], Dict], prompt: str) -> Dict:
+        """
+        This function sends a request to a node and releases the slot of the node when it ends.
+        :param node: Node of the request
+        :param request: Function that sends the request to a backend
+        :param prompt: Prompt of the request
+        :return: Result of the request
+        """
+        start = time.monotonic()
+        try:
+            result = request(node.backend)
+        except Exception:
+            self._release(node, None, 0)
+            raise
+        self._release(node, time.monotonic() - start, len(prompt) + len(result.get("response", "")))
+        return result
+
+    def _call(self, request: Callable[[LLMBackend], Dict], prompt: str) -> Dict:
+        """
+        This function sends a request to the selected node, and to the next nodes if it fails or it is not answered
+        before the deadline. A stalled request is not cancelled, the first answer of the nodes is used.
+        :param request: Function that sends the request to a backend
+        :param prompt: Prompt of the request
+        :return: Result of the request
+        :raises: The error of the last node if every node fails
+        """
+        tried = []
+        pending: Dict[Future, _Node] = {}
+        last_error = None
+        while True:
+            # While a stalled request is pending, the next node is only used if it has a free slot
+            node = self._select(tried, block=not pending)
+            if node is not None:
+                tried.append(node)
+                pending[self._executor.submit(self._send, node, request, prompt)] = node
+            elif not pending:
+                raise last_error
+
+            # Waiting for a free slot is checked again every second while every node is full
+            timeout = self.request_deadline if node is not None or len(tried) == len(self.nodes) else 1.0
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if node is not None and len(tried) < len(self.nodes):
+                    self._mark_stalled(node)
+                continue
+
+            for future in done:
+                failed_node = pending.pop(future)
+                try:
+                    return future.result()
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"LLM backend failed, marked unhealthy: {failed_node.backend.endpoint} ({e})")
+                    last_error = e
+
+    def generate(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Dict:
+        """
+        This function generates the whole response of the prompt on the best node of the pool.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: (Optional) JSON schema the response is constrained to
+        :return: Result of the node, with the generated text in "response"
+        """
+        return self._call(lambda backend: backend.generate(model, prompt, options, schema), prompt)
+
+    def stream(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Iterator[str]:
+        """
+        This function generates the response of the prompt token by token on the best node of the pool. The request
+        fails over to the next node only until the first token, tokens are never sent twice.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: (Optional) JSON schema the response is constrained to
+        :return: Generated tokens
+        """
+        tried = []
+        last_error = None
+        while True:
+            node = self._select(tried)
+            if node is None:
+                raise last_error
+            tried.append(node)
+
+            start = time.monotonic()
+            size = len(prompt)
+            started = False
+            failed = True
+            tokens = node.backend.stream(model, prompt, options, schema)
+            # The first token is waited for in a thread, so a node that does not start answering before the deadline
+            # can be left for another node
+            first_token = self._executor.submit(next, tokens, None)
+            deadline = self.request_deadline if len(tried) < len(self.nodes) else None
+            if not wait([first_token], timeout=deadline).done:
+                self._mark_stalled(node)
+                first_token.add_done_callback(lambda _, tokens=tokens, node=node: self._close_stalled(tokens, node))
+                last_error = TimeoutError(f"LLM backend did not answer in {self.request_deadline:g}s")
+                continue
+            try:
+                token = first_token.result()
+                while token is not None:
+                    started = True
+                    size += len(token)
+                    yield token
+                    token = next(tokens, None)
+                failed = False
+            except GeneratorExit:
+                # The consumer stopped reading, e.g. the JSON object is complete
+                failed = False
+                raise
+            except (requests.exceptions.RequestException, ValueError) as e:
+                last_error = e
+            finally:
+                tokens.close()
+                self._release(node, None if failed else time.monotonic() - start, size)
+            if not failed:
+                return
+
+            print(f"LLM backend failed, marked unhealthy: {node.backend.endpoint} ({last_error})")
+            if started:
+                raise last_error
+
+    def warm_up(self, model: str) -> Dict:
+        """
+        This function loads the model on every node of the pool at the same time.
+        :param model: Model to load
+        :return: Longest load_duration of the nodes, and the result of each node
+        """
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as executor:
+            futures = [executor.submit(node.backend.warm_up, model) for node in self.nodes]
+        results = []
+        for node, future in zip(self.nodes, futures):
+            try:
+                results.append(future.result())
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"LLM backend could not be warmed up: {node.backend.endpoint} ({e})")
+                results.append({})
+        return {"load_duration": max(result.get("load_duration") or 0 for result in results), "nodes": results}
+
+    def release(self, model: str):
+        """
+        This function lets every node of the pool unload the model.
+        :param model: Model to unload
+        :return: None
+        """
+        for node in self.nodes:
+            try:
+                node.backend.release(model)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"LLM backend could not release the model: {node.backend.endpoint} ({e})")
+
+    def is_healthy(self) -> bool:
+        """
+        This function checks if any backend of the pool can answer requests.
+        :return: If a backend is reachable it returns True, otherwise it returns False
+        """
+        return any(node.backend.is_healthy() for node in self.nodes)
+
+    def get_stats(self) -> List[Dict]:
+        """
+        This function returns the state of each node.
+        :return: Endpoint, requests, failures, latency, in flight requests and health of each node
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{"endpoint": node.backend.endpoint, "requests": node.requests, "failures": node.failures,
+                     "latency": node.latency, "in_flight": node.in_flight, "healthy": node.is_healthy(now)}
+                    for node in self.nodes]
+
+    def close(self):
+        """
+        This function releases the resources of every backend.
+        :return: None
+        """
+        self._executor.shutdown(wait=False)
+        for node in self.nodes:
+            node.backend.close()
@@ -0,0 +1,69 @@
+import threading
+from typing import Dict
+
+# Durations of the Ollama responses are in nanoseconds
+_NANOSECONDS = 1e9
+
+
+class LLMMetrics:
+    def __init__(self, cold_start_threshold: float = 1.0):
+        """
+        Load and generation metrics of the LLM requests, collected from the metadata of the responses (load_duration,
+        prompt_eval_count, prompt_eval_duration, eval_count, eval_duration). Cold starts are the requests that loaded
+        the model.
+        :param cold_start_threshold: Requests with a longer load duration (seconds) are counted as cold starts
+        """
+        self.cold_start_threshold = cold_start_threshold
+        self.requests = 0
+        self.warm_ups = 0
+        self.cold_starts = 0
+        self.wall_time = 0.0
+        self.load_time = 0.0
+        self.prompt_eval_time = 0.0
+        self.eval_time = 0.0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, result: Dict, elapsed: float, warm_up: bool = False):
+        """
+        This function adds the metadata of a response to the metrics. Missing fields (e.g. streamed responses that are
+        closed before the last chunk) are counted as zero.
+        :param result: Result of the backend
+        :param elapsed: Seconds of the request
+        :param warm_up: The request is a warm-up request, not an analysis
+        :return: None
+        """
+        load_time = (result.get("load_duration") or 0) / _NANOSECONDS
+        with self._lock:
+            if warm_up:
+                self.warm_ups += 1
+            else:
+                self.requests += 1
+            self.cold_starts += load_time >= self.cold_start_threshold
+            self.wall_time += elapsed
+            self.load_time += load_time
+            self.prompt_eval_time += (result.get("prompt_eval_duration") or 0) / _NANOSECONDS
+            self.eval_time += (result.get("eval_duration") or 0) / _NANOSECONDS
+            self.prompt_tokens += result.get("prompt_eval_count") or 0
+            self.eval_tokens += result.get("eval_count") or 0
+
+    def get_stats(self) -> Dict:
+        """
+        This function returns the collected metrics.
+        :return: Request counts, cold starts, total seconds of loading, prompt evaluation and generation, token counts
+                 and generation speed
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "warm_ups": self.warm_ups,
+                "cold_starts": self.cold_starts,
+                "wall_time": round(self.wall_time, 3),
+                "load_time": round(self.load_time, 3),
+                "prompt_eval_time": round(self.prompt_eval_time, 3),
+                "eval_time": round(self.eval_time, 3),
+                "prompt_tokens": self.prompt_tokens,
+                "eval_tokens": self.eval_tokens,
+                "eval_tokens_per_second": round(self.eval_tokens / self.eval_time, 2) if self.eval_time else None
+            }
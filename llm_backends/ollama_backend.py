@@ -0,0 +1,120 @@
+import json
+from typing import Dict, Iterator
+from llm_backends.abstracts.http_backend import HTTPBackend
+
+
+class OllamaBackend(HTTPBackend):
+    name = "ollama"
+
+    def __init__(
+        self,
+        api_url: str,
+        model: str | None = None,
+        max_concurrency: int = 4,
+        timeout: float = 1200,
+        keep_alive: str | int | None = None     # How long the model stays loaded after a request, e.g. "30m", -1 forever
+    ):
+        """
+        Backend of an Ollama server.
+        :param api_url: URL of /api/generate
+        :param model: (Optional) Model of this server, overrides the model of the requests if it is given
+        :param max_concurrency: Maximum number of requests in flight to this server
+        :param timeout: Seconds to wait for the server
+        :param keep_alive: (Optional) How long the model stays loaded after each request, the server default (5
+                           minutes) if it is not given. Slow OCR steps of a batch can be longer than the default
+        """
+        super().__init__(api_url, model=model, max_concurrency=max_concurrency, timeout=timeout)
+        self.keep_alive = keep_alive
+
+    def _build_request(self, model: str, prompt: str, options: Dict, schema: Dict | None, stream: bool) -> Dict:
+        """
+        This function builds the body of a /api/generate request.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema of the response, it is sent as the format
+        :param stream: Streams the response
+        :return: Body of the request
+        """
+        data = {
+            "model": self.model or model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options
+        }
+        if schema is not None:
+            data["format"] = schema
+        if self.keep_alive is not None:
+            data["keep_alive"] = self.keep_alive
+        return data
+
+    def _health_url(self) -> str:
+        """
+        This function returns the URL of the local models of the server, listing them does not load any model.
+        :return: URL of /api/tags
+        """
+        return self.api_url.split("/api/")[0] + "/api/tags"
+
+    def warm_up(self, model: str) -> Dict:
+        """
+        This function loads the model with a request without a prompt, nothing is generated.
+        :param model: Model to load
+        :return: Result of the server with load_duration
+        """
+        data = {"model": self.model or model}
+        if self.keep_alive is not None:
+            data["keep_alive"] = self.keep_alive
+        response = self.session.post(self.api_url, json=data, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def release(self, model: str):
+        """
+        This function unloads the model from the memory of the server.
+        :param model: Model to unload
+        :return: None
+        """
+        response = self.session.post(self.api_url, json={"model": self.model or model, "keep_alive": 0},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+    def _generate(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> Dict:
+        """
+        This function generates the whole response of the prompt with /api/generate.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema the response is constrained to
+        :return: Result of the server, with the generated text in "response" and the durations and token counts
+        """
+        response = self.session.post(self.api_url, json=self._build_request(model, prompt, options, schema, False),
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _stream(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> Iterator[str]:
+        """
+        This function reads the NDJSON token stream of /api/generate. Closing the generator closes the connection, so
+        the server stops generating.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema the response is constrained to
+        :return: Generated tokens
+        """
+        with self.session.post(self.api_url, json=self._build_request(model, prompt, options, schema, True),
+                               timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+
+            # Reading each chunk as soon as it arrives instead of waiting for a full buffer
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise ValueError(f"LLM error: {chunk['error']}")
+
+                yield chunk.get('response', '')
+
+                if chunk.get('done'):
+                    break
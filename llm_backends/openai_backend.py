@@ -0,0 +1,99 @@
+import json
+from typing import Dict, Iterator
+from llm_backends.abstracts.http_backend import HTTPBackend
+
+# Generation options that are part of the OpenAI API, others (e.g. repeat_penalty) are not sent
+_OPENAI_OPTIONS = ["temperature", "top_p", "seed"]
+
+
+class OpenAICompatibleBackend(HTTPBackend):
+    name = "openai"
+
+    def _build_request(self, model: str, prompt: str, options: Dict, schema: Dict | None, stream: bool) -> Dict:
+        """
+        This function builds the body of a /v1/chat/completions request. The prompt is sent as a single user message.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema of the response, it is sent as the response format
+        :param stream: Streams the response
+        :return: Body of the request
+        """
+        data = {
+            "model": self.model or model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream
+        }
+        data.update({name: options[name] for name in _OPENAI_OPTIONS if name in options})
+        if schema is not None:
+            data["response_format"] = {"type": "json_schema", "json_schema": {"name": "output", "schema": schema}}
+        return data
+
+    def _health_url(self) -> str:
+        """
+        This function returns the URL of the models of the server.
+        :return: URL of /v1/models
+        """
+        return self.api_url.split("/v1/")[0] + "/v1/models"
+
+    def warm_up(self, model: str) -> Dict:
+        """
+        This function loads the model with a request of a single token, the API has no request to only load a model.
+        :param model: Model to load
+        :return: Empty result, the API does not report load durations
+        """
+        data = self._build_request(model, "Hi", {}, None, False)
+        data["max_tokens"] = 1
+        response = self.session.post(self.api_url, json=data, timeout=self.timeout)
+        response.raise_for_status()
+        return {}
+
+    def _generate(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> Dict:
+        """
+        This function generates the whole response of the prompt with /v1/chat/completions.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema the response is constrained to
+        :return: Result with the generated text in "response" and the token counts in the names of Ollama
+        """
+        response = self.session.post(self.api_url, json=self._build_request(model, prompt, options, schema, False),
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        if not result.get("choices"):
+            raise ValueError(f"Unexpected response format: {result}")
+
+        usage = result.get("usage") or {}
+        return {
+            "response": result["choices"][0]["message"].get("content") or "",
+            "model": result.get("model"),
+            "prompt_eval_count": usage.get("prompt_tokens"),
+            "eval_count": usage.get("completion_tokens")
+        }
+
+    def _stream(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> Iterator[str]:
+        """
+        This function reads the server-sent events of /v1/chat/completions. Closing the generator closes the
+        connection, so the server stops generating.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: JSON schema the response is constrained to
+        :return: Generated tokens
+        """
+        with self.session.post(self.api_url, json=self._build_request(model, prompt, options, schema, True),
+                               timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+
+            for line in response.iter_lines(chunk_size=None):
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[len(b"data:"):].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                if 'error' in chunk:
+                    raise ValueError(f"LLM error: {chunk['error']}")
+                if chunk.get("choices"):
+                    yield chunk["choices"][0].get("delta", {}).get("content") or ""
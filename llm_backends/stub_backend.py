@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Callable, Dict, Iterator, List
+from llm_backends.abstracts.llm_backend import LLMBackend
+
+
+class StubBackend(LLMBackend):
+    name = "stub"
+
+    def __init__(
+        self,
+        responder: Callable[[str, Dict | None], str] | str = "{}",  # Response of the prompts, or a function of the prompt and the schema
+        latency: float = 0.0,   # Seconds of each request
+        max_concurrency: int = 4
+    ):
+        """
+        In-process backend that answers prompts without an LLM server, for tests and benchmarks of the pipeline.
+        :param responder: Response of every prompt, or a function that returns the response of a prompt and its schema.
+                          Exceptions of the function are raised like server errors
+        :param latency: Seconds of each request
+        :param max_concurrency: Maximum number of requests in flight
+        """
+        self.responder = responder
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self.requests: List[Dict] = []  # Requests in the order they are received
+        self._lock = threading.Lock()
+
+    def _respond(self, model: str, prompt: str, options: Dict, schema: Dict | None) -> str:
+        """
+        This function records the request and returns its response.
+        :param model: Model of the request
+        :param prompt: Prompt of the request
+        :param options: Generation options
+        :param schema: JSON schema of the response
+        :return: Response of the prompt
+        """
+        with self._lock:
+            self.requests.append({"model": model, "prompt": prompt, "options": options, "schema": schema})
+        if self.latency:
+            time.sleep(self.latency)
+        if callable(self.responder):
+            return self.responder(prompt, schema)
+        return self.responder
+
+    def generate(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Dict:
+        """
+        This function returns the response of the prompt.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: (Optional) JSON schema of the response
+        :return: Result with the response in "response"
+        """
+        return {"response": self._respond(model, prompt, options, schema), "model": model, "done": True}
+
+    def stream(self, model: str, prompt: str, options: Dict, schema: Dict | None = None) -> Iterator[str]:
+        """
+        This function returns the response of the prompt character by character.
+        :param model: Model of the request
+        :param prompt: Prompt ready to be given to the LLM
+        :param options: Generation options
+        :param schema: (Optional) JSON schema of the response
+        :return: Characters of the response
+        """
+        yield from self._respond(model, prompt, options, schema)
@@ -1,60 +1,121 @@
+import argparse
+import json
+import os
+from typing import List
+from analyzers.cascade_analyzer import CascadeInvoiceAnalyzer
 from analyzers.invoice_analyzer import InvoiceAnalyzer
-from readers.reader_factory import ReaderFactory
-from utils import *
-from validators.invoice_validator import InvoiceValidator
+from analyzers.template_analyzer import TemplateAnalyzer
+from caches.disk_cache import DiskCache
+from pipelines.invoice_pipeline import InvoicePipeline
+from utils import PREPROCESSING_PROFILES, DEFAULT_PREPROCESSING_PROFILE
+from llm_backends.llm_backend_factory import LLMBackendFactory, DEFAULT_LLM_BACKEND
+from ocr_engines.ocr_engine_factory import OCREngineFactory, DEFAULT_OCR_ENGINE
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    This function parses command line arguments of the invoice pipeline.
+    :param argv: (Optional) Arguments to parse, defaults to sys.argv
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Reads, analyzes and validates PDF invoices.")
+    parser.add_argument("--invoices", default="./invoices", help="Folder of the PDF invoices")
+    parser.add_argument("--raw-ocr-outputs", default="outputs/raw_ocr_outputs")
+    parser.add_argument("--analyzed-outputs", default="outputs/analyzed_outputs")
+    parser.add_argument("--final-outputs", default="outputs/final_outputs")
+    # Ground truth POs for validating invoices, by JSON filename of the invoices
+    parser.add_argument("--ground-truth", default="ground_truth_pos.json", help="JSON file of the ground truth POs")
+    parser.add_argument("--model", default="mistral:7b-instruct", help="Local LLM to analyze invoices")
+    parser.add_argument("--cascade-models", nargs="+", default=None,
+                        help="Models from the smallest to the largest, invoices are escalated to the next model only "
+                             "if the result is invalid or fails the arithmetic checks. Used instead of --model")
+    parser.add_argument("--backend", default=DEFAULT_LLM_BACKEND, choices=LLMBackendFactory.names(),
+                        help="API of the LLM servers, openai is any OpenAI-compatible local server")
+    parser.add_argument("--api-url", nargs="+", default=None,
+                        help="Generation endpoints of the LLM servers, requests are load balanced across them")
+    parser.add_argument("--keep-alive", default="30m",
+                        help="How long Ollama keeps the model loaded between requests, e.g. 30m, -1 for forever")
+    parser.add_argument("--no-warm-up", action="store_true", help="Does not load the model before the first invoice")
+    parser.add_argument("--prompt", default=None, help="Name of a template in analyzers/prompts, e.g. mvp_prompt")
+    parser.add_argument("--stream", action="store_true", help="Streams LLM responses and stops at the end of the JSON")
+    parser.add_argument("--no-structured-output", action="store_true",
+                        help="Does not send the JSON schema as the response format, for servers without structured output")
+    parser.add_argument("--templates", action="store_true",
+                        help="Analyzes fixed layout invoices with templates and uses the LLM only as a fallback")
+    parser.add_argument("--chunking", action="store_true",
+                        help="Analyzes long invoices as header/footer and line item chunks concurrently")
+    parser.add_argument("--max-chunk-chars", type=int, default=3000, help="Maximum characters of a line item chunk")
+    parser.add_argument("--read-workers", type=int, default=2, help="Processes that read/OCR invoices")
+    parser.add_argument("--ocr-workers", type=int, default=1, help="OCR processes of each read worker")
+    parser.add_argument("--preprocessing", default=DEFAULT_PREPROCESSING_PROFILE,
+                        choices=sorted(PREPROCESSING_PROFILES), help="Image preprocessing profile before OCR")
+    parser.add_argument("--ocr-engine", default=DEFAULT_OCR_ENGINE, choices=OCREngineFactory.names(),
+                        help="tesserocr keeps Tesseract loaded in each worker, pytesseract starts it for every page")
+    parser.add_argument("--text-workers", type=int, default=1,
+                        help="Processes of each read worker that extract page ranges of large native PDFs")
+    parser.add_argument("--analyze-concurrency", type=int, default=2, help="Requests in flight to the LLM server")
+    parser.add_argument("--export-workers", type=int, default=2, help="Threads that validate and export invoices")
+    parser.add_argument("--queue-size", type=int, default=4, help="Invoices waiting between two stages")
+    parser.add_argument("--no-cache", action="store_true", help="Disables reader and LLM caches")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None):
+    args = parse_args(argv)
+
+    ground_truth_pos = {}
+    if os.path.exists(args.ground_truth):
+        with open(args.ground_truth, "r", encoding="utf-8") as f:
+            ground_truth_pos = json.load(f)
+
+    # LLM outputs are cached by model, prompt and options for a week
+    analyzer_cache = None
+    if not args.no_cache:
+        analyzer_cache = DiskCache('.cache/llm_responses', max_entries=10000, ttl_seconds=7 * 24 * 60 * 60)
+    keep_alive = int(args.keep_alive) if args.keep_alive.lstrip("-").isdigit() else args.keep_alive
+    backend = LLMBackendFactory.create_backend(args.backend, args.api_url, max_concurrency=args.analyze_concurrency,
+                                               keep_alive=keep_alive)
+    analyzer_kwargs = dict(backend=backend, seed=42, cache=analyzer_cache, max_concurrency=args.analyze_concurrency,
+                           stream=args.stream, prompt_name=args.prompt, chunking=args.chunking,
+                           max_chunk_chars=args.max_chunk_chars, structured_output=not args.no_structured_output)
+    if args.cascade_models:
+        analyzer = CascadeInvoiceAnalyzer.from_models(args.cascade_models, **analyzer_kwargs)
+    else:
+        analyzer = InvoiceAnalyzer(model=args.model, **analyzer_kwargs)
+
+    llm_analyzer = analyzer
+
+    # Fixed layout invoices skip the LLM, others are analyzed by the LLM analyzer
+    if args.templates:
+        analyzer = TemplateAnalyzer(fallback=analyzer)
+
+    pipeline = InvoicePipeline(
+        raw_ocr_outputs_folder_path=args.raw_ocr_outputs,
+        analyzed_outputs_folder_path=args.analyzed_outputs,
+        final_outputs_path=args.final_outputs,
+        ground_truth_pos=ground_truth_pos,
+        analyzer=analyzer,
+        read_workers=args.read_workers,
+        ocr_workers=args.ocr_workers,
+        preprocessing_profile=args.preprocessing,
+        ocr_engine=args.ocr_engine,
+        text_workers=args.text_workers,
+        analyze_concurrency=args.analyze_concurrency,
+        export_workers=args.export_workers,
+        queue_size=args.queue_size,
+        use_cache=not args.no_cache,
+        warm_up=not args.no_warm_up
+    )
+    statuses = pipeline.run_folder(args.invoices)
+    analyzer.close()
+    print(f"LLM metrics: {json.dumps(llm_analyzer.get_metrics())}")
+    if args.cascade_models:
+        print(f"Cascade tiers: {json.dumps(llm_analyzer.get_stats())}")
+
+    for status in statuses:
+        print(f"{status['file_path']}: {status['status']}" + (f" ({status['message']})" if status.get('message') else ""))
+    print('=' * 50)
+
 
 if __name__ == '__main__':
-    invoices_folder_path = './invoices'
-    raw_ocr_outputs_folder_path = 'outputs/raw_ocr_outputs'
-    analyzed_outputs_folder_path = 'outputs/analyzed_outputs'
-    final_outputs_path = 'outputs/final_outputs'
-
-    # Ground truth POs for validating invoices. I wrote these by looking at myself
-    ground_truth_pos = {
-        "20250221092842541.json": [],
-        "20250221125114588.json": ["PO-135298"],
-        "Invaoice_2.json": ["PO-526365", "PO-360206", "PO-620087", "PO-756014", "PO-842742", "PO-362820"]
-    }
-
-    for filename in os.listdir(invoices_folder_path):
-        print(f'{filename} is processing!')
-        if filename.endswith('.pdf'):
-            file_path = os.path.join(invoices_folder_path, filename)
-
-            # Reader
-            print('READING')
-            reader = ReaderFactory.create_reader(file_path)
-            result = reader.read_content()
-
-            # Exporting result of the first step of the case
-            export_outputs_as_json(result, filename, raw_ocr_outputs_folder_path)
-
-            text = result['content']['text']
-
-            # Analyzer
-            print('ANALYZING')
-            analyzer = InvoiceAnalyzer(seed=42)
-            result = analyzer.analyze_invoice(text)
-
-            is_valid, message = analyzer.validate_invoice_json(result)
-            if is_valid:
-                print("Success! JSON output:")
-                print(json.dumps(result, indent=2, ensure_ascii=False))
-
-                # Exporting result of the second step of the case
-                export_outputs_as_json(result, filename, analyzed_outputs_folder_path)
-
-                # Validator
-                print('VALIDATING')
-                filename = filename.replace('.pdf', '.json')
-                validator = InvoiceValidator(result, ground_truth_pos[filename])
-                analyzed_json = validator.generate_report(filename)
-                print(analyzed_json)
-
-                # Exporting result of the third step of the case
-                export_outputs_as_json(analyzed_json, filename, final_outputs_path)
-            else:
-                print(f"Validation error: {message}")
-                print("Raw output:", json.dumps(result, indent=2, ensure_ascii=False))
-
-            print('=' * 50)
\ No newline at end of file
+    main()
@@ -0,0 +1,47 @@
+from abc import ABC, abstractmethod
+from typing import Dict
+import numpy as np
+from PIL import Image
+
+
+class OCREngine(ABC):
+    # Name of the engine in the reader parameters and the CLI
+    name = ""
+
+    @staticmethod
+    @abstractmethod
+    def is_available() -> bool:
+        """
+        This function checks if the engine and its Tesseract installation can be used in the current environment.
+        :return: If the engine can be used it returns True, otherwise it returns False
+        """
+        pass
+
+    @abstractmethod
+    def image_to_data(self, image: Image.Image | np.ndarray, ocr_config: str,
+                      dpi: int | None = None) -> Dict[str, list]:
+        """
+        This function performs OCR on the given image and returns the recognized boxes.
+        :param image: A PIL.Image object or NumPy array containing the image to be processed
+        :param ocr_config: Tesseract OCR configuration string
+        :param dpi: (Optional) Render resolution of the image, Tesseract guesses it if it is not given
+        :return: Boxes in the format of pytesseract.image_to_data dictionary output (level, block_num, par_num,
+                 line_num, word_num, left, top, width, height, conf, text)
+        """
+        pass
+
+    def load(self, ocr_config: str):
+        """
+        This function loads the model of the given configuration before the first image, e.g. when an OCR worker
+        process starts. Engines without a model to load do nothing.
+        :param ocr_config: Tesseract OCR configuration string
+        :return: None
+        """
+        pass
+
+    def close(self):
+        """
+        This function releases the resources of the engine.
+        :return: None
+        """
+        pass
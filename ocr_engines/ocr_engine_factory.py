@@ -0,0 +1,74 @@
+import threading
+from functools import lru_cache
+from typing import Dict, List, Type
+from ocr_engines.abstracts.ocr_engine import OCREngine
+from ocr_engines.pytesseract_engine import PytesseractEngine
+from ocr_engines.tesserocr_engine import TesserocrEngine
+
+# Engines in the order of preference for "auto", the in-process engine is preferred
+OCR_ENGINES: Dict[str, Type[OCREngine]] = {
+    TesserocrEngine.name: TesserocrEngine,
+    PytesseractEngine.name: PytesseractEngine,
+}
+DEFAULT_OCR_ENGINE = "auto"
+
+# Tesseract APIs are not thread safe, every thread of every process has its own engines
+_local_engines = threading.local()
+
+
+class OCREngineFactory:
+    @staticmethod
+    def names() -> List[str]:
+        """
+        This function returns the names that can be given to get_engine.
+        :return: Names of the engines
+        """
+        return [DEFAULT_OCR_ENGINE] + list(OCR_ENGINES)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def resolve(name: str = DEFAULT_OCR_ENGINE) -> str | None:
+        """
+        This function finds the engine that will be used for the given name. Availability is checked once per process.
+        :param name: Name of the engine, "auto" picks the first available engine
+        :return: Name of the available engine, None if it is not available
+        """
+        if name == DEFAULT_OCR_ENGINE:
+            for engine_name, engine_class in OCR_ENGINES.items():
+                if engine_class.is_available():
+                    return engine_name
+            return None
+        if name not in OCR_ENGINES:
+            raise ValueError(f"Unknown OCR engine: {name}")
+        return name if OCR_ENGINES[name].is_available() else None
+
+    @staticmethod
+    def is_available(name: str = DEFAULT_OCR_ENGINE) -> bool:
+        """
+        This function checks if OCR can be performed with the given engine.
+        :param name: Name of the engine
+        :return: If the engine can be used it returns True, otherwise it returns False
+        """
+        return OCREngineFactory.resolve(name) is not None
+
+    @staticmethod
+    def get_engine(name: str = DEFAULT_OCR_ENGINE) -> OCREngine:
+        """
+        This function returns the engine of the current worker. The engine is created once and reused for every page
+        the worker reads, so the language model is not loaded again for each page.
+        :param name: Name of the engine
+        :return: OCR engine
+        """
+        engine_name = OCREngineFactory.resolve(name)
+        if engine_name is None:
+            # Tesseract is missing, the pytesseract engine reports the error on the first OCR call
+            engine_name = PytesseractEngine.name
+
+        engines = getattr(_local_engines, "engines", None)
+        if engines is None:
+            engines = _local_engines.engines = {}
+        engine = engines.get(engine_name)
+        if engine is None:
+            engine = OCR_ENGINES[engine_name]()
+            engines[engine_name] = engine
+        return engine
@@ -0,0 +1,36 @@
+from typing import Dict
+import numpy as np
+import pytesseract
+from PIL import Image
+from ocr_engines.abstracts.ocr_engine import OCREngine
+
+
+class PytesseractEngine(OCREngine):
+    name = "pytesseract"
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        This function checks if the tesseract executable can be run. Only the version of the executable is asked, no
+        OCR is performed.
+        :return: If tesseract is installed it returns True, otherwise it returns False
+        """
+        try:
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def image_to_data(self, image: Image.Image | np.ndarray, ocr_config: str,
+                      dpi: int | None = None) -> Dict[str, list]:
+        """
+        This function performs OCR with the tesseract executable. A new tesseract process is started and the image is
+        written to a temporary file for every call, so it is the fallback of the in-process engine.
+        :param image: A PIL.Image object or NumPy array containing the image to be processed
+        :param ocr_config: Tesseract OCR configuration string
+        :param dpi: (Optional) Render resolution of the image, the --dpi option of the configuration wins if it is given
+        :return: Boxes in the format of pytesseract.image_to_data dictionary output
+        """
+        if dpi is not None and "--dpi" not in ocr_config:
+            ocr_config = f"{ocr_config} --dpi {dpi}"
+        return pytesseract.image_to_data(image, config=ocr_config, output_type=pytesseract.Output.DICT)
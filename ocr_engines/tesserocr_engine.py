@@ -0,0 +1,150 @@
+import shlex
+from typing import Dict, Tuple
+import numpy as np
+from PIL import Image
+from ocr_engines.abstracts.ocr_engine import OCREngine
+
+
+class TesserocrEngine(OCREngine):
+    name = "tesserocr"
+
+    # Columns of the TSV output of Tesseract, same as the keys of pytesseract.image_to_data dictionary output
+    tsv_columns = ["level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                   "left", "top", "width", "height", "conf", "text"]
+
+    def __init__(self):
+        # Tesseract API of each (language, engine mode, tessdata path, variables), the language model is loaded only
+        # once. Variables stay set on an API, so APIs with different -c options are not shared
+        self._apis: Dict[Tuple[str, int, str | None, Tuple[Tuple[str, str], ...]], object] = {}
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        This function checks if tesserocr bindings are installed and Tesseract has at least one language model.
+        :return: If the engine can be used it returns True, otherwise it returns False
+        """
+        try:
+            import tesserocr
+            _, languages = tesserocr.get_languages()
+            return len(languages) > 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def parse_config(ocr_config: str) -> Tuple[str, int, int, str | None, Dict[str, str]]:
+        """
+        This function parses the command line style configuration of Tesseract (--oem, --psm, -l, --tessdata-dir and
+        -c options), so the same configuration string works for both engines.
+        :param ocr_config: Tesseract OCR configuration string
+        :return: Language, engine mode, page segmentation mode, tessdata path and variables
+        """
+        language, oem, psm, tessdata_path, variables = "eng", 3, 3, None, {}
+        tokens = shlex.split(ocr_config)
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            value = tokens[index + 1] if index + 1 < len(tokens) else ""
+            if token == "--oem":
+                oem = int(value)
+            elif token == "--psm":
+                psm = int(value)
+            elif token == "-l":
+                language = value
+            elif token == "--tessdata-dir":
+                tessdata_path = value
+            elif token == "-c" and "=" in value:
+                key, variable_value = value.split("=", 1)
+                variables[key] = variable_value
+            else:
+                index += 1
+                continue
+            index += 2
+        return language, oem, psm, tessdata_path, variables
+
+    def _get_api(self, language: str, oem: int, tessdata_path: str | None, variables: Dict[str, str]):
+        """
+        This function returns the Tesseract API of the given language, engine mode and variables, the API is created
+        at the first use and reused for every following page with the same configuration.
+        :param language: Language of the model
+        :param oem: OCR engine mode
+        :param tessdata_path: (Optional) Folder of the language models
+        :param variables: Tesseract variables of the -c options
+        :return: Tesseract API
+        """
+        key = (language, oem, tessdata_path, tuple(sorted(variables.items())))
+        api = self._apis.get(key)
+        if api is None:
+            import tesserocr
+            kwargs = {"lang": language, "oem": tesserocr.OEM(oem), "variables": variables}
+            if tessdata_path is not None:
+                kwargs["path"] = tessdata_path
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._apis[key] = api
+        return api
+
+    def load(self, ocr_config: str):
+        """
+        This function creates the Tesseract API of the given configuration, so the language model is loaded before the
+        first image.
+        :param ocr_config: Tesseract OCR configuration string
+        :return: None
+        """
+        language, oem, _, tessdata_path, variables = self.parse_config(ocr_config)
+        self._get_api(language, oem, tessdata_path, variables)
+
+    def image_to_data(self, image: Image.Image | np.ndarray, ocr_config: str,
+                      dpi: int | None = None) -> Dict[str, list]:
+        """
+        This function performs OCR in the current process with the loaded Tesseract API. Grayscale arrays are given to
+        Tesseract as raw pixels, without writing a temporary image file.
+        :param image: A PIL.Image object or NumPy array containing the image to be processed
+        :param ocr_config: Tesseract OCR configuration string
+        :param dpi: (Optional) Render resolution of the image. Raw pixels have no resolution, Tesseract would assume
+                    70 DPI without it
+        :return: Boxes in the format of pytesseract.image_to_data dictionary output
+        """
+        import tesserocr
+
+        language, oem, psm, tessdata_path, variables = self.parse_config(ocr_config)
+        api = self._get_api(language, oem, tessdata_path, variables)
+        api.SetPageSegMode(tesserocr.PSM(psm))
+
+        if isinstance(image, np.ndarray) and image.ndim == 2:
+            pixels = np.ascontiguousarray(image, dtype=np.uint8)
+            height, width = pixels.shape
+            api.SetImageBytes(pixels.tobytes(), width, height, 1, width)
+        else:
+            api.SetImage(image if isinstance(image, Image.Image) else Image.fromarray(image))
+        # Setting an image resets the resolution, so it is set after the image
+        if dpi is not None:
+            api.SetSourceResolution(dpi)
+
+        api.Recognize()
+        return self.parse_tsv(api.GetTSVText(0))
+
+    @classmethod
+    def parse_tsv(cls, tsv_text: str) -> Dict[str, list]:
+        """
+        This function converts the TSV output of Tesseract to the dictionary format of pytesseract.
+        :param tsv_text: TSV output of Tesseract without header
+        :return: Boxes in the format of pytesseract.image_to_data dictionary output
+        """
+        data = {column: [] for column in cls.tsv_columns}
+        for row in tsv_text.splitlines():
+            values = row.split("\t")
+            if len(values) < 11:
+                continue
+            for column, value in zip(cls.tsv_columns[:10], values[:10]):
+                data[column].append(int(value))
+            data["conf"].append(float(values[10]))
+            data["text"].append(values[11] if len(values) > 11 else "")
+        return data
+
+    def close(self):
+        """
+        This function releases the loaded Tesseract APIs.
+        :return: None
+        """
+        for api in self._apis.values():
+            api.End()
+        self._apis = {}
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import multiprocessing.util
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
+from analyzers.abstracts.analyzer import Analyzer
+from analyzers.invoice_analyzer import InvoiceAnalyzer
+from caches.disk_cache import DiskCache
+from readers.ocr_pool import OCRPool
+from readers.reader_cache import ReaderCache
+from readers.reader_factory import ReaderFactory
+from utils import export_outputs_as_json, DEFAULT_PREPROCESSING_PROFILE
+from ocr_engines.ocr_engine_factory import DEFAULT_OCR_ENGINE
+from validators.invoice_validator import InvoiceValidator
+
+# OCR pool of the current read worker process, it is shared by every invoice the process reads
+_ocr_pool: OCRPool | None = None
+
+
+def _init_read_worker(ocr_workers: int, ocr_engine: str):
+    """
+    This function prepares a worker process of the read stage when it starts. The OCR pool of the process is created
+    once, so its workers load the OCR model once for the whole run instead of once per invoice.
+    :param ocr_workers: Number of processes used for OCR of each invoice
+    :param ocr_engine: OCR engine of the invoices
+    :return: None
+    """
+    global _ocr_pool
+    if ocr_workers > 1:
+        _ocr_pool = OCRPool(ocr_workers, ocr_engine)
+        # Worker processes do not run the exit handlers of the interpreter, the OCR workers are stopped by a finalizer.
+        # It runs before the finalizers of the queues of the pool, the queues are needed to stop the workers
+        multiprocessing.util.Finalize(_ocr_pool, _ocr_pool.close, exitpriority=100)
+
+
+def _read_invoice(file_path: str, ocr_workers: int, preprocessing_profile: str, ocr_engine: str, text_workers: int,
+                  use_cache: bool) -> Dict[str, Any]:
+    """
+    This function reads a single invoice. It is a module level function, so it can be sent to the worker processes
+    of the read stage. Scanned pages are OCR'd by the OCR pool of the worker process.
+    :param file_path: Path of the invoice
+    :param ocr_workers: Number of processes used for OCR of the invoice
+    :param preprocessing_profile: Image preprocessing profile before OCR
+    :param ocr_engine: OCR engine of the invoice
+    :param text_workers: Number of processes that read page ranges of the invoice if it is a large native PDF
+    :param use_cache: If it is True, reader outputs are read from and written to the reader cache
+    :return: A dictionary containing data read from the file
+    """
+    reader = ReaderFactory.create_reader(file_path, ocr_workers=ocr_workers, preprocessing_profile=preprocessing_profile,
+                                         ocr_engine=ocr_engine, text_workers=text_workers, ocr_pool=_ocr_pool)
+    try:
+        if use_cache:
+            return ReaderCache().read_content(reader)
+        return reader.read_content()
+    finally:
+        reader.close()
+
+
+class InvoicePipeline:
+    def __init__(
+        self,
+        raw_ocr_outputs_folder_path: str = 'outputs/raw_ocr_outputs',
+        analyzed_outputs_folder_path: str = 'outputs/analyzed_outputs',
+        final_outputs_path: str = 'outputs/final_outputs',
+        ground_truth_pos: Dict[str, List[str]] | None = None,   # Ground truth POs of the invoices by JSON filename
+        analyzer: Analyzer | None = None,
+        read_workers: int = 2,      # Processes of the read (OCR) stage
+        ocr_workers: int = 1,       # OCR processes of each read worker
+        preprocessing_profile: str = DEFAULT_PREPROCESSING_PROFILE,     # Image preprocessing profile before OCR
+        ocr_engine: str = DEFAULT_OCR_ENGINE,   # OCR engine: tesserocr, pytesseract or auto
+        text_workers: int = 1,      # Text extraction processes of each read worker for large native PDFs
+        analyze_concurrency: int = 2,   # Requests in flight to the LLM server
+        export_workers: int = 2,    # Threads of the validate/export stage
+        queue_size: int = 4,        # Maximum number of invoices waiting between two stages
+        use_cache: bool = True,
+        warm_up: bool = True    # Loads the model of the analyzer while the first invoices are read
+    ):
+        self.raw_ocr_outputs_folder_path = raw_ocr_outputs_folder_path
+        self.analyzed_outputs_folder_path = analyzed_outputs_folder_path
+        self.final_outputs_path = final_outputs_path
+        self.ground_truth_pos = ground_truth_pos or {}
+        self.read_workers = read_workers
+        self.ocr_workers = ocr_workers
+        self.preprocessing_profile = preprocessing_profile
+        self.ocr_engine = ocr_engine
+        self.text_workers = text_workers
+        self.analyze_concurrency = analyze_concurrency
+        self.export_workers = export_workers
+        self.queue_size = queue_size
+        self.use_cache = use_cache
+        self.warm_up = warm_up
+
+        # Analyzers created by the pipeline are closed at the end of each run, given analyzers are closed by their owner
+        self._owns_analyzer = analyzer is None
+        if analyzer is None:
+            cache = None
+            if use_cache:
+                cache = DiskCache('.cache/llm_responses', max_entries=10000, ttl_seconds=7 * 24 * 60 * 60)
+            analyzer = InvoiceAnalyzer(seed=42, cache=cache, max_concurrency=analyze_concurrency)
+        self.analyzer = analyzer
+
+    def run_folder(self, invoices_folder_path: str) -> List[Dict[str, Any]]:
+        """
+        This function processes every PDF in the given folder.
+        :param invoices_folder_path: Folder of the invoices
+        :return: Status of each invoice
+        """
+        file_paths = [os.path.join(invoices_folder_path, filename)
+                      for filename in sorted(os.listdir(invoices_folder_path)) if filename.endswith('.pdf')]
+        return self.run(file_paths)
+
+    def run(self, file_paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        This function processes the given invoices with read -> analyze -> validate/export stages. Stages work at the
+        same time and are connected with bounded queues, so the LLM is not idle during OCR and the CPU is not idle
+        while waiting for the LLM.
+        :param file_paths: Paths of the invoices
+        :return: Status of each invoice in the given order
+        """
+        return asyncio.run(self.run_async(file_paths))
+
+    async def run_async(self, file_paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        This function is the asyncio version of run.
+        :param file_paths: Paths of the invoices
+        :return: Status of each invoice in the given order
+        """
+        loop = asyncio.get_running_loop()
+        file_paths = list(file_paths)
+        statuses: List[Dict[str, Any]] = [{"file_path": file_path, "status": "pending"} for file_path in file_paths]
+
+        path_queue = asyncio.Queue()
+        analyze_queue = asyncio.Queue(maxsize=self.queue_size)
+        export_queue = asyncio.Queue(maxsize=self.queue_size)
+        for index, file_path in enumerate(file_paths):
+            path_queue.put_nowait((index, file_path))
+
+        # Model load time overlaps with OCR of the first invoices instead of delaying the first analysis
+        warm_up_task = loop.run_in_executor(None, self.analyzer.warm_up) if self.warm_up and file_paths else None
+
+        with ProcessPoolExecutor(max_workers=self.read_workers, initializer=_init_read_worker,
+                                 initargs=(self.ocr_workers, self.ocr_engine)) as read_executor, \
+                ThreadPoolExecutor(max_workers=self.export_workers) as export_executor:
+
+            async def read_worker():
+                while not path_queue.empty():
+                    index, file_path = path_queue.get_nowait()
+                    filename = os.path.basename(file_path)
+                    print(f'READING {filename}')
+                    try:
+                        result = await loop.run_in_executor(read_executor, _read_invoice, file_path,
+                                                            self.ocr_workers, self.preprocessing_profile,
+                                                            self.ocr_engine, self.text_workers, self.use_cache)
+                    except Exception as e:
+                        result = {"success": False, "error": str(e)}
+
+                    if not result or not result.get("success"):
+                        statuses[index].update({"status": "read_failed", "message": (result or {}).get("error")})
+                        continue
+
+                    # Exporting result of the first step of the case, a failed export must not stop the read stage
+                    try:
+                        await loop.run_in_executor(export_executor, export_outputs_as_json, result, filename,
+                                                   self.raw_ocr_outputs_folder_path)
+                    except Exception as e:
+                        statuses[index].update({"status": "export_failed", "message": str(e)})
+                        continue
+                    await analyze_queue.put((index, filename, result['content']))
+
+            async def analyze_worker():
+                while True:
+                    item = await analyze_queue.get()
+                    if item is None:
+                        return
+                    index, filename, content = item
+                    print(f'ANALYZING {filename}')
+                    # Validation is in the try block too, every item must end with a status
+                    try:
+                        result = await self.analyzer.analyze_content_async(content)
+                        is_valid, message = self.analyzer.validate_invoice_json(result)
+                    except Exception as e:
+                        statuses[index].update({"status": "analyze_failed", "message": str(e)})
+                        continue
+
+                    if not is_valid:
+                        print(f"Validation error ({filename}): {message}")
+                        print("Raw output:", json.dumps(result, indent=2, ensure_ascii=False))
+                        statuses[index].update({"status": "invalid_json", "message": message})
+                        continue
+                    await export_queue.put((index, filename, result))
+
+            async def export_worker():
+                while True:
+                    item = await export_queue.get()
+                    if item is None:
+                        return
+                    index, filename, result = item
+                    print(f'VALIDATING {filename}')
+                    try:
+                        await loop.run_in_executor(export_executor, self._validate_and_export, filename, result)
+                        statuses[index].update({"status": "done"})
+                    except Exception as e:
+                        statuses[index].update({"status": "export_failed", "message": str(e)})
+
+            read_tasks = [asyncio.create_task(read_worker()) for _ in range(self.read_workers)]
+            analyze_tasks = [asyncio.create_task(analyze_worker()) for _ in range(self.analyze_concurrency)]
+            export_tasks = [asyncio.create_task(export_worker()) for _ in range(self.export_workers)]
+
+            # Every stage is stopped with one signal per worker after the previous stage is finished
+            await asyncio.gather(*read_tasks)
+            for _ in analyze_tasks:
+                await analyze_queue.put(None)
+            await asyncio.gather(*analyze_tasks)
+            for _ in export_tasks:
+                await export_queue.put(None)
+            await asyncio.gather(*export_tasks)
+            if warm_up_task is not None:
+                # Every invoice has its status already, a warm-up error is only logged
+                try:
+                    await warm_up_task
+                except Exception as e:
+                    print(f"Warm-up error: {e}")
+
+        if self._owns_analyzer:
+            self.analyzer.close()
+        return statuses
+
+    def _validate_and_export(self, filename: str, analyzed_json: Dict):
+        """
+        This function validates an analyzed invoice and exports outputs of the analyze and validate steps.
+        :param filename: Filename of the invoice
+        :param analyzed_json: Output of the analyzer
+        :return: None
+        """
+        # Exporting result of the second step of the case
+        export_outputs_as_json(analyzed_json, filename, self.analyzed_outputs_folder_path)
+
+        json_filename = os.path.splitext(filename)[0] + '.json'
+        validator = InvoiceValidator(analyzed_json, self.ground_truth_pos.get(json_filename, []))
+        final_json = validator.generate_report(json_filename)
+
+        # Exporting result of the third step of the case
+        export_outputs_as_json(final_json, json_filename, self.final_outputs_path)
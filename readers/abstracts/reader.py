@@ -1,29 +1,96 @@
-import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator
 from readers.pdf_type import PDFType
+from readers.pdf_document import PDFDocument
 
 
 class Reader(ABC):
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, document: PDFDocument | None = None):
         self.file_path = file_path
+        # Shared handle of the file, the factory passes the same handle to the detector and the reader
+        self.document = document or PDFDocument(file_path)
         self.pdf_type: PDFType | None = None
+        self.method = ''
         self.raw_text = ''
         self.pages_content = []
 
     @abstractmethod
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
+        """
+        This function reads the file page by page and yields the result of each page as soon as it is ready. Only the
+        page that is being processed is kept in memory, so memory usage does not grow with the page count.
+        :return: Iterator of dictionaries containing data read from each page
+        """
+        pass
+
     def read_content(self) -> Dict[str, Any]:
         """
         This function reads content from native or scanned PDFs. If the file is scanned, this function performs OCR.
+        It consumes iter_pages and combines the pages.
         :return: A dictionary containing data read from a file
         """
-        pass
+        if not self.validate_file():
+            return {
+                'success': False,
+                'error': 'Invalid file'
+            }
+
+        try:
+            return {
+                "success": True,
+                'filename': self.file_path,
+                "pdf_type": self.pdf_type.value,
+                "content": self._collect_pages(self.iter_pages(), self.method),
+            }
+        except Exception as e:
+            print(f"PDF reading error: {e}")
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _collect_pages(pages: Iterable[Dict[str, Any]], method: str) -> Dict[str, Any]:
+        """
+        This function combines page results into the content of the whole file.
+        :param pages: Page results in page order
+        :param method: Name of the method that read the pages
+        :return: A dictionary containing text and pages of the file
+        """
+        pages_content = []
+        page_texts = []
+
+        for page_info in pages:
+            pages_content.append(page_info)
+            page_texts.append(page_info["text"] + "\n")
+
+        return {
+            "text": "".join(page_texts),
+            "pages": pages_content,
+            "pages_count": len(pages_content),
+            "method": method
+        }
+
+    def cache_params(self) -> Dict[str, Any]:
+        """
+        This function returns the parameters of the reader that change its output. Cached outputs are only reused if
+        these parameters are the same.
+        :return: Parameters of the reader
+        """
+        return {
+            "reader": type(self).__name__,
+            "method": self.method,
+        }
 
     def validate_file(self) -> bool:
         """
         This function checks if the file is PDF.
         :return: If it is PDF it returns True, otherwise it returns False.
         """
-        if not os.path.exists(self.file_path) or not self.file_path.lower().endswith('.pdf'):
+        if not self.document.exists() or not self.file_path.lower().endswith('.pdf'):
             return False
         return True
+
+    def close(self):
+        """
+        This function releases the shared document handle of the reader.
+        :return: None
+        """
+        self.document.close()
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from typing import Dict, List
+from caches.abstracts.cache import Cache
+from readers.pdf_document import PDFDocument
+
+
+class BackendStrategy:
+    _default = None
+
+    def __init__(self, store_path: str = ".cache/reader_backends.json", sample_size: int = 3,
+                 min_observations: int = 3, min_win_rate: float = 0.8, resample_interval: int = 20):
+        """
+        Picks the text extraction library of a document. The libraries are compared on a few sample pages, and the
+        winners are learned per layout fingerprint (producer, fonts and page size of the document), so documents of a
+        known supplier/layout are read with a single library without sampling.
+        :param store_path: JSON file of the learned preferences
+        :param sample_size: Number of pages that are read with every library when the layout is not learned yet
+        :param min_observations: Number of samplings before a learned preference is trusted
+        :param min_win_rate: Minimum share of the samplings a library must win to be the learned preference
+        :param resample_interval: Roughly one of this many documents of a learned layout is sampled again, so the
+                                  preferences follow changes of the layout
+        """
+        self.store_path = store_path
+        self.sample_size = sample_size
+        self.min_observations = min_observations
+        self.min_win_rate = min_win_rate
+        self.resample_interval = resample_interval
+        self._preferences: Dict[str, Dict[str, int]] | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "BackendStrategy":
+        """
+        This function returns the strategy that is shared by every reader of the process.
+        :return: Shared strategy
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @staticmethod
+    def fingerprint(document: PDFDocument) -> str:
+        """
+        This function creates the layout fingerprint of a document. Invoices of the same supplier are usually created
+        by the same software with the same fonts and page size, so they have the same fingerprint.
+        :param document: Shared document handle
+        :return: Fingerprint of the layout
+        """
+        metadata = document.fitz.metadata or {}
+        fonts, size = [], None
+        if len(document.fitz) > 0:
+            page = document.fitz.load_page(0)
+            # Subset prefixes (e.g. ABCDEF+Arial) are different in every file
+            fonts = sorted({font[3].split("+")[-1] for font in page.get_fonts()})
+            size = [round(page.rect.width), round(page.rect.height)]
+        return Cache.make_key(metadata.get("producer"), metadata.get("creator"), fonts, size)
+
+    def sample_page_numbers(self, page_count: int) -> List[int]:
+        """
+        This function picks the pages that are read with every library, spread over the document.
+        :param page_count: Number of pages of the document
+        :return: Zero based indexes of the sample pages
+        """
+        if page_count <= self.sample_size:
+            return list(range(page_count))
+        if self.sample_size <= 1:
+            return [0]
+        step = (page_count - 1) / (self.sample_size - 1)
+        return sorted({round(index * step) for index in range(self.sample_size)})
+
+    def preferred_backend(self, fingerprint: str, content_hash: str) -> str | None:
+        """
+        This function returns the learned library of the layout.
+        :param fingerprint: Fingerprint of the layout
+        :param content_hash: Content hash of the document, it decides (deterministically) if the document is sampled
+                             again even though the layout is learned
+        :return: Name of the library, None if the document must be sampled
+        """
+        if int(content_hash[:8], 16) % self.resample_interval == 0:
+            return None
+
+        with self._lock:
+            wins = dict(self._load().get(fingerprint, {}))
+
+        observations = sum(wins.values())
+        if observations < self.min_observations:
+            return None
+        backend, backend_wins = max(wins.items(), key=lambda item: item[1])
+        return backend if backend_wins / observations >= self.min_win_rate else None
+
+    def record(self, fingerprint: str, backend: str):
+        """
+        This function records the winner of a sampling. The store is merged with the file on the disk before it is
+        written, so workers of other processes do not overwrite each other's results.
+        :param fingerprint: Fingerprint of the layout
+        :param backend: Name of the library that won
+        :return: None
+        """
+        with self._lock:
+            self._preferences = None
+            preferences = self._load()
+            wins = preferences.setdefault(fingerprint, {})
+            wins[backend] = wins.get(backend, 0) + 1
+
+            folder_path = os.path.dirname(self.store_path)
+            if folder_path:
+                os.makedirs(folder_path, exist_ok=True)
+            tmp_path = f"{self.store_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(preferences, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.store_path)
+
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        """
+        This function reads the learned preferences from the disk at the first call.
+        :return: Wins of each library by layout fingerprint
+        """
+        if self._preferences is None:
+            try:
+                with open(self.store_path, "r", encoding="utf-8") as f:
+                    self._preferences = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._preferences = {}
+        return self._preferences
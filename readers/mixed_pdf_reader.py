@@ -0,0 +1,77 @@
+from typing import Dict, Any, Iterator, List
+from utils import classify_pdf_pages, DEFAULT_PREPROCESSING_PROFILE
+from readers.pdf_type import PDFType
+from readers.pdf_document import PDFDocument
+from readers.abstracts.reader import Reader
+from readers.text_based_pdf_reader import TextBasedPDFReader
+from readers.scanned_pdf_reader import ScannedPDFReader
+from readers.ocr_pool import OCRPool
+from ocr_engines.ocr_engine_factory import DEFAULT_OCR_ENGINE
+
+
+class MixedPDFReader(Reader):
+    def __init__(self, file_path: str, document: PDFDocument | None = None, page_types: List[PDFType] | None = None,
+                 max_workers: int | None = None, preprocessing_profile: str = DEFAULT_PREPROCESSING_PROFILE,
+                 ocr_engine: str = DEFAULT_OCR_ENGINE, ocr_pool: OCRPool | None = None):
+        super().__init__(file_path, document)
+        self.pdf_type = PDFType.MIXED
+        self.method = 'mixed'
+        self.page_types = page_types
+
+        # Both readers share the same document handle, so the file is not opened again
+        self.text_reader = TextBasedPDFReader(file_path, self.document)
+        self.scanned_reader = ScannedPDFReader(file_path, self.document, max_workers=max_workers,
+                                               preprocessing_profile=preprocessing_profile, ocr_engine=ocr_engine,
+                                               ocr_pool=ocr_pool)
+
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
+        """
+        This function reads PDFs that have both native and scanned pages, page by page. Every page is classified
+        separately, the text layer is used wherever it exists and only image pages are rasterized and OCR'd.
+        :return: Iterator of dictionaries containing data read from each page
+        """
+        if self.page_types is None:
+            self.page_types = classify_pdf_pages(self.document)
+
+        # Image pages are streamed through the OCR process pool of the scanned reader in page order
+        ocr_page_numbers = [page_number for page_number, page_type in enumerate(self.page_types)
+                            if page_type == PDFType.SCANNED_IMAGE]
+        ocr_pages = self.scanned_reader.iter_pages(ocr_page_numbers)
+
+        for page_number, page_type in enumerate(self.page_types):
+            if page_type == PDFType.SCANNED_IMAGE:
+                yield next(ocr_pages)
+            else:
+                yield self.text_reader.read_page(page_number)
+        ocr_pages.close()
+
+    def cache_params(self) -> Dict[str, Any]:
+        """
+        This function returns the parameters of the reader that change its output, including parameters of the OCR
+        reader it uses for image pages.
+        :return: Parameters of the reader
+        """
+        params = super().cache_params()
+        params["scanned_reader"] = self.scanned_reader.cache_params()
+        return params
+
+    def read_content(self) -> Dict[str, Any]:
+        """
+        This function reads content from PDFs that have both native and scanned pages.
+        :return: A dictionary containing data read from a file
+        """
+        result = super().read_content()
+
+        if result.get("success"):
+            content = result["content"]
+            content["ocr_pages"] = [page_info["page_number"] for page_info in content["pages"]
+                                    if page_info["method"] == self.scanned_reader.method]
+        return result
+
+    def close(self):
+        """
+        This function releases the shared document handle, and the OCR pool if the scanned reader started it.
+        :return: None
+        """
+        self.scanned_reader.close()
+        super().close()
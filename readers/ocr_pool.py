@@ -0,0 +1,62 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable
+from ocr_engines.ocr_engine_factory import OCREngineFactory, DEFAULT_OCR_ENGINE
+
+
+def _init_ocr_worker(ocr_engine: str, ocr_config: str):
+    """
+    This function prepares a worker process of the OCR pool when it starts. The OCR engine is created and its model is
+    loaded once, then the worker reuses them for every page of every document it reads.
+    :param ocr_engine: Name of the OCR engine
+    :param ocr_config: Tesseract OCR configuration string of the model to load
+    :return: None
+    """
+    # Image processing libraries are imported once per worker, not once per document
+    import utils
+    try:
+        OCREngineFactory.get_engine(ocr_engine).load(ocr_config)
+    except Exception as e:
+        # The worker is still started, the error is reported on the pages it reads
+        print(f"OCR engine could not be loaded: {e}")
+
+
+class OCRPool:
+    def __init__(self, max_workers: int, ocr_engine: str = DEFAULT_OCR_ENGINE, ocr_config: str = '--oem 3 --psm 6'):
+        """
+        Long-lived process pool of OCR workers. The pool is started at the first page and kept until it is closed, so
+        several documents are read by the same workers and every worker loads the OCR model only once.
+        :param max_workers: Number of processes that perform OCR in parallel
+        :param ocr_engine: Name of the OCR engine that is loaded by every worker
+        :param ocr_config: Tesseract OCR configuration string of the model that is loaded by every worker
+        """
+        self.max_workers = max_workers
+        self.ocr_engine = ocr_engine
+        self.ocr_config = ocr_config
+        self._executor: ProcessPoolExecutor | None = None
+
+    def submit(self, function: Callable, *args: Any) -> Future:
+        """
+        This function sends an OCR job to the pool, the worker processes are started at the first job.
+        :param function: Module level function of the job
+        :param args: Arguments of the function
+        :return: Future of the job
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_ocr_worker,
+                                                 initargs=(self.ocr_engine, self.ocr_config))
+        return self._executor.submit(function, *args)
+
+    def close(self):
+        """
+        This function stops the worker processes of the pool.
+        :return: None
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,113 @@
+import hashlib
+import io
+import os
+from typing import Any
+
+
+class PDFDocument:
+    """
+    Shared handle of a PDF file. The file is read from disk only once and every parser (PyPDF2, pdfplumber, fitz)
+    is opened lazily on the same in-memory bytes, so each library parses the document (and its xref table) only once
+    no matter how many detectors and readers use it.
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._data: bytes | None = None
+        self._content_hash: str | None = None
+        self._pypdf2_reader = None
+        self._pdfplumber_pdf = None
+        self._fitz_document = None
+
+    @property
+    def data(self) -> bytes:
+        """
+        This function returns raw bytes of the file. The file is read from disk at the first call.
+        :return: Content of the file
+        """
+        if self._data is None:
+            with open(self.file_path, 'rb') as file:
+                self._data = file.read()
+        return self._data
+
+    @property
+    def content_hash(self) -> str:
+        """
+        This function returns the SHA-256 hash of the file content. Same files have the same hash even if their names
+        are different.
+        :return: Hex digest of the content
+        """
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.data).hexdigest()
+        return self._content_hash
+
+    @property
+    def pypdf2(self) -> Any:
+        """
+        This function returns the PyPDF2 reader of the document. It is created once and reused.
+        :return: PyPDF2.PdfReader instance
+        """
+        if self._pypdf2_reader is None:
+            import PyPDF2
+            self._pypdf2_reader = PyPDF2.PdfReader(io.BytesIO(self.data))
+        return self._pypdf2_reader
+
+    @property
+    def pdfplumber(self) -> Any:
+        """
+        This function returns the pdfplumber document. It is created once and reused.
+        :return: pdfplumber.PDF instance
+        """
+        if self._pdfplumber_pdf is None:
+            import pdfplumber
+            self._pdfplumber_pdf = pdfplumber.open(io.BytesIO(self.data))
+        return self._pdfplumber_pdf
+
+    @property
+    def fitz(self) -> Any:
+        """
+        This function returns the fitz (PyMuPDF) document. It is created once and reused.
+        :return: fitz.Document instance
+        """
+        if self._fitz_document is None:
+            import fitz
+            self._fitz_document = fitz.open(stream=self.data, filetype='pdf')
+        return self._fitz_document
+
+    @property
+    def page_count(self) -> int:
+        """
+        This function returns page count of the document by using an already opened parser if there is one.
+        :return: Number of pages
+        """
+        if self._fitz_document is not None:
+            return len(self._fitz_document)
+        if self._pdfplumber_pdf is not None:
+            return len(self._pdfplumber_pdf.pages)
+        return len(self.pypdf2.pages)
+
+    def exists(self) -> bool:
+        """
+        This function checks if the file of the document exists on the disk.
+        :return: If the file exists it returns True, otherwise it returns False
+        """
+        return self._data is not None or os.path.exists(self.file_path)
+
+    def close(self):
+        """
+        This function closes every opened parser and releases the bytes of the file.
+        :return: None
+        """
+        if self._pdfplumber_pdf is not None:
+            self._pdfplumber_pdf.close()
+        if self._fitz_document is not None:
+            self._fitz_document.close()
+        self._pypdf2_reader = None
+        self._pdfplumber_pdf = None
+        self._fitz_document = None
+        self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,142 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+from caches.abstracts.cache import Cache
+from caches.disk_cache import DiskCache
+from readers.pdf_document import PDFDocument
+from readers.pdf_type import PDFType
+
+# Text objects of a content stream and the string operands shown inside them
+_TEXT_OBJECT_PATTERN = re.compile(rb"\bBT\b(.*?)\bET\b", re.S)
+_LITERAL_STRING_PATTERN = re.compile(rb"\((?:\\.|[^\\)])*\)", re.S)
+_HEX_STRING_PATTERN = re.compile(rb"<([0-9A-Fa-f\s]*)>")
+_INLINE_IMAGE_PATTERN = re.compile(rb"\bBI\b")
+
+
+class PDFTypeDetector:
+    _default = None
+
+    def __init__(self, cache: Cache | None = None, min_text_length: int = 50, verify_threshold: float = 0.75,
+                 memory_size: int = 1024):
+        """
+        Detects type of every page from the font/image resources and the content stream operators of the page, without
+        extracting its text. Only pages with a low confidence are verified with the text layer. Results are memoized
+        by the content hash of the file, in memory and in the given cache.
+        :param cache: (Optional) Persistent cache of the results, None keeps the results only in memory
+        :param min_text_length: Minimum number of characters for a page to be accepted as text based
+        :param verify_threshold: Pages with a lower confidence are verified by extracting their text
+        :param memory_size: Maximum number of files whose results are kept in memory
+        """
+        self.cache = cache
+        self.min_text_length = min_text_length
+        self.verify_threshold = verify_threshold
+        self.memory_size = memory_size
+        self._memory: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "PDFTypeDetector":
+        """
+        This function returns the detector that is shared by every reader factory call of the process. Its results are
+        kept on the disk between runs.
+        :return: Shared detector
+        """
+        if cls._default is None:
+            cls._default = cls(DiskCache(".cache/pdf_types", max_entries=100000))
+        return cls._default
+
+    def classify_pages(self, document: PDFDocument | str) -> List[Dict[str, Any]]:
+        """
+        This function classifies every page of given PDF separately. Same files are classified only once, even if
+        their names are different.
+        :param document: Shared document handle (or path of the file) to classify
+        :return: Type, confidence and the signals of each page
+        """
+        if isinstance(document, str):
+            document = PDFDocument(document)
+
+        key = Cache.make_key("pdf_type", document.content_hash, self.min_text_length, self.verify_threshold)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        pages = None
+        if self.cache is not None:
+            cached_pages = self.cache.get(key)
+            if cached_pages is not None:
+                pages = [dict(page, page_type=PDFType(page["page_type"])) for page in cached_pages]
+
+        if pages is None:
+            pages = [self._classify_page(page) for page in document.fitz]
+            if self.cache is not None:
+                self.cache.set(key, [dict(page, page_type=page["page_type"].value) for page in pages])
+
+        with self._lock:
+            self._memory[key] = pages
+            if len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+        return pages
+
+    def _classify_page(self, page: Any) -> Dict[str, Any]:
+        """
+        This function classifies a single page by its resources and content stream. Text length is estimated from the
+        string operands of the text objects, no text is decoded.
+        :param page: Fitz page
+        :return: Type, confidence and the signals of the page
+        """
+        contents = page.read_contents()
+        font_count = len(page.get_fonts())
+        image_count = len(page.get_images()) + len(_INLINE_IMAGE_PATTERN.findall(contents))
+        text_length = self._estimate_text_length(contents) if font_count else 0
+        has_images = image_count > 0
+
+        if text_length >= self.min_text_length * 2:
+            page_type, confidence = PDFType.TEXT_BASED, 1.0
+        elif text_length >= self.min_text_length:
+            # Multi byte fonts show less characters than their string bytes
+            page_type, confidence = PDFType.TEXT_BASED, 0.7
+        elif text_length > 0:
+            page_type, confidence = (PDFType.SCANNED_IMAGE if has_images else PDFType.TEXT_BASED), 0.7
+        elif font_count and page.get_xobjects():
+            # Text may be drawn inside form XObjects that are not in the page content stream
+            page_type, confidence = (PDFType.SCANNED_IMAGE if has_images else PDFType.TEXT_BASED), 0.5
+        else:
+            # Pages without any text and image (e.g. a blank last page) does not need OCR
+            page_type, confidence = (PDFType.SCANNED_IMAGE if has_images else PDFType.TEXT_BASED), 1.0
+
+        verified = False
+        if confidence < self.verify_threshold:
+            text = page.get_text().strip()
+            if len(text) > self.min_text_length:
+                page_type = PDFType.TEXT_BASED
+            else:
+                page_type = PDFType.SCANNED_IMAGE if has_images else PDFType.TEXT_BASED
+            confidence, verified = 1.0, True
+
+        return {
+            "page_number": page.number + 1,
+            "page_type": page_type,
+            "confidence": confidence,
+            "verified": verified,
+            "text_length": text_length,
+            "font_count": font_count,
+            "image_count": image_count,
+        }
+
+    @staticmethod
+    def _estimate_text_length(contents: bytes) -> int:
+        """
+        This function estimates number of characters shown by the text objects of a content stream.
+        :param contents: Decompressed content stream of the page
+        :return: Estimated number of characters
+        """
+        length = 0
+        for text_object in _TEXT_OBJECT_PATTERN.findall(contents):
+            for literal in _LITERAL_STRING_PATTERN.findall(text_object):
+                length += len(literal) - 2 - literal.count(b"\\")
+            for hex_digits in _HEX_STRING_PATTERN.findall(text_object):
+                length += len(b"".join(hex_digits.split())) // 2
+        return length
+
@@ -0,0 +1,41 @@
+from typing import Dict, Any
+from caches.abstracts.cache import Cache
+from caches.disk_cache import DiskCache
+from readers.abstracts.reader import Reader
+
+
+class ReaderCache:
+    def __init__(self, cache: Cache | None = None):
+        # Reader outputs are stored on disk, so they can be reused by the next runs
+        self.cache = cache or DiskCache(".cache/readers")
+
+    def make_key(self, reader: Reader) -> str:
+        """
+        This function creates the cache key of a reader output. The key depends on the content of the file (not its
+        name) and the parameters of the reader.
+        :param reader: Reader that reads the file
+        :return: Cache key
+        """
+        return self.cache.make_key(reader.document.content_hash, reader.cache_params())
+
+    def read_content(self, reader: Reader) -> Dict[str, Any]:
+        """
+        This function returns the cached output of the reader if the same file was read with the same parameters
+        before, otherwise it reads the file and caches the output.
+        :param reader: Reader that reads the file
+        :return: A dictionary containing data read from a file
+        """
+        key = self.make_key(reader)
+
+        cached_result = self.cache.get(key)
+        if cached_result is not None:
+            cached_result["filename"] = reader.file_path
+            return cached_result
+
+        result = reader.read_content()
+
+        # Failed reads and pages are not cached, so they are tried again next time
+        if result and result.get("success") and not any("error" in page_info
+                                                         for page_info in result["content"].get("pages", [])):
+            self.cache.set(key, result)
+        return result
@@ -1,41 +1,64 @@
-from PIL import Image
 from readers.pdf_type import PDFType
+from readers.pdf_document import PDFDocument
 from readers.text_based_pdf_reader import TextBasedPDFReader
 from readers.scanned_pdf_reader import ScannedPDFReader
+from readers.mixed_pdf_reader import MixedPDFReader
 from readers.abstracts.reader import Reader
-from utils import detect_pdf_type
+from readers.ocr_pool import OCRPool
+from utils import classify_pdf_pages, pdf_type_from_pages, DEFAULT_PREPROCESSING_PROFILE
+from ocr_engines.ocr_engine_factory import OCREngineFactory, DEFAULT_OCR_ENGINE
 
 
 class ReaderFactory:
     @staticmethod
-    def _check_tesseract() -> bool:
+    def _check_tesseract(ocr_engine: str = DEFAULT_OCR_ENGINE) -> bool:
         """
-        This function checks if tesseract is loaded into the current environment/computer
+        This function checks if tesseract is loaded into the current environment/computer. The check does not perform
+        any OCR and its result is cached for the life of the process.
+        :param ocr_engine: (Optional) Name of the OCR engine
         :return: If tesseract is downloaded it returns True, otherwise it returns False
         """
-        try:
-            import pytesseract
-            pytesseract.image_to_string(Image.new('RGB', (100, 30), color='white'))
-            return True
-        except Exception:
-            return False
+        return OCREngineFactory.is_available(ocr_engine)
 
     @staticmethod
-    def create_reader(file_path: str) -> Reader:
+    def create_reader(file_path: str, ocr_workers: int | None = None,
+                      preprocessing_profile: str = DEFAULT_PREPROCESSING_PROFILE,
+                      ocr_engine: str = DEFAULT_OCR_ENGINE, text_workers: int | None = None,
+                      ocr_pool: OCRPool | None = None) -> Reader:
         """
         This function automatically creates the correct Reader instance according to the type of file (scanned or native). It uses the factory pattern to do this.
+        The file is opened once, and the same document handle is shared by the detector and the created reader.
         :param file_path: Path of the file that will be analyzed
+        :param ocr_workers: (Optional) Number of processes used for OCR. Defaults to the number of cores
+        :param preprocessing_profile: (Optional) Image preprocessing profile before OCR: fast, balanced or aggressive
+        :param ocr_engine: (Optional) OCR engine: tesserocr, pytesseract or auto
+        :param text_workers: (Optional) Number of processes that read page ranges of large native PDFs
+        :param ocr_pool: (Optional) OCR process pool shared by the readers of many files, overrides ocr_workers
         :return: Correct Reader instance
         """
-        text_reader = TextBasedPDFReader(file_path)
-        detected_file_type = detect_pdf_type(file_path)
+        document = PDFDocument(file_path)
+
+        # Every page is classified once, mixed files reuse the classification instead of detecting again
+        try:
+            page_types = classify_pdf_pages(document)
+            detected_file_type = pdf_type_from_pages(page_types)
+        except Exception as e:
+            print(f"PDF type not detected: {e}")
+            page_types = None
+            detected_file_type = PDFType.MIXED
 
         if detected_file_type == PDFType.TEXT_BASED:
-            return text_reader
+            return TextBasedPDFReader(file_path, document, max_workers=text_workers)
         else:
-            if ReaderFactory._check_tesseract():
-                return ScannedPDFReader(file_path)
+            if ReaderFactory._check_tesseract(ocr_engine):
+                if detected_file_type == PDFType.MIXED:
+                    return MixedPDFReader(file_path, document, page_types, max_workers=ocr_workers,
+                                          preprocessing_profile=preprocessing_profile, ocr_engine=ocr_engine,
+                                          ocr_pool=ocr_pool)
+                return ScannedPDFReader(file_path, document, max_workers=ocr_workers,
+                                        preprocessing_profile=preprocessing_profile, ocr_engine=ocr_engine,
+                                        ocr_pool=ocr_pool)
             else:
                 print(f"Tesseract not found. Using text-based reader: {file_path}")
                 print("Tesseract installation is required for OCR feature.")
-                return text_reader
+                return TextBasedPDFReader(file_path, document, max_workers=text_workers)
@@ -1,91 +1,336 @@
-import io
-from typing import Dict, Any
+import os
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, Iterator, Tuple
 from typing import List
-import PyPDF2
-from utils import preprocess_image, extract_tables_from_page_text, ocr_text_with_paragraphs
+from utils import preprocess_image, extract_tables_from_page_text, ocr_lines_with_paragraphs, PREPROCESSING_PROFILES, \
+    DEFAULT_PREPROCESSING_PROFILE, detect_text_regions, needs_denoising
+from ocr_engines.ocr_engine_factory import OCREngineFactory, DEFAULT_OCR_ENGINE
 import fitz
+import numpy as np
 from readers.pdf_type import PDFType
+from readers.pdf_document import PDFDocument
 from readers.abstracts.reader import Reader
+from readers.ocr_pool import OCRPool
 from PIL import Image
 
 
+def _failed_page(page_number: int, error: str) -> Dict[str, Any]:
+    """
+    This function creates the page result of a page that could not be OCR'd, so one broken page does not abort the
+    whole document.
+    :param page_number: Zero based index of the page
+    :param error: Description of the error
+    :return: A dictionary containing the error of the page
+    """
+    return {
+        "page_number": page_number + 1,
+        "text": "",
+        "tables": [],
+        "lines": [],
+        "method": "ocr_tesseract",
+        "error": error
+    }
+
+
+def _ocr_page_worker(regions: List[Tuple[Image.Image | np.ndarray, Tuple[int, int]]], page_number: int, dpi: int,
+                     ocr_config: str, preprocessing_profile: str = DEFAULT_PREPROCESSING_PROFILE,
+                     ocr_engine: str = DEFAULT_OCR_ENGINE, denoise: bool | None = None) -> Dict[str, Any]:
+    """
+    This function performs OCR on the text regions of a single page and groups the recognized text. It is a module
+    level function, so it can be sent to the worker processes of the OCR pool. Every worker process creates its OCR
+    engine once and reuses it for the following pages.
+    :param regions: Images of the text regions of the page from top to bottom, with their offsets in the page image
+    :param page_number: Zero based index of the page
+    :param dpi: Render resolution of the regions
+    :param ocr_config: Tesseract OCR configuration string
+    :param preprocessing_profile: Name of the image preprocessing profile
+    :param ocr_engine: Name of the OCR engine
+    :param denoise: (Optional) Denoising decision of the whole page. Regions are not checked one by one, crops of
+                    dense text look noisy and would be denoised on clean pages. Decided per image if it is None
+    :return: A dictionary containing data read from the page
+    """
+    try:
+        region_texts = []
+        lines = []
+        for image, (offset_x, offset_y) in regions:
+            processed_image = preprocess_image(image, preprocessing_profile, denoise)
+            region_text, region_lines = ocr_lines_with_paragraphs(processed_image, ocr_config=ocr_config,
+                                                                   ocr_engine=ocr_engine, dpi=dpi)
+            if region_text:
+                region_texts.append(region_text)
+
+            # Line boxes are moved from region coordinates to page coordinates
+            for line in region_lines:
+                x0, y0, x1, y1 = line["bbox"]
+                line["bbox"] = [x0 + offset_x, y0 + offset_y, x1 + offset_x, y1 + offset_y]
+                lines.append(line)
+
+        # Regions are separated by large blank gaps, so each region is a separate paragraph
+        page_text = "\n\n".join(region_texts)
+
+        # Grouping the page
+        tables = extract_tables_from_page_text(page_text)
+
+        return {
+            "page_number": page_number + 1,
+            "text": page_text,
+            "tables": tables,
+            "lines": lines,
+            "dpi": dpi,
+            "method": "ocr_tesseract"
+        }
+    except Exception as e:
+        print(f"OCR error on page {page_number + 1}: {e}")
+        return _failed_page(page_number, str(e))
+
+
 class ScannedPDFReader(Reader):
-    def __init__(self, file_path: str):
-        super().__init__(file_path)
+    def __init__(self, file_path: str, document: PDFDocument | None = None, max_workers: int | None = None,
+                 preprocessing_profile: str = DEFAULT_PREPROCESSING_PROFILE, dpi: int = 144, adaptive_dpi: bool = True,
+                 roi: bool = True, ocr_engine: str = DEFAULT_OCR_ENGINE, ocr_pool: OCRPool | None = None):
+        super().__init__(file_path, document)
         self.pdf_type = PDFType.SCANNED_IMAGE
+        self.method = 'ocr_tesseract'
         self.ocr_config = '--oem 3 --psm 6'
+        # OCR engine: tesserocr (in-process), pytesseract (tesseract executable) or auto
+        self.ocr_engine = ocr_engine
+        self.dpi = dpi  # Render resolution of the pages, 144 DPI is x2 zoom of the PDF size
+        # Picks the resolution of each page from its text height, instead of using the fixed DPI
+        self.adaptive_dpi = adaptive_dpi
+        self.min_dpi = 100
+        self.max_dpi = 300
+        self.target_text_height = 14    # Median character height (px) that Tesseract reads reliably
+        # Runs OCR only on the text regions of the page, blank margins and gaps are cropped out
+        self.roi = roi
+        self.probe_dpi = 72     # Resolution of the cheap render that is used to find text height and regions
+        # Number of processes that perform OCR in parallel, 1 disables the pool
+        self.max_workers = ocr_pool.max_workers if ocr_pool is not None else max_workers or os.cpu_count() or 1
+        # OCR pool shared by the readers of many documents, the reader starts its own pool if it is not given
+        self.ocr_pool = ocr_pool
+        self._owns_ocr_pool = ocr_pool is None
+        # Image preprocessing profile before OCR: fast, balanced or aggressive
+        self.preprocessing_profile = preprocessing_profile
 
-    def read_content(self) -> Dict[str, Any]:
+    def iter_pages(self, page_numbers: List[int] | None = None) -> Iterator[Dict[str, Any]]:
         """
-            This function reads content from scanned PDFs. Because of the file is scanned, this function performs OCR.
-            :return: A dictionary containing data read from a file
+        This function reads scanned PDFs page by page. Pages are rendered lazily and sent to the OCR process pool, so
+        every core is used while only a bounded number of page images is kept in memory. The pool is kept for the next
+        calls and documents. Results are yielded in page order,
+        failed pages are reported in the results instead of aborting the whole document.
+        :param page_numbers: (Optional) Zero based indexes of the pages to read. Defaults to all pages
+        :return: Iterator of dictionaries containing data read from each page
         """
-        if not self.validate_file():
-            return {
-                'success': False,
-                'error': 'Invalid file'
-            }
+        if page_numbers is None:
+            page_numbers = list(range(self._page_count()))
+
+        page_regions = self._iter_page_regions(page_numbers)
+        workers = min(self.max_workers, len(page_numbers))
+        if workers <= 1:
+            for page_number, regions, dpi, denoise in page_regions:
+                yield self._ocr_in_process(regions, page_number, dpi, denoise)
+            return
 
+        # At most this many pages are rendered and waiting for OCR at the same time
+        max_pending = workers * 2
+        pending = deque()
+        if self.ocr_pool is None:
+            self.ocr_pool = OCRPool(self.max_workers, self.ocr_engine, self.ocr_config)
         try:
-            images = self._pdf_to_images()
-            pages_content = []
-            full_text = ""
-
-            for page_number, image in enumerate(images):
-                processed_image = preprocess_image(image)
-                page_text = ocr_text_with_paragraphs(processed_image, ocr_config=self.ocr_config)
-
-                # Grouping the page
-                tables = extract_tables_from_page_text(page_text)
-
-                pages_content.append({
-                    "page_number": page_number + 1,
-                    "text": page_text,
-                    "tables": tables,
-                    "method": "ocr_tesseract"
-                })
-
-                full_text += page_text + "\n"
-
-            return {
-                "success": True,
-                'filename': self.file_path,
-                "pdf_type": self.pdf_type.value,
-                "content": {
-                    "text": full_text,
-                    "pages": pages_content,
-                    "pages_count": len(images),
-                    "method": "ocr_tesseract"
-                }
-            }
-        except Exception as e:
-            print(f"OCR reading error: {e}")
-            return {"success": False, "error": str(e)}
+            for page_number, regions, dpi, denoise in page_regions:
+                if regions is None:
+                    pending.append((page_number, None))
+                else:
+                    pending.append((page_number, self.ocr_pool.submit(_ocr_page_worker, regions, page_number, dpi,
+                                                                      self.ocr_config, self.preprocessing_profile,
+                                                                      self.ocr_engine, denoise)))
+                del regions
+
+                if len(pending) >= max_pending:
+                    yield self._pending_result(*pending.popleft())
 
-    def _pdf_to_images(self) -> List[Image.Image]:
+            while pending:
+                yield self._pending_result(*pending.popleft())
+        finally:
+            # Pages of a closed iterator are not read, the workers are kept free for the next documents
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def close(self):
         """
-        This function converts scanned PDFs to images. The function uses Fitz library for convertion.
-        :return: Images of all pages
+        This function releases the shared document handle, and the OCR pool if the reader started it.
+        :return: None
         """
-        images: List[Image.Image] = []
-        try:
-            document = fitz.open(self.file_path)
+        if self._owns_ocr_pool and self.ocr_pool is not None:
+            self.ocr_pool.close()
+            self.ocr_pool = None
+        super().close()
 
-            for page_number in range(len(document)):
-                page = document.load_page(page_number)
+    def cache_params(self) -> Dict[str, Any]:
+        """
+        This function returns the parameters of the reader that change its output, including OCR and preprocessing
+        parameters.
+        :return: Parameters of the reader
+        """
+        params = super().cache_params()
+        params.update({
+            "ocr_config": self.ocr_config,
+            "ocr_engine": OCREngineFactory.resolve(self.ocr_engine),
+            "dpi": self.dpi,
+            "adaptive_dpi": [self.adaptive_dpi, self.min_dpi, self.max_dpi, self.target_text_height, self.probe_dpi],
+            "roi": self.roi,
+            "preprocessing": PREPROCESSING_PROFILES[self.preprocessing_profile],
+        })
+        return params
 
-                mat = fitz.Matrix(2, 2)     # x2 Zoom setting
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("ppm")
+    def _ocr_in_process(self, regions: List[Tuple[Image.Image | np.ndarray, Tuple[int, int]]] | None, page_number: int,
+                        dpi: int, denoise: bool | None = None) -> Dict[str, Any]:
+        """
+        This function performs OCR on a single page in the current process.
+        :param regions: Images of the text regions of the page, None if the page could not be rendered
+        :param page_number: Zero based index of the page
+        :param dpi: Render resolution of the regions
+        :param denoise: (Optional) Denoising decision of the whole page, decided per image if it is None
+        :return: A dictionary containing data read from the page
+        """
+        if regions is None:
+            return _failed_page(page_number, "Page could not be converted to image")
+        return _ocr_page_worker(regions, page_number, dpi, self.ocr_config, self.preprocessing_profile,
+                                self.ocr_engine, denoise)
+
+    @staticmethod
+    def _pending_result(page_number: int, future: Future | None) -> Dict[str, Any]:
+        """
+        This function waits for the OCR result of a page that was sent to the process pool.
+        :param page_number: Zero based index of the page
+        :param future: Future of the OCR job, None if the page could not be rendered
+        :return: A dictionary containing data read from the page
+        """
+        if future is None:
+            return _failed_page(page_number, "Page could not be converted to image")
+        try:
+            return future.result()
+        except Exception as e:
+            # Worker process crashed, the rest of the document is still reported
+            print(f"OCR worker error on page {page_number + 1}: {e}")
+            return _failed_page(page_number, str(e))
+
+    def _page_count(self) -> int:
+        """
+        This function returns page count of the file, the alternative parser is used if Fitz cannot open the file.
+        :return: Number of pages
+        """
+        try:
+            return len(self.document.fitz)
+        except Exception as e:
+            print(f"PDF to image conversion error: {e}")
+            return len(self.document.pypdf2.pages)
 
-                img = Image.open(io.BytesIO(img_data))
-                images.append(img)
-            document.close()
+    def _iter_page_regions(self, page_numbers: List[int]) -> Iterator[Tuple[int, List | None, int, bool | None]]:
+        """
+        This function converts scanned PDFs to images one page at a time. The function uses Fitz library for
+        convertion, and falls back to the alternative conversion if Fitz cannot open the file.
+        :param page_numbers: Zero based indexes of the pages to convert
+        :return: Iterator of page indexes, images of the text regions with their offsets (None if the page cannot be
+                 converted), render resolutions and denoising decisions of the pages (None to decide per image)
+        """
+        try:
+            self.document.fitz
         except Exception as e:
             print(f"PDF to image conversion error: {e}")
             images = self._pdf_to_images_alternative()
+            for page_number in page_numbers:
+                regions = [(images[page_number], (0, 0))] if page_number < len(images) else None
+                yield page_number, regions, 200, None
+            return
 
-        return images
+        for page_number in page_numbers:
+            try:
+                regions, dpi, denoise = self._page_to_regions(page_number)
+                yield page_number, regions, dpi, denoise
+            except Exception as e:
+                print(f"PDF to image conversion error on page {page_number + 1}: {e}")
+                yield page_number, None, self.dpi, None
+
+    def _plan_page(self, page: Any) -> Tuple[int, List[Any], bool | None]:
+        """
+        This function picks the render resolution of a page from its text height and finds the areas to OCR. A cheap
+        low resolution render of the page is analyzed for this.
+        :param page: Fitz page
+        :return: Render resolution, areas of the page (in PDF coordinates) to OCR (no areas for blank pages) and the
+                 denoising decision of the page (None if the whole page is OCR'd, it is decided on the page image)
+        """
+        if not self.adaptive_dpi and not self.roi:
+            return self.dpi, [None], None
+
+        probe = self._render(page, self.probe_dpi)
+        text_height, regions = detect_text_regions(probe)
+        if text_height is None:
+            return self.dpi, [] if self.roi else [None], None
+
+        dpi = self.dpi
+        if self.adaptive_dpi:
+            dpi = int(np.clip(round(self.target_text_height * self.probe_dpi / text_height), self.min_dpi, self.max_dpi))
+
+        if not self.roi:
+            return dpi, [None], None
+
+        # Noise is estimated once on the whole page, the regions are only dense text
+        denoise = needs_denoising(probe, self.preprocessing_profile)
+
+        scale = 72 / self.probe_dpi
+        padding = text_height * scale
+        areas = []
+        for x0, y0, x1, y1 in regions:
+            area = fitz.Rect(page.rect.x0 + x0 * scale - padding, page.rect.y0 + y0 * scale - padding,
+                             page.rect.x0 + x1 * scale + padding, page.rect.y0 + y1 * scale + padding)
+            areas.append(area & page.rect)
+        return dpi, areas, denoise
+
+    def _page_to_regions(self, page_number: int) -> Tuple[List[Tuple[np.ndarray, Tuple[int, int]]], int, bool | None]:
+        """
+        This function renders only the text regions of a page at the resolution chosen for the page.
+        :param page_number: Zero based index of the page
+        :return: Images of the regions with their offsets in the page image, the render resolution and the denoising
+                 decision of the page
+        """
+        page = self.document.fitz.load_page(page_number)
+        dpi, areas, denoise = self._plan_page(page)
+
+        regions = []
+        for area in areas:
+            if area is None:
+                regions.append((self._render(page, dpi), (0, 0)))
+            else:
+                offset = (int(round((area.x0 - page.rect.x0) * dpi / 72)), int(round((area.y0 - page.rect.y0) * dpi / 72)))
+                regions.append((self._render(page, dpi, area), offset))
+        return regions, dpi, denoise
+
+    def _page_to_image(self, page_number: int) -> np.ndarray:
+        """
+        This function converts a whole page of the PDF to a grayscale image at the configured DPI.
+        :param page_number: Zero based index of the page
+        :return: Grayscale image of the page as a 2D uint8 array
+        """
+        return self._render(self.document.fitz.load_page(page_number), self.dpi)
+
+    @staticmethod
+    def _render(page: Any, dpi: int, clip: Any = None) -> np.ndarray:
+        """
+        This function renders a page (or an area of it) to a grayscale image with Fitz library. The page is rendered
+        in grayscale and the pixels of the pixmap are used as a NumPy array directly, without encoding/decoding an
+        image file or creating RGB copies.
+        :param page: Fitz page
+        :param dpi: Render resolution
+        :param clip: (Optional) Area of the page to render, the whole page is rendered if it is None
+        :return: Grayscale image as a 2D uint8 array
+        """
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+
+        # Rows of the pixmap may be padded, the padding is cut with a view
+        pixels = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        return pixels[:, :pix.width]
 
     def _pdf_to_images_alternative(self) -> List[Image.Image]:
         """
@@ -95,10 +340,10 @@ class ScannedPDFReader(Reader):
         images = []
 
         try:
-            from pdf2image import convert_from_path
+            from pdf2image import convert_from_bytes
 
-            pil_images = convert_from_path(
-                self.file_path,
+            pil_images = convert_from_bytes(
+                self.document.data,
                 dpi=200,
                 fmt='RGB'
             )
@@ -106,11 +351,9 @@ class ScannedPDFReader(Reader):
             images.extend(pil_images)
         except ImportError:
             try:
-                with open(self.file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page_num in range(len(pdf_reader.pages)):
-                        white_page = Image.new('RGB', (2480, 3508), 'white')
-                        images.append(white_page)
+                for page_num in range(len(self.document.pypdf2.pages)):
+                    white_page = Image.new('RGB', (2480, 3508), 'white')
+                    images.append(white_page)
             except Exception as e:
                 print(f"Alternative PDF conversion error: {e}")
 
@@ -1,19 +1,66 @@
-from typing import Dict, Any
-import PyPDF2
-import pdfplumber
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Any, Iterator, List, Tuple
 from readers.pdf_type import PDFType
+from readers.pdf_document import PDFDocument
 from readers.abstracts.reader import Reader
+from readers.backend_strategy import BackendStrategy
 from utils import extract_tables_from_page_text
 
 
+def _read_page_range(file_path: str, backends: List[str], start: int, end: int) -> Dict[str, List[Dict] | None]:
+    """
+    This function reads a range of pages of a native PDF with the given libraries. It is a module level function, so
+    it can be sent to the worker processes of the text extraction pool. Every worker opens the file on its own.
+    :param file_path: Path of the file
+    :param backends: Names of the libraries to read with
+    :param start: Zero based index of the first page of the range
+    :param end: Zero based index of the page after the range
+    :return: Pages of the range by library, None for a library that could not read the range
+    """
+    reader = TextBasedPDFReader(file_path, strategy="best_of", max_workers=1)
+    try:
+        if len(backends) == 1:
+            # Adaptive strategy, a page that fails with the chosen library is read with the other one
+            return {backends[0]: [reader.read_page_with_fallback(backends[0], page_num)
+                                  for page_num in range(start, end)]}
+
+        pages = {}
+        for backend in backends:
+            try:
+                pages[backend] = [reader.read_page_with(backend, page_num) for page_num in range(start, end)]
+            except Exception as e:
+                print(f"{backend} reading error on pages {start + 1}-{end}: {e}")
+                pages[backend] = None
+        return pages
+    finally:
+        reader.close()
+
+
 class TextBasedPDFReader(Reader):
-    def __init__(self, file_path: str):
-        super().__init__(file_path)
+    def __init__(self, file_path: str, document: PDFDocument | None = None, strategy: str = "adaptive",
+                 backend_strategy: BackendStrategy | None = None, max_workers: int | None = None,
+                 min_pages_per_worker: int = 20):
+        super().__init__(file_path, document)
         self.pdf_type = PDFType.TEXT_BASED
+        # adaptive: picks one library from sample pages (or the learned layout), best_of: reads with both libraries
+        self.strategy = strategy
+        self.method = f'{strategy}_pypdf2_pdfplumber'
+        self.backend_strategy = backend_strategy or BackendStrategy.default()
+        self._backend: str | None = None
+        self._sampled_pages: Dict[int, Dict[str, Any]] = {}
+        # Number of processes that read page ranges of large files in parallel, 1 disables the pool
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Smaller files are read in the current process, starting workers costs more than reading them
+        self.min_pages_per_worker = min_pages_per_worker
 
     def read_content(self) -> Dict[str, Any]:
         """
-        This function reads content from native PDFs. Tries 2 PDF reader library, and uses the best one.
+        This function reads content from native PDFs. Tries 2 PDF reader library, and uses the best one. In adaptive
+        strategy the libraries are only compared on a few sample pages, and the rest of the file is read only with the
+        winner.
         :return: A dictionary containing data read from a file
         """
         if not self.validate_file():
@@ -23,11 +70,30 @@ class TextBasedPDFReader(Reader):
             }
 
         try:
-            # Reading with PyPDF2
-            content_pypdf2 = self._read_with_pypdf2()
+            if self.strategy == "adaptive":
+                backend = self.choose_backend()
+                return {
+                    "success": True,
+                    'filename': self.file_path,
+                    "pdf_type": self.pdf_type.value,
+                    "content": self._collect_pages(self.iter_pages(), backend),
+                }
+
+            page_ranges = self._page_ranges()
+            if page_ranges is None:
+                # Reading with PyPDF2
+                content_pypdf2 = self._read_with_pypdf2()
 
-            # Reading with PDFPlumber
-            content_pdfplumber = self._read_with_pdfplumber()
+                # Reading with PDFPlumber
+                content_pdfplumber = self._read_with_pdfplumber()
+            else:
+                # Reading with both libraries in parallel
+                pages = self._read_parallel(["pypdf2", "pdfplumber"], page_ranges)
+                content_pypdf2, content_pdfplumber = (
+                    self._collect_pages(pages[backend], backend) if pages[backend] is not None
+                    else {"text": "", "pages": [], "pages_count": 0, "error": f"{backend} could not read the file"}
+                    for backend in ["pypdf2", "pdfplumber"]
+                )
 
             # Selecting the better one
             final_content = content_pdfplumber if len(content_pdfplumber.get('text', '')) > len(content_pypdf2.get('text', '')) else content_pypdf2
@@ -40,38 +106,73 @@ class TextBasedPDFReader(Reader):
             }
         except Exception as e:
             print(f"PDF reading error: {e}")
+            return {"success": False, "error": str(e)}
 
-    def _read_with_pypdf2(self) -> Dict[str, Any]:
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
         """
-        This function reads content from native PDFs. Uses PyPDF2 for reading PDFs,
-        :return: A dictionary containing data read from a file
+        This function reads native PDFs page by page. Every page is read with the library of the strategy. Large
+        files are split into page ranges that are read by a process pool, and the pages are yielded in order.
+        :return: Iterator of dictionaries containing data read from each page
         """
-        try:
-            with open(self.file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                pages_content = []
-                full_text = ""
+        page_ranges = self._page_ranges()
+        if page_ranges is None:
+            for page_num in range(self.document.page_count):
+                yield self.read_page(page_num)
+            return
 
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
+        backends = [self.choose_backend()] if self.strategy == "adaptive" else ["pypdf2", "pdfplumber"]
+        starts, ends = zip(*page_ranges)
+        with ProcessPoolExecutor(max_workers=len(page_ranges)) as executor:
+            for pages in executor.map(_read_page_range, repeat(self.file_path), repeat(backends), starts, ends):
+                if all(pages[backend] is None for backend in backends):
+                    raise Exception("Page range could not be read")
+                if len(backends) == 1:
+                    yield from pages[backends[0]]
+                elif pages["pypdf2"] is None or pages["pdfplumber"] is None:
+                    yield from pages["pypdf2"] or pages["pdfplumber"]
+                else:
+                    for page_pypdf2, page_pdfplumber in zip(pages["pypdf2"], pages["pdfplumber"]):
+                        yield page_pdfplumber if len(page_pdfplumber["text"]) > len(page_pypdf2["text"]) else page_pypdf2
 
-                    # Grouping the data
-                    tables = extract_tables_from_page_text(page_text)
+    def _page_ranges(self) -> List[Tuple[int, int]] | None:
+        """
+        This function splits the pages of the file into contiguous ranges, one range for each worker.
+        :return: (start, end) page ranges, None if the file is too small to be read in parallel
+        """
+        page_count = self.document.page_count
+        workers = min(self.max_workers, page_count // self.min_pages_per_worker)
+        if workers <= 1:
+            return None
+        range_size = math.ceil(page_count / workers)
+        return [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
 
-                    pages_content.append({
-                        "page_number": page_num + 1,
-                        "text": page_text,
-                        "tables": tables,
-                        "method": "pypdf2"
-                    })
-                    full_text += page_text + "\n"
+    def _read_parallel(self, backends: List[str], page_ranges: List[Tuple[int, int]]) -> Dict[str, List | None]:
+        """
+        This function reads the page ranges with the given libraries in a process pool and merges them in order.
+        :param backends: Names of the libraries to read with
+        :param page_ranges: (start, end) page ranges
+        :return: Pages of the file by library, None for a library that could not read every range
+        """
+        pages = {backend: [] for backend in backends}
+        starts, ends = zip(*page_ranges)
+        with ProcessPoolExecutor(max_workers=len(page_ranges)) as executor:
+            for range_pages in executor.map(_read_page_range, repeat(self.file_path), repeat(backends), starts, ends):
+                for backend in backends:
+                    if pages[backend] is None or range_pages[backend] is None:
+                        pages[backend] = None
+                    else:
+                        pages[backend].extend(range_pages[backend])
+        return pages
 
-                return {
-                    "text": full_text,
-                    "pages": pages_content,
-                    "pages_count": len(pdf_reader.pages),
-                    "method": "pypdf2"
-                }
+    def _read_with_pypdf2(self) -> Dict[str, Any]:
+        """
+        This function reads content from native PDFs. Uses PyPDF2 for reading PDFs,
+        :return: A dictionary containing data read from a file
+        """
+        try:
+            page_count = len(self.document.pypdf2.pages)
+            return self._collect_pages((self._read_page_with_pypdf2(page_num) for page_num in range(page_count)),
+                                       "pypdf2")
 
         except Exception as e:
             print(f"PyPDF2 reading error: {e}")
@@ -83,33 +184,140 @@ class TextBasedPDFReader(Reader):
         :return: A dictionary containing data read from a file
         """
         try:
-            with pdfplumber.open(self.file_path) as pdf:
-                pages_content = []
-                full_text = ""
+            page_count = len(self.document.pdfplumber.pages)
+            return self._collect_pages((self._read_page_with_pdfplumber(page_num) for page_num in range(page_count)),
+                                       "pdfplumber")
 
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text() or ""
+        except Exception as e:
+            print(f"pdfplumber reading error: {e}")
+            return {"text": "", "pages": [], "pages_count": 0, "error": str(e)}
 
-                    # Grouping the data with built-in function of PDFPlumber
-                    tables = page.extract_tables()
+    def _read_page_with_pypdf2(self, page_num: int) -> Dict[str, Any]:
+        """
+        This function reads a single page of native PDFs with PyPDF2.
+        :param page_num: Zero based index of the page
+        :return: A dictionary containing data read from the page
+        """
+        page_text = self.document.pypdf2.pages[page_num].extract_text()
 
-                    page_info = {
-                        "page_number": page_num + 1,
-                        "text": page_text,
-                        "tables": tables,
-                        "method": "pdfplumber"
-                    }
+        # Grouping the data
+        tables = extract_tables_from_page_text(page_text)
 
-                    pages_content.append(page_info)
-                    full_text += page_text + "\n"
+        return {
+            "page_number": page_num + 1,
+            "text": page_text,
+            "tables": tables,
+            "method": "pypdf2"
+        }
 
-                return {
-                    "text": full_text,
-                    "pages": pages_content,
-                    "pages_count": len(pdf.pages),
-                    "method": "pdfplumber"
-                }
+    def _read_page_with_pdfplumber(self, page_num: int) -> Dict[str, Any]:
+        """
+        This function reads a single page of native PDFs with PDFPlumber.
+        :param page_num: Zero based index of the page
+        :return: A dictionary containing data read from the page
+        """
+        page = self.document.pdfplumber.pages[page_num]
+        page_text = page.extract_text() or ""
 
-        except Exception as e:
-            print(f"pdfplumber reading error: {e}")
-            return {"text": "", "pages": [], "pages_count": 0, "error": str(e)}
\ No newline at end of file
+        # Grouping the data with built-in function of PDFPlumber
+        tables = page.extract_tables()
+
+        return {
+            "page_number": page_num + 1,
+            "text": page_text,
+            "tables": tables,
+            "method": "pdfplumber"
+        }
+
+    def choose_backend(self) -> str:
+        """
+        This function picks the library that reads the file. The learned library of the layout is used if there is
+        one, otherwise sample pages are read with both libraries and the one with the longer text wins.
+        :return: Name of the library
+        """
+        if self._backend is None:
+            fingerprint = self.backend_strategy.fingerprint(self.document)
+            backend = self.backend_strategy.preferred_backend(fingerprint, self.document.content_hash)
+            if backend is None:
+                backend = self._sample_backends(self.backend_strategy.sample_page_numbers(self.document.page_count))
+                self.backend_strategy.record(fingerprint, backend)
+            self._backend = backend
+        return self._backend
+
+    def _sample_backends(self, page_numbers: List[int]) -> str:
+        """
+        This function reads the sample pages with both libraries and keeps the pages of the winner, so they are not
+        read again.
+        :param page_numbers: Zero based indexes of the sample pages
+        :return: Name of the library with the longer text
+        """
+        sampled_pages = {"pypdf2": {}, "pdfplumber": {}}
+        text_lengths = {"pypdf2": 0, "pdfplumber": 0}
+        readers = {"pypdf2": self._read_page_with_pypdf2, "pdfplumber": self._read_page_with_pdfplumber}
+
+        for backend, read_page in readers.items():
+            try:
+                for page_num in page_numbers:
+                    sampled_pages[backend][page_num] = read_page(page_num)
+                    text_lengths[backend] += len(sampled_pages[backend][page_num]["text"])
+            except Exception as e:
+                print(f"{backend} reading error: {e}")
+                text_lengths[backend] = -1
+
+        # pdfplumber has to be strictly better, like the comparison of the best_of strategy
+        backend = "pdfplumber" if text_lengths["pdfplumber"] > text_lengths["pypdf2"] else "pypdf2"
+        self._sampled_pages = sampled_pages[backend]
+        return backend
+
+    def read_page(self, page_num: int) -> Dict[str, Any]:
+        """
+        This function reads a single page. In adaptive strategy the page is read with the chosen library, otherwise it
+        is read with both libraries and the best one is used, like read_content does for the whole file.
+        :param page_num: Zero based index of the page
+        :return: A dictionary containing data read from the page
+        """
+        if self.strategy == "adaptive":
+            backend = self.choose_backend()
+            if page_num in self._sampled_pages:
+                return self._sampled_pages.pop(page_num)
+            return self.read_page_with_fallback(backend, page_num)
+
+        page_pypdf2 = self._read_page_with_pypdf2(page_num)
+        page_pdfplumber = self._read_page_with_pdfplumber(page_num)
+        return page_pdfplumber if len(page_pdfplumber["text"]) > len(page_pypdf2["text"]) else page_pypdf2
+
+    def read_page_with(self, backend: str, page_num: int) -> Dict[str, Any]:
+        """
+        This function reads a single page with the given library.
+        :param backend: Name of the library, pypdf2 or pdfplumber
+        :param page_num: Zero based index of the page
+        :return: A dictionary containing data read from the page
+        """
+        if backend == "pdfplumber":
+            return self._read_page_with_pdfplumber(page_num)
+        return self._read_page_with_pypdf2(page_num)
+
+    def read_page_with_fallback(self, backend: str, page_num: int) -> Dict[str, Any]:
+        """
+        This function reads a single page with the given library. If the library fails on the page, the page is read
+        with the other library. If both libraries fail, the page is kept empty with the error, so one bad page does not
+        fail the whole file.
+        :param backend: Name of the preferred library, pypdf2 or pdfplumber
+        :param page_num: Zero based index of the page
+        :return: A dictionary containing data read from the page
+        """
+        errors = []
+        for page_backend in [backend, "pypdf2" if backend == "pdfplumber" else "pdfplumber"]:
+            try:
+                return self.read_page_with(page_backend, page_num)
+            except Exception as e:
+                print(f"{page_backend} reading error on page {page_num + 1}: {e}")
+                errors.append(f"{page_backend}: {e}")
+
+        return {
+            "page_number": page_num + 1,
+            "text": "",
+            "tables": [],
+            "method": backend,
+            "error": "; ".join(errors)
+        }
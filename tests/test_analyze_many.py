@@ -0,0 +1,70 @@
+import json
+import re
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from analyzers.invoice_analyzer import InvoiceAnalyzer
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Answers /api/generate like an Ollama server. The invoice number of the response is the invoice text of the prompt,
+    so results can be matched with their texts. Requests are slow, so concurrent requests overlap.
+    """
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            invoice_text = re.search(r"INVOICE-(\d+)", body["prompt"]).group(1)
+            # Later invoices are answered first, results must still be in the order of the texts
+            time.sleep(0.05 + 0.02 * (10 - int(invoice_text)))
+            response = {
+                "invoice_details": {"invoice_number": invoice_text},
+                "line_items": [],
+                "total_details": {"subtotal": 0, "vat (20%)": 0, "total": 0},
+            }
+            data = json.dumps({"response": json.dumps(response), "done": True}).encode()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AnalyzeManyTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.analyzer = InvoiceAnalyzer(api_url=f"http://127.0.0.1:{self.server.server_port}/api/generate",
+                                        max_concurrency=3, keep_alive=None)
+
+    def tearDown(self):
+        self.analyzer.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_results_are_in_the_order_of_the_texts(self):
+        results = self.analyzer.analyze_many(f"INVOICE-{index}" for index in range(10))
+        self.assertEqual([result["invoice_details"]["invoice_number"] for result in results],
+                         [str(index) for index in range(10)])
+
+    def test_concurrent_requests_are_limited(self):
+        self.analyzer.analyze_many(f"INVOICE-{index}" for index in range(10))
+        self.assertEqual(self.server.max_in_flight, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
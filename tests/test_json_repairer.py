@@ -0,0 +1,49 @@
+import unittest
+from analyzers.json_repairer import _UNREPAIRABLE, coerce_value, parse_number
+
+_AMOUNT = {"type": "number"}
+
+
+class ParseNumberTest(unittest.TestCase):
+    def test_last_separator_is_the_decimal_separator(self):
+        self.assertEqual(parse_number("$1,250.00"), 1250.0)
+        self.assertEqual(parse_number("1.250,00 EUR"), 1250.0)
+        self.assertEqual(parse_number("1.250.000,5"), 1250000.5)
+
+    def test_repeated_separator_separates_thousands(self):
+        self.assertEqual(parse_number("1.250.000"), 1250000)
+        self.assertEqual(parse_number("1,250,000"), 1250000)
+
+    def test_single_separator_without_three_digits_is_decimal(self):
+        self.assertEqual(parse_number("12,50"), 12.5)
+        self.assertEqual(parse_number("12.5"), 12.5)
+        self.assertEqual(parse_number("-3,5"), -3.5)
+
+    def test_integer_part_that_cannot_be_grouped_is_decimal(self):
+        self.assertEqual(parse_number("0,125"), 0.125)
+        self.assertEqual(parse_number("1234.567"), 1234.567)
+
+    def test_single_separator_with_three_digits_is_ambiguous(self):
+        for text in ["1.250", "1,250", "€ 250.000", "-12,500"]:
+            with self.assertRaises(ValueError):
+                parse_number(text)
+
+    def test_integers(self):
+        self.assertEqual(parse_number("£ 42"), 42)
+
+
+class CoerceValueTest(unittest.TestCase):
+    def test_amounts_are_converted(self):
+        self.assertEqual(coerce_value("1.250,00", _AMOUNT), 1250.0)
+        self.assertEqual(coerce_value("$1,250.00", _AMOUNT), 1250.0)
+
+    def test_ambiguous_amounts_are_left_to_the_llm(self):
+        self.assertIs(coerce_value("1.250", _AMOUNT), _UNREPAIRABLE)
+        self.assertIs(coerce_value("1,250", {"type": ["number", "null"]}), _UNREPAIRABLE)
+
+    def test_text_is_not_an_amount(self):
+        self.assertIs(coerce_value("n/a", _AMOUNT), _UNREPAIRABLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm_backends.llm_backend_factory import LLMBackendFactory
+from llm_backends.llm_backend_pool import LLMBackendPool
+from llm_backends.ollama_backend import OllamaBackend
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Answers /api/generate like an Ollama server after the delay of the server, and counts the requests in flight.
+    """
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            data = json.dumps({"response": server.response, "done": True}).encode()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server(delay: float, response: str) -> ThreadingHTTPServer:
+    """
+    This function starts a stub Ollama server on a free local port.
+    :param delay: Seconds of each request
+    :param response: Generated text of every request
+    :return: Running server
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllamaHandler)
+    server.lock = threading.Lock()
+    server.delay = delay
+    server.response = response
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class LLMBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+        self.backend = None
+
+    def tearDown(self):
+        if self.backend is not None:
+            self.backend.close()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def _api_url(self, delay: float, response: str = "{}") -> str:
+        server = _start_server(delay, response)
+        self.servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/api/generate"
+
+    def test_single_endpoint_limits_concurrent_requests(self):
+        self.backend = LLMBackendFactory.create_backend("ollama", [self._api_url(0.05)], max_concurrency=2)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: self.backend.generate("model", "prompt", {}), range(8)))
+        self.assertEqual(self.servers[0].requests, 8)
+        self.assertEqual(self.servers[0].max_in_flight, 2)
+
+    def test_pool_sends_stalled_request_to_another_node(self):
+        stalled_url, fast_url = self._api_url(2.0, "stalled"), self._api_url(0.05, "fast")
+        self.backend = LLMBackendPool([OllamaBackend(stalled_url, max_concurrency=1),
+                                       OllamaBackend(fast_url, max_concurrency=1)], request_deadline=0.3)
+        start = time.monotonic()
+        result = self.backend.generate("model", "prompt", {})
+        self.assertEqual(result["response"], "fast")
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertFalse(self.backend.get_stats()[0]["healthy"])
+
+    def test_pool_waits_for_the_first_free_slot(self):
+        self.backend = LLMBackendPool([OllamaBackend(self._api_url(0.05), max_concurrency=1),
+                                       OllamaBackend(self._api_url(0.05), max_concurrency=1)])
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: self.backend.generate("model", "prompt", {}), range(6)))
+        self.assertEqual([server.max_in_flight for server in self.servers], [1, 1])
+        self.assertEqual(sum(server.requests for server in self.servers), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,42 @@
 import json
 import os
 import re
-from typing import Any, List
+from typing import Any, Dict, List, Tuple
 import cv2
-import PyPDF2
 import numpy as np
-import pytesseract
 from PIL import Image
+from ocr_engines.ocr_engine_factory import OCREngineFactory, DEFAULT_OCR_ENGINE
 from readers.pdf_type import PDFType
+from readers.pdf_document import PDFDocument
+from readers.pdf_type_detector import PDFTypeDetector
+
+
+# Named profiles of the image preprocessing before OCR. They are also a part of the reader cache keys.
+# denoise: "never", "always" or "adaptive" (only if the estimated noise is above noise_threshold)
+PREPROCESSING_PROFILES = {
+    "fast": {
+        "denoise": "never",
+        "noise_threshold": None,
+        "clahe_clip_limit": None,
+        "clahe_tile_grid_size": None,
+        "binarization": "otsu",
+    },
+    "balanced": {
+        "denoise": "adaptive",
+        "noise_threshold": 4.0,
+        "clahe_clip_limit": 2.0,
+        "clahe_tile_grid_size": (8, 8),
+        "binarization": "otsu",
+    },
+    "aggressive": {
+        "denoise": "always",
+        "noise_threshold": None,
+        "clahe_clip_limit": 2.0,
+        "clahe_tile_grid_size": (8, 8),
+        "binarization": "otsu",
+    },
+}
+DEFAULT_PREPROCESSING_PROFILE = "balanced"
 
 
 def export_outputs_as_json(result: dict[str, Any], filename: str, folder_path: str):
@@ -24,54 +53,181 @@ def export_outputs_as_json(result: dict[str, Any], filename: str, folder_path: s
         json.dump(result, f, indent=4, ensure_ascii=False)
 
 
-def detect_pdf_type(file_path: str) -> PDFType:
+def classify_pdf_pages(document: PDFDocument | str, min_text_length: int = 50) -> List[PDFType]:
+    """
+    This function classifies every page of given PDF separately. A page is text based if it has a text layer with
+    enough characters, otherwise it is a scanned image page that needs OCR. Pages are classified from their resources
+    and content streams, and the results are memoized by the content hash of the file.
+    :param document: Shared document handle (or path of the file) to classify
+    :param min_text_length: Minimum number of characters for a page to be accepted as text based
+    :return: Type of each page of the file
+    """
+    detector = PDFTypeDetector.default()
+    if detector.min_text_length != min_text_length:
+        detector = PDFTypeDetector(detector.cache, min_text_length=min_text_length)
+    return [page["page_type"] for page in detector.classify_pages(document)]
+
+
+def pdf_type_from_pages(page_types: List[PDFType]) -> PDFType:
+    """
+    This function combines types of the pages into the type of the whole file.
+    :param page_types: Type of each page of the file
+    :return: Type of the file
+    """
+    unique_types = set(page_types)
+
+    if not unique_types or unique_types == {PDFType.SCANNED_IMAGE}:
+        return PDFType.SCANNED_IMAGE
+    if unique_types == {PDFType.TEXT_BASED}:
+        return PDFType.TEXT_BASED
+    return PDFType.MIXED
+
+
+def detect_pdf_type(document: PDFDocument | str) -> PDFType:
     """
-    This function detects type of given PDF by using custom enum
-    :param file_path: File to detect type
+    This function detects type of given PDF by using custom enum. If the file has both text based and scanned pages,
+    it is detected as mixed.
+    :param document: Shared document handle (or path of the file) to detect type
     :return: Type of the file
     """
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-
-            text_found = False
-            for page_number in range(min(3, len(pdf_reader.pages))):
-                page = pdf_reader.pages[page_number]
-                text = page.extract_text().strip()
-                if len(text) > 50:
-                    text_found = True
-                    break
-            return PDFType.TEXT_BASED if text_found else PDFType.SCANNED_IMAGE
+        return pdf_type_from_pages(classify_pdf_pages(document))
     except Exception as e:
         print(f"PDF type not detected: {e}")
         return PDFType.MIXED
 
 
-def preprocess_image(image: Image.Image) -> Image.Image:
+def to_grayscale_array(image: Image.Image | np.ndarray) -> np.ndarray:
+    """
+    This function converts the given image to a grayscale NumPy array. Grayscale arrays are returned as they are,
+    without any copy.
+    :param image: A PIL.Image object or NumPy array
+    :return: Grayscale image as a 2D uint8 array
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        return image
+
+    # PIL converts to grayscale itself, so the RGB array is never created
+    if image.mode != "L":
+        image = image.convert("L")
+    return np.asarray(image)
+
+
+def estimate_noise(gray: np.ndarray) -> float:
+    """
+    This function estimates the standard deviation of the noise of a grayscale image with Immerkaer's fast method.
+    It is a single convolution, so it is much cheaper than denoising the image.
+    :param gray: Grayscale image as a 2D array
+    :return: Estimated noise sigma, clean scans are usually below 3
+    """
+    height, width = gray.shape
+    if height < 3 or width < 3:
+        return 0.0
+
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    response = cv2.filter2D(gray.astype(np.float32), -1, kernel)[1:-1, 1:-1]
+    return float(np.sum(np.abs(response)) * np.sqrt(0.5 * np.pi) / (6 * (width - 2) * (height - 2)))
+
+
+def needs_denoising(gray: np.ndarray, profile: str = DEFAULT_PREPROCESSING_PROFILE) -> bool:
+    """
+    This function decides if the denoising step of the profile runs for a page. The noise must be estimated on the
+    whole page (or a low resolution render of it), crops of dense text look noisy to the estimator.
+    :param gray: Grayscale image of the whole page as a 2D array
+    :param profile: Name of the preprocessing profile, one of PREPROCESSING_PROFILES
+    :return: If the page is denoised it returns True, otherwise it returns False
+    """
+    params = PREPROCESSING_PROFILES[profile]
+    return params["denoise"] == "always" or (
+        params["denoise"] == "adaptive" and estimate_noise(gray) > params["noise_threshold"])
+
+
+def preprocess_image(image: Image.Image | np.ndarray, profile: str = DEFAULT_PREPROCESSING_PROFILE,
+                     denoise: bool | None = None) -> np.ndarray:
     """
-    This function preprocesses a given PIL image to enhance text visibility for OCR.
-    :param image: A PIL.Image object representing the input image
-    :return: A binarized and enhanced PIL.Image object suitable for OCR or further processing
+    This function preprocesses a given image to enhance text visibility for OCR. Steps are chosen by the given
+    profile, and the slow denoising step is skipped when the page is clean. The image stays as a NumPy array, which
+    can be given to Tesseract directly.
+    :param image: A PIL.Image object or NumPy array representing the input image
+    :param profile: Name of the preprocessing profile, one of PREPROCESSING_PROFILES
+    :param denoise: (Optional) Denoising decision of the whole page, required when the image is a region of a page.
+                    Decided from the image itself if it is None
+    :return: A binarized and enhanced grayscale array suitable for OCR or further processing
     """
+    params = PREPROCESSING_PROFILES[profile]
     try:
-        img_array = np.array(image)
-        if len(img_array.shape) == 3:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img_array
+        gray = to_grayscale_array(image)
 
-        denoised = cv2.fastNlMeansDenoising(gray)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(denoised)
+        if denoise is None:
+            denoise = needs_denoising(gray, profile)
+        enhanced = cv2.fastNlMeansDenoising(gray) if denoise else gray
+
+        if params["clahe_clip_limit"] is not None:
+            clahe = cv2.createCLAHE(clipLimit=params["clahe_clip_limit"],
+                                    tileGridSize=params["clahe_tile_grid_size"])
+            enhanced = clahe.apply(enhanced)
 
         _, thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        return Image.fromarray(thresh)
+        return thresh
 
     except Exception as e:
         print(f"Image preprocessing error: {e}")
         return image
 
 
+def detect_text_regions(gray: np.ndarray, min_component_area: int = 4,
+                        max_regions: int = 8) -> Tuple[float | None, List[Tuple[int, int, int, int]]]:
+    """
+    This function finds the text regions of a low resolution page image and estimates the text height. Blank margins
+    are left out, and text separated by large vertical gaps is split into horizontal bands, so OCR can run only on
+    the regions that have content.
+    :param gray: Grayscale image of the page as a 2D array
+    :param min_component_area: (Optional) Smaller ink components are treated as scan noise
+    :param max_regions: (Optional) If there are more bands, the whole content area is returned as a single region
+    :return: Median character height in pixels (None for blank pages) and regions as (x0, y0, x1, y1) pixel boxes
+    """
+    # Nearly uniform images are blank pages, Otsu would turn their noise into ink
+    if gray.size == 0 or gray.std() < 4:
+        return None, []
+
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+    # First component is the background
+    stats = stats[1:]
+    stats = stats[(stats[:, cv2.CC_STAT_AREA] >= min_component_area)
+                  & (stats[:, cv2.CC_STAT_HEIGHT] < gray.shape[0] * 0.2)]
+    if len(stats) == 0:
+        return None, []
+
+    text_height = float(np.median(stats[:, cv2.CC_STAT_HEIGHT]))
+    x0 = stats[:, cv2.CC_STAT_LEFT]
+    y0 = stats[:, cv2.CC_STAT_TOP]
+    x1 = x0 + stats[:, cv2.CC_STAT_WIDTH]
+    y1 = y0 + stats[:, cv2.CC_STAT_HEIGHT]
+
+    # Components are merged into bands while the vertical gap between them is smaller than two text heights
+    order = np.argsort(y0)
+    band_gap = text_height * 2
+    regions = []
+    band = [x0[order[0]], y0[order[0]], x1[order[0]], y1[order[0]]]
+    for index in order[1:]:
+        if y0[index] - band[3] > band_gap:
+            regions.append(tuple(int(value) for value in band))
+            band = [x0[index], y0[index], x1[index], y1[index]]
+        else:
+            band = [min(band[0], x0[index]), band[1], max(band[2], x1[index]), max(band[3], y1[index])]
+    regions.append(tuple(int(value) for value in band))
+
+    # Every region costs a separate OCR call, too many small bands are not worth it
+    if len(regions) > max_regions:
+        regions = [(int(x0.min()), int(y0.min()), int(x1.max()), int(y1.max()))]
+
+    return text_height, regions
+
+
 def extract_tables_from_page_text(page_text: str) -> List[List[str]]:
     """
     This function extracts/groups given text of the page by regex process
@@ -90,76 +246,94 @@ def extract_tables_from_page_text(page_text: str) -> List[List[str]]:
     return tables
 
 
-def ocr_text_with_paragraphs(image, ocr_config='--oem 3 --psm 8', threshold_factor=1.0):
+def group_ocr_lines(data: Dict[str, list], threshold_factor: float = 1.0) -> Tuple[str, List[Dict[str, Any]]]:
     """
-    This function performs Optical Character Recognition (OCR) on a given image and reconstructs the recognized text
-    with basic paragraph and line separation logic based on line spacing.
-    :param image: A PIL.Image object containing the image to be processed
-    :param ocr_config: Tesseract OCR configuration string. Defaults to '--oem 3 --psm 8'
+    This function reconstructs lines and paragraphs from the word boxes of Tesseract (image_to_data output). Words are
+    grouped into lines once by their (block_num, par_num, line_num), and the top, bottom and height of every line are
+    calculated in bulk with NumPy, so the cost grows linearly with the number of boxes.
+    :param data: Output of pytesseract.image_to_data as a dictionary
     :param threshold_factor: (Optional) A multiplier for average line height to determine paragraph spacing
                              Larger values make paragraph detection stricter. Default is 1.0
-    :return: A string containing the reconstructed OCR text with appropriate newlines and paragraph breaks
+    :return: Reconstructed text with line/paragraph breaks, and the lines with their bounding boxes and confidences
     """
-    data = pytesseract.image_to_data(image, config=ocr_config, output_type=pytesseract.Output.DICT)
+    words = np.array([str(text).strip() for text in data['text']], dtype=object)
+    is_word = np.fromiter((word != "" for word in words), dtype=bool, count=len(words))
+    if not is_word.any():
+        return "", []
 
-    n_boxes = len(data['level'])
-    lines = []
-    last_line_num = -1
-    line_text = ""
-
-    # Group words into lines based on line_num
-    for i in range(n_boxes):
-        line_num = data['line_num'][i]
-        text = data['text'][i].strip()
-
-        if text == "":
-            continue
-
-        if line_num != last_line_num:
-            if line_text:
-                lines.append((last_line_num, line_text))
-            line_text = text
-            last_line_num = line_num
-        else:
-            line_text += " " + text
+    words = words[is_word]
+    block_nums = np.asarray(data['block_num'], dtype=np.int64)[is_word]
+    par_nums = np.asarray(data['par_num'], dtype=np.int64)[is_word]
+    line_nums = np.asarray(data['line_num'], dtype=np.int64)[is_word]
+    lefts = np.asarray(data['left'], dtype=np.int64)[is_word]
+    tops = np.asarray(data['top'], dtype=np.int64)[is_word]
+    widths = np.asarray(data['width'], dtype=np.int64)[is_word]
+    heights = np.asarray(data['height'], dtype=np.int64)[is_word]
+    confidences = np.asarray(data['conf'], dtype=np.float64)[is_word]
 
-    if line_text:
-        lines.append((last_line_num, line_text))
+    # Tesseract returns words in reading order, so every line is a continuous run of the same line key
+    line_keys = np.stack([block_nums, par_nums, line_nums], axis=1)
+    line_starts = np.concatenate(([0], np.flatnonzero(np.any(line_keys[1:] != line_keys[:-1], axis=1)) + 1))
+    line_ends = np.append(line_starts[1:], len(words))
 
-    result_text = ""
-    last_bottom = None
-    last_top = None
+    line_tops = np.minimum.reduceat(tops, line_starts)
+    line_bottoms = np.maximum.reduceat(tops + heights, line_starts)
+    line_lefts = np.minimum.reduceat(lefts, line_starts)
+    line_rights = np.maximum.reduceat(lefts + widths, line_starts)
+    line_confidences = np.add.reduceat(confidences, line_starts) / (line_ends - line_starts)
 
-    # Calculate average line height for spacing-based decisions
-    heights = [data['height'][i] for i in range(n_boxes) if data['text'][i].strip() != ""]
-    avg_line_height = sum(heights) / len(heights) if heights else 15  # default 15 px
+    # Average word height is used for spacing-based paragraph decisions
+    avg_line_height = heights.mean()
+    paragraph_gaps = (line_tops[1:] - line_bottoms[:-1]) > avg_line_height * threshold_factor * 1.5
 
-    # Reconstruct text with line/paragraph breaks based on vertical spacing
-    for i, (line_num, text) in enumerate(lines):
-        ys = [data['top'][j] for j in range(n_boxes) if data['line_num'][j] == line_num]
-        hs = [data['height'][j] for j in range(n_boxes) if data['line_num'][j] == line_num]
+    lines = []
+    text_parts = []
+    for index, (start, end) in enumerate(zip(line_starts, line_ends)):
+        line_text = " ".join(words[start:end])
+        if index > 0:
+            text_parts.append("\n\n" if paragraph_gaps[index - 1] else "\n")
+        text_parts.append(line_text)
 
-        if not ys or not hs:
-            continue
+        lines.append({
+            "text": line_text,
+            "bbox": [int(line_lefts[index]), int(line_tops[index]), int(line_rights[index]), int(line_bottoms[index])],
+            "confidence": round(float(line_confidences[index]), 2),
+            "block_num": int(block_nums[start]),
+            "par_num": int(par_nums[start]),
+            "line_num": int(line_nums[start]),
+        })
 
-        top = min(ys)
-        bottom = max([y + h for y, h in zip(ys, hs)])
+    return "".join(text_parts), lines
 
-        if last_bottom is None:
-            result_text += text
-        else:
-            gap = top - last_bottom
-            adjusted_threshold = avg_line_height * threshold_factor
 
-            if line_num != lines[i-1][0]:
-                if gap > adjusted_threshold * 1.5:
-                    result_text += "\n\n" + text
-                else:
-                    result_text += "\n" + text
-            else:
-                result_text += " " + text
+def ocr_lines_with_paragraphs(image, ocr_config='--oem 3 --psm 8', threshold_factor=1.0,
+                              ocr_engine=DEFAULT_OCR_ENGINE, dpi=None) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    This function performs Optical Character Recognition (OCR) on a given image and reconstructs the recognized text
+    with line and paragraph separation. It also returns every line with its bounding box and confidence.
+    :param image: A PIL.Image object or NumPy array containing the image to be processed
+    :param ocr_config: Tesseract OCR configuration string. Defaults to '--oem 3 --psm 8'
+    :param threshold_factor: (Optional) A multiplier for average line height to determine paragraph spacing
+    :param ocr_engine: (Optional) Name of the OCR engine, the engine is reused by every call of the process
+    :param dpi: (Optional) Render resolution of the image, Tesseract guesses it if it is not given
+    :return: Reconstructed OCR text, and the lines with their bounding boxes and confidences
+    """
+    data = OCREngineFactory.get_engine(ocr_engine).image_to_data(image, ocr_config, dpi)
+    return group_ocr_lines(data, threshold_factor)
 
-        last_bottom = bottom
-        last_top = top
 
-    return result_text
+def ocr_text_with_paragraphs(image, ocr_config='--oem 3 --psm 8', threshold_factor=1.0,
+                             ocr_engine=DEFAULT_OCR_ENGINE, dpi=None):
+    """
+    This function performs Optical Character Recognition (OCR) on a given image and reconstructs the recognized text
+    with basic paragraph and line separation logic based on line spacing.
+    :param image: A PIL.Image object containing the image to be processed
+    :param ocr_config: Tesseract OCR configuration string. Defaults to '--oem 3 --psm 8'
+    :param threshold_factor: (Optional) A multiplier for average line height to determine paragraph spacing
+                             Larger values make paragraph detection stricter. Default is 1.0
+    :param ocr_engine: (Optional) Name of the OCR engine
+    :param dpi: (Optional) Render resolution of the image
+    :return: A string containing the reconstructed OCR text with appropriate newlines and paragraph breaks
+    """
+    text, _ = ocr_lines_with_paragraphs(image, ocr_config, threshold_factor, ocr_engine, dpi)
+    return text
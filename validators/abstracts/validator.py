@@ -36,10 +36,13 @@ class Validator(ABC):
         pass
 
     @abstractmethod
-    def generate_report(self, filename: str) -> Dict:
+    def generate_report(self, filename: str, line_item_issues: List[Dict] | None = None,
+                        total_consistency: Dict | None = None) -> Dict:
         """
         This function combines other validator and report generator functions to get the complete report of the file.
         :param filename: Filename to generate report
+        :param line_item_issues: (Optional) Precalculated result of check_line_item_consistency
+        :param total_consistency: (Optional) Precalculated result of check_total_consistency
         :return: General report of the file
         """
         pass
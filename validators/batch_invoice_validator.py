@@ -0,0 +1,311 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from validators.invoice_validator import InvoiceValidator
+
+# Python rounding is decided on the exact value, NumPy rounds the value multiplied by 100. They can only disagree when
+# the scaled value is this close (relative) to a half cent, such values are rounded again with Python
+_HALF_CENT_TOLERANCE = 1e-9
+_VAT_RATE_PATTERN = re.compile(r'\((\d+(?:\.\d+)?)\%?\)')
+# Types of the amounts that are checked in the columnar arrays, null amounts are zero
+_NUMBER_TYPES = {int, float}
+# Types of the PO numbers that are checked without the invoice validator
+_PO_NUMBER_TYPES = {str, type(None)}
+# Larger integers are exact in Python but not in float64
+_MAX_EXACT_INTEGER = 2 ** 53
+
+
+@lru_cache(maxsize=None)
+def _vat_key(keys: Tuple[str, ...]) -> str | None:
+    """
+    This function finds the VAT field of the totals like the invoice validator. Invoices of an archive mostly have the
+    same fields, so the result is cached by the field names.
+    :param keys: Field names of the totals
+    :return: Name of the first VAT field, None if there is no VAT field
+    """
+    return next((key for key in keys if "vat" in key.lower()), None)
+
+
+@lru_cache(maxsize=None)
+def _vat_rate(vat_key: str) -> float:
+    """
+    This function finds the VAT rate in the name of the VAT field like the invoice validator, e.g. "vat (20%)".
+    :param vat_key: Name of the VAT field
+    :return: VAT rate, 0.20 if the name has no rate
+    """
+    vat_rate_match = _VAT_RATE_PATTERN.search(vat_key)
+    return float(vat_rate_match.group(1)) / 100 if vat_rate_match else 0.20
+
+
+def _is_half_cent(values: np.ndarray) -> np.ndarray:
+    """
+    This function finds the values whose rounding to 2 decimals is ambiguous.
+    :param values: Values to round
+    :return: Mask of the values that are close to a half cent
+    """
+    scaled = values * 100
+    return np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= _HALF_CENT_TOLERANCE * np.maximum(1.0, np.abs(scaled))
+
+
+def _round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    This function rounds the values to 2 decimals with the same results as Python round.
+    :param values: Values to round
+    :return: Rounded values
+    """
+    rounded = np.round(values, 2)
+    for index in np.flatnonzero(_is_half_cent(values)):
+        rounded[index] = round(float(values[index]), 2)
+    return rounded
+
+
+def _is_unchecked_amount(value: Any) -> bool:
+    """
+    This function checks if an amount cannot be checked in the columnar arrays.
+    :param value: Amount, nulls are already replaced with zero
+    :return: If the amount is not a number or is too large for float64 it returns True, otherwise it returns False
+    """
+    return type(value) not in _NUMBER_TYPES or abs(value) >= _MAX_EXACT_INTEGER
+
+
+def _amount_column(values: List[Any]) -> Tuple[np.ndarray, np.ndarray | None]:
+    """
+    This function converts amounts to a float64 column. Amounts that are not numbers are zero in the column, they are
+    checked by the invoice validator instead.
+    :param values: Amounts, nulls are already replaced with zero
+    :return: Column of the amounts, and the mask of the amounts that are not in the column (None if all are)
+    """
+    if _NUMBER_TYPES.issuperset(map(type, values)):
+        try:
+            column = np.array(values, dtype=np.float64)
+            unchecked = np.abs(column) >= _MAX_EXACT_INTEGER
+            return column, unchecked if unchecked.any() else None
+        except OverflowError:
+            # Integers out of the float64 range are left out below
+            pass
+    unchecked = np.fromiter(map(_is_unchecked_amount, values), dtype=bool, count=len(values))
+    column = np.array([0 if is_unchecked else value for value, is_unchecked in zip(values, unchecked)],
+                      dtype=np.float64)
+    return column, unchecked
+
+
+class BatchInvoiceValidator:
+    def __init__(self, invoices: List[Dict], ground_truth_po_numbers: Optional[List[Optional[List[str]]]] = None):
+        """
+        Validates many analyzed invoices at once. Line items of every invoice are flattened into columnar arrays, line
+        totals, subtotals and VAT amounts are checked with vectorized operations, then issue reports are created only
+        for the inconsistent items and invoices. Reports are the same as the reports of InvoiceValidator, an invoice
+        validator is created only for the invoices whose fields cannot be put in the columns.
+        :param invoices: Analyzed invoices
+        :param ground_truth_po_numbers: (Optional) Ground truth PO numbers of each invoice
+        """
+        self.invoices = invoices
+        self.ground_truth_po_numbers = ground_truth_po_numbers or [None] * len(invoices)
+        self._validators: Dict[int, InvoiceValidator] = {}
+        self._columns = None
+        self._line_item_issues = None
+        self._total_consistency = None
+
+    def _validator(self, invoice_index: int) -> InvoiceValidator:
+        """
+        This function returns the invoice validator of an invoice, it is created at the first use.
+        :param invoice_index: Index of the invoice
+        :return: Invoice validator of the invoice
+        """
+        validator = self._validators.get(invoice_index)
+        if validator is None:
+            validator = InvoiceValidator(self.invoices[invoice_index], self.ground_truth_po_numbers[invoice_index])
+            self._validators[invoice_index] = validator
+        return validator
+
+    def _flatten(self) -> Dict[str, Any]:
+        """
+        This function flattens the line items of every invoice into columns once. Line items of an invoice are a
+        contiguous slice of the columns that starts at the offset of the invoice. Invoices with fields that are not
+        numbers (or not objects) are marked as fallback, they are checked by their invoice validator.
+        :return: Columns of the line items (quantity, unit_price, total_price, po_number), offsets and item counts of
+                 the invoices, their line item lists and totals, and the fallback mask
+        """
+        if self._columns is not None:
+            return self._columns
+
+        invoice_count = len(self.invoices)
+        line_items_lists = [invoice.get("line_items", []) for invoice in self.invoices]
+        total_details_list = [invoice.get("total_details", {}) for invoice in self.invoices]
+        invoice_details_list = [invoice.get("invoice_details", {}) for invoice in self.invoices]
+
+        # Invoices with unexpected structures are left out of the columns
+        fallback = np.zeros(invoice_count, dtype=bool)
+        for values, expected_type in ((line_items_lists, list), (total_details_list, dict),
+                                      (invoice_details_list, dict)):
+            if {expected_type} != set(map(type, values)) and values:
+                fallback |= np.fromiter((type(value) is not expected_type for value in values), dtype=bool,
+                                        count=invoice_count)
+        if fallback.any():
+            line_items_lists = [[] if is_fallback else line_items for line_items, is_fallback
+                                in zip(line_items_lists, fallback)]
+            total_details_list = [{} if is_fallback else total_details for total_details, is_fallback
+                                  in zip(total_details_list, fallback)]
+            invoice_details_list = [{} if is_fallback else invoice_details for invoice_details, is_fallback
+                                    in zip(invoice_details_list, fallback)]
+
+        counts = np.fromiter(map(len, line_items_lists), dtype=np.int64, count=invoice_count)
+        offsets = np.cumsum(counts) - counts
+        items = list(chain.from_iterable(line_items_lists))
+        owners = np.repeat(np.arange(invoice_count), counts)
+
+        if {dict} != set(map(type, items)) and items:
+            not_objects = np.fromiter((type(item) is not dict for item in items), dtype=bool, count=len(items))
+            fallback[owners[not_objects]] = True
+            items = [{} if not_object else item for item, not_object in zip(items, not_objects)]
+
+        # Fields that are not found are null in the analyzed data
+        columns = {}
+        for field in ("quantity", "unit_price", "total_price"):
+            columns[field], unchecked = _amount_column([item.get(field) or 0 for item in items])
+            if unchecked is not None:
+                fallback[owners[unchecked]] = True
+        columns["po_number"] = [item.get("po_number") for item in items]
+        if not _PO_NUMBER_TYPES.issuperset(map(type, columns["po_number"])):
+            unchecked = np.fromiter((type(po) not in _PO_NUMBER_TYPES for po in columns["po_number"]), dtype=bool,
+                                    count=len(items))
+            fallback[owners[unchecked]] = True
+
+        invoice_pos = [invoice_details.get("po_number") for invoice_details in invoice_details_list]
+        if not _PO_NUMBER_TYPES.issuperset(map(type, invoice_pos)):
+            fallback |= np.fromiter((type(po) not in _PO_NUMBER_TYPES for po in invoice_pos), dtype=bool,
+                                    count=invoice_count)
+
+        columns.update({
+            "owner": owners,
+            "offset": offsets,
+            "count": counts,
+            "line_items": line_items_lists,
+            "total_details": total_details_list,
+            "invoice_po": invoice_pos,
+            "fallback": fallback,
+        })
+        self._columns = columns
+        return columns
+
+    def check_line_item_consistency(self) -> List[List[Dict]]:
+        """
+        This function compares the total price of every line item with its quantity multiplied by its unit price.
+        :return: Line item consistency report list of each invoice
+        """
+        if self._line_item_issues is not None:
+            return self._line_item_issues
+
+        columns = self._flatten()
+        fallback = columns["fallback"]
+        reports: List[List[Dict]] = [[] for _ in self.invoices]
+        products = columns["quantity"] * columns["unit_price"]
+        expected_totals = _round_cents(products)
+        actual_totals = _round_cents(columns["total_price"])
+        # Products of large integers are exact in Python but not in float64, they are checked again
+        suspicious = (expected_totals != actual_totals) | (np.abs(products) >= _MAX_EXACT_INTEGER)
+        suspicious &= ~fallback[columns["owner"]]
+
+        # Items are in the order of the invoices and their line items, so the reports keep the same order
+        for position in np.flatnonzero(suspicious):
+            invoice_index = int(columns["owner"][position])
+            index = int(position - columns["offset"][invoice_index])
+            inconsistency = InvoiceValidator.check_line_item(index, columns["line_items"][invoice_index][index])
+            if inconsistency is not None:
+                reports[invoice_index].append(inconsistency)
+
+        for invoice_index in np.flatnonzero(fallback):
+            reports[invoice_index] = self._validator(invoice_index).check_line_item_consistency()
+
+        self._line_item_issues = reports
+        return reports
+
+    def check_total_consistency(self) -> List[Dict]:
+        """
+        This function compares the subtotal and the VAT amount of every invoice with the sum of its line totals.
+        :return: Total consistency report dictionary of each invoice
+        """
+        if self._total_consistency is not None:
+            return self._total_consistency
+
+        columns = self._flatten()
+        fallback = columns["fallback"].copy()
+        total_details_list = columns["total_details"]
+
+        # Line totals of each invoice are summed over its slice of the column
+        line_total_sums = np.zeros(len(self.invoices))
+        has_items = columns["count"] > 0
+        if has_items.any():
+            line_total_sums[has_items] = np.add.reduceat(columns["total_price"], columns["offset"][has_items])
+        expected_subtotals = np.round(line_total_sums, 2)
+        # Sums of NumPy and Python can differ in the last bits, the sum itself is calculated again with Python
+        for invoice_index in np.flatnonzero(_is_half_cent(line_total_sums) & ~fallback):
+            expected_subtotals[invoice_index] = round(sum(item.get("total_price") or 0 for item in
+                                                          columns["line_items"][invoice_index]), 2)
+
+        subtotals, unchecked = _amount_column([total_details.get("subtotal") or 0.0
+                                               for total_details in total_details_list])
+        if unchecked is not None:
+            fallback |= unchecked
+        vat_keys = [_vat_key(tuple(total_details)) for total_details in total_details_list]
+        vat_amounts, unchecked = _amount_column([total_details.get(vat_key) or 0.0 if vat_key else 0.0
+                                                 for total_details, vat_key in zip(total_details_list, vat_keys)])
+        if unchecked is not None:
+            fallback |= unchecked
+        has_vat = np.fromiter((vat_key is not None for vat_key in vat_keys), dtype=bool, count=len(vat_keys))
+        vat_rates = np.fromiter((_vat_rate(vat_key) if vat_key else 0.0 for vat_key in vat_keys), dtype=np.float64,
+                                count=len(vat_keys))
+
+        subtotal_mismatch = expected_subtotals != _round_cents(subtotals)
+        vat_mismatch = has_vat & (_round_cents(expected_subtotals * vat_rates) != _round_cents(vat_amounts))
+
+        reports = [{"subtotal_correct": True, "vat_correct": True, "total_correct": True, "issues": []}
+                   for _ in self.invoices]
+        # Issues are reported with the exact values of the invoice validator
+        for invoice_index in np.flatnonzero(fallback | subtotal_mismatch | vat_mismatch):
+            reports[invoice_index] = self._validator(invoice_index).check_total_consistency()
+
+        self._total_consistency = reports
+        return reports
+
+    def generate_reports(self, filenames: List[str]) -> List[Dict]:
+        """
+        This function creates the complete report of every invoice with the batch arithmetic checks. Price accuracy
+        and PO reports are created from the columns, without an invoice validator for each invoice.
+        :param filenames: Filename of each invoice
+        :return: General report of each invoice, like InvoiceValidator.generate_report
+        """
+        line_item_issues = self.check_line_item_consistency()
+        total_consistency = self.check_total_consistency()
+        columns = self._columns
+        report_timestamp = datetime.now().isoformat()
+
+        # Python values are read faster than NumPy scalars in the loop
+        fallback = columns["fallback"].tolist()
+        offsets = columns["offset"].tolist()
+        counts = columns["count"].tolist()
+
+        reports = []
+        for invoice_index, (invoice, filename) in enumerate(zip(self.invoices, filenames)):
+            if fallback[invoice_index]:
+                reports.append(self._validator(invoice_index).generate_report(
+                    filename, line_item_issues[invoice_index], total_consistency[invoice_index]))
+                continue
+
+            offset = offsets[invoice_index]
+            line_po_numbers = columns["po_number"][offset:offset + counts[invoice_index]]
+            invoice_po = columns["invoice_po"][invoice_index]
+            price_accuracy = InvoiceValidator.price_accuracy_report(len(line_po_numbers),
+                                                                    len(line_item_issues[invoice_index]),
+                                                                    total_consistency[invoice_index])
+            po_detection = InvoiceValidator.po_detection_report(invoice_po, line_po_numbers,
+                                                                self.ground_truth_po_numbers[invoice_index] or [])
+            po_presence = InvoiceValidator.po_presence_report(invoice_po, line_po_numbers)
+            reports.append(InvoiceValidator.build_report(invoice, filename, report_timestamp,
+                                                         line_item_issues[invoice_index],
+                                                         total_consistency[invoice_index], price_accuracy,
+                                                         po_detection, po_presence))
+        return reports
@@ -1,14 +1,12 @@
 from validators.abstracts.validator import Validator
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, List, Tuple
 import json
 from datetime import datetime
 
 
 class InvoiceValidator(Validator):
-    def __init__(self, invoice_data: Dict, ground_truth_po_numbers: Optional[List[str]] = None):
-        super().__init__(invoice_data, ground_truth_po_numbers)
-        self.price_accuracy_threshold = 95.0  # Case requirement: >95%
-        self.po_accuracy_threshold = 90.0  # Case requirement: >90%
+    price_accuracy_threshold = 95.0  # Case requirement: >95%
+    po_accuracy_threshold = 90.0  # Case requirement: >90%
 
     def check_line_item_consistency(self) -> List[Dict]:
         """
@@ -19,28 +17,42 @@ class InvoiceValidator(Validator):
         """
         inconsistencies = []
         for i, item in enumerate(self.line_items):
-            quantity = item.get("quantity", 0)
-            unit_price = item.get("unit_price", 0)
-            total_price = item.get("total_price", 0)
-
-            expected_total = round(quantity * unit_price, 2)
-            actual_total = round(total_price, 2)
-
-            if expected_total != actual_total:
-                deviation_percent = abs(expected_total - actual_total) / max(expected_total, 0.01) * 100
-                inconsistencies.append({
-                    "index": i,
-                    "item_name": item.get("item_name", "Unknown"),
-                    "quantity": quantity,
-                    "unit_price": unit_price,
-                    "expected_total": expected_total,
-                    "actual_total": actual_total,
-                    "deviation_amount": round(abs(expected_total - actual_total), 2),
-                    "deviation_percent": round(deviation_percent, 2),
-                    "severity": "high" if deviation_percent > 5 else "low"
-                })
+            inconsistency = self.check_line_item(i, item)
+            if inconsistency is not None:
+                inconsistencies.append(inconsistency)
         return inconsistencies
 
+    @staticmethod
+    def check_line_item(index: int, item: Dict) -> Dict | None:
+        """
+        This function compares the total price of a line item with its quantity multiplied by its unit price.
+        :param index: Index of the line item in the invoice
+        :param item: Line item
+        :return: Consistency report of the line item, None if the line item is consistent
+        """
+        # Fields that are not found are null in the analyzed data
+        quantity = item.get("quantity") or 0
+        unit_price = item.get("unit_price") or 0
+        total_price = item.get("total_price") or 0
+
+        expected_total = round(quantity * unit_price, 2)
+        actual_total = round(total_price, 2)
+
+        if expected_total == actual_total:
+            return None
+        deviation_percent = abs(expected_total - actual_total) / max(expected_total, 0.01) * 100
+        return {
+            "index": index,
+            "item_name": item.get("item_name", "Unknown"),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "expected_total": expected_total,
+            "actual_total": actual_total,
+            "deviation_amount": round(abs(expected_total - actual_total), 2),
+            "deviation_percent": round(deviation_percent, 2),
+            "severity": "high" if deviation_percent > 5 else "low"
+        }
+
     def check_total_consistency(self) -> Dict:
         """
         This function adds up the total value of all line items, then compares it with the value in the file.
@@ -54,8 +66,8 @@ class InvoiceValidator(Validator):
         }
 
         # Subtotal control
-        expected_subtotal = round(sum(item.get("total_price", 0) for item in self.line_items), 2)
-        actual_subtotal = round(self.total_details.get("subtotal", 0.0), 2)
+        expected_subtotal = round(sum(item.get("total_price") or 0 for item in self.line_items), 2)
+        actual_subtotal = round(self.total_details.get("subtotal") or 0.0, 2)
 
         if expected_subtotal != actual_subtotal:
             results["subtotal_correct"] = False
@@ -76,7 +88,7 @@ class InvoiceValidator(Validator):
             vat_rate = float(vat_rate_match.group(1)) / 100 if vat_rate_match else 0.20
 
             expected_vat = round(expected_subtotal * vat_rate, 2)
-            actual_vat = round(self.total_details.get(vat_key, 0.0), 2)
+            actual_vat = round(self.total_details.get(vat_key) or 0.0, 2)
 
             # Comparing VAT values
             if expected_vat != actual_vat:
@@ -92,16 +104,30 @@ class InvoiceValidator(Validator):
 
         return results
 
-    def calculate_price_accuracy(self) -> Dict:
+    def calculate_price_accuracy(self, line_inconsistencies: List[Dict] | None = None,
+                                 total_consistency: Dict | None = None) -> Dict:
         """
         This function calculates price accuracy by summing up all the line totals.
+        :param line_inconsistencies: (Optional) Result of check_line_item_consistency, it is calculated if not given
+        :param total_consistency: (Optional) Result of check_total_consistency, it is calculated if not given
         :return: Price accuracy report dictionary
         """
-        line_inconsistencies = self.check_line_item_consistency()
-        total_consistency = self.check_total_consistency()
-
-        total_items = len(self.line_items)
-        correct_line_items = total_items - len(line_inconsistencies)
+        if line_inconsistencies is None:
+            line_inconsistencies = self.check_line_item_consistency()
+        if total_consistency is None:
+            total_consistency = self.check_total_consistency()
+        return self.price_accuracy_report(len(self.line_items), len(line_inconsistencies), total_consistency)
+
+    @classmethod
+    def price_accuracy_report(cls, total_items: int, inconsistent_items: int, total_consistency: Dict) -> Dict:
+        """
+        This function calculates price accuracy from the results of the arithmetic checks of an invoice.
+        :param total_items: Number of line items
+        :param inconsistent_items: Number of inconsistent line items
+        :param total_consistency: Result of check_total_consistency
+        :return: Price accuracy report dictionary
+        """
+        correct_line_items = total_items - inconsistent_items
 
         line_accuracy = (correct_line_items / max(total_items, 1)) * 100
         total_checks = 3  # subtotal, VAT and total
@@ -119,26 +145,42 @@ class InvoiceValidator(Validator):
             "line_item_accuracy": round(line_accuracy, 2),
             "total_calculation_accuracy": round(total_accuracy, 2),
             "overall_price_accuracy": round(overall_accuracy, 2),
-            "meets_requirement": overall_accuracy >= self.price_accuracy_threshold,
-            "threshold": self.price_accuracy_threshold,
+            "meets_requirement": overall_accuracy >= cls.price_accuracy_threshold,
+            "threshold": cls.price_accuracy_threshold,
         }
 
+    def _po_numbers(self) -> Tuple[str | None, List[str | None]]:
+        """
+        This function returns the PO numbers of the invoice.
+        :return: Invoice level PO number and the PO number of each line item (None if it is not found)
+        """
+        return (self.invoice_data.get("invoice_details", {}).get("po_number"),
+                [item.get("po_number") for item in self.line_items])
+
     def report_missing_po_numbers(self) -> Dict:
         """
         This function reports missing PO numbers from the line items.
         :return: Missing PO numbers report dictionary
         """
-        po_in_invoice = self.invoice_data.get("invoice_details", {}).get("po_number")
-        po_in_lines = [item.get("po_number") for item in self.line_items if item.get("po_number")]
+        return self.po_presence_report(*self._po_numbers())
+
+    @staticmethod
+    def po_presence_report(po_in_invoice: str | None, line_po_numbers: List[str | None]) -> Dict:
+        """
+        This function reports missing PO numbers of an invoice.
+        :param po_in_invoice: Invoice level PO number
+        :param line_po_numbers: PO number of each line item
+        :return: Missing PO numbers report dictionary
+        """
+        po_in_lines = [po for po in line_po_numbers if po]
 
         missing_count = 0
-        total_locations = 1 + len(self.line_items)  # invoice + line items
+        total_locations = 1 + len(line_po_numbers)  # invoice + line items
 
         if not po_in_invoice or po_in_invoice in (None, "", "null"):
             missing_count += 1
 
-        missing_count += sum(1 for item in self.line_items
-                             if not item.get("po_number") or item.get("po_number") in (None, "", "null"))
+        missing_count += sum(1 for po in line_po_numbers if not po or po in (None, "", "null"))
 
         return {
             "po_number_status": "missing" if missing_count == total_locations else "partial" if missing_count > 0 else "complete",
@@ -156,31 +198,38 @@ class InvoiceValidator(Validator):
         This function calculates PO detection accuracy by using ground truth PO numbers given.
         :return: PO detection report dictionary
         """
+        return self.po_detection_report(*self._po_numbers(), self.ground_truth_po_numbers)
+
+    @classmethod
+    def po_detection_report(cls, invoice_po: str | None, line_po_numbers: List[str | None],
+                            ground_truth_po_numbers: List[str]) -> Dict:
+        """
+        This function calculates PO detection accuracy of an invoice by using ground truth PO numbers given.
+        :param invoice_po: Invoice level PO number
+        :param line_po_numbers: PO number of each line item
+        :param ground_truth_po_numbers: Ground truth PO numbers of the invoice
+        :return: PO detection report dictionary
+        """
         detected_pos = []
 
         # Invoice level PO
-        invoice_po = self.invoice_data.get("invoice_details", {}).get("po_number")
         if invoice_po and invoice_po not in (None, "", "null"):
             detected_pos.append(invoice_po)
 
         # Line item level POs
-        line_pos = [
-            item["po_number"]
-            for item in self.line_items
-            if item.get("po_number") not in (None, "", "null")
-        ]
+        line_pos = [po for po in line_po_numbers if po not in (None, "", "null")]
         detected_pos.extend(line_pos)
 
         # Getting unique POs
         detected_pos = list(set(detected_pos))
 
-        if not self.ground_truth_po_numbers or len(self.ground_truth_po_numbers) == 0:
+        if not ground_truth_po_numbers or len(ground_truth_po_numbers) == 0:
             # If there is no ground truth, that means there is 100% accuracy for POs
             if len(detected_pos) == 0:
                 return {
                     "po_accuracy": 100.0,
                     "meets_requirement": True,
-                    "threshold": self.po_accuracy_threshold,
+                    "threshold": cls.po_accuracy_threshold,
                     "scenario": "no_po_expected_none_detected",
                     "note": "No PO numbers expected (ground truth empty) and none detected - Perfect match",
                     "ground_truth_count": 0,
@@ -191,7 +240,7 @@ class InvoiceValidator(Validator):
                 return {
                     "po_accuracy": 0.0,
                     "meets_requirement": False,
-                    "threshold": self.po_accuracy_threshold,
+                    "threshold": cls.po_accuracy_threshold,
                     "scenario": "no_po_expected_but_detected",
                     "note": f"No PO numbers expected but {len(detected_pos)} were detected - False positives",
                     "ground_truth_count": 0,
@@ -199,27 +248,27 @@ class InvoiceValidator(Validator):
                     "false_detections": detected_pos
                 }
 
-        correct_detections = [po for po in detected_pos if po in self.ground_truth_po_numbers]
+        correct_detections = [po for po in detected_pos if po in ground_truth_po_numbers]
 
-        missed_pos = [po for po in self.ground_truth_po_numbers if po not in detected_pos]
+        missed_pos = [po for po in ground_truth_po_numbers if po not in detected_pos]
 
         # Incorrectly detected POs
-        false_detections = [po for po in detected_pos if po not in self.ground_truth_po_numbers]
+        false_detections = [po for po in detected_pos if po not in ground_truth_po_numbers]
 
-        accuracy = (len(correct_detections) / len(self.ground_truth_po_numbers)) * 100
+        accuracy = (len(correct_detections) / len(ground_truth_po_numbers)) * 100
 
         return {
             "po_accuracy": round(accuracy, 2),
-            "meets_requirement": accuracy >= self.po_accuracy_threshold,
-            "threshold": self.po_accuracy_threshold,
+            "meets_requirement": accuracy >= cls.po_accuracy_threshold,
+            "threshold": cls.po_accuracy_threshold,
             "scenario": "normal_po_detection",
-            "ground_truth_count": len(self.ground_truth_po_numbers),
+            "ground_truth_count": len(ground_truth_po_numbers),
             "detected_count": len(detected_pos),
             "correct_detections": len(correct_detections),
             "missed_pos": missed_pos,
             "false_detections": false_detections,
             "details": {
-                "ground_truth": self.ground_truth_po_numbers,
+                "ground_truth": ground_truth_po_numbers,
                 "detected": detected_pos,
                 "correct": correct_detections
             }
@@ -245,21 +294,44 @@ class InvoiceValidator(Validator):
 
         return max(0, int(score))
 
-    def generate_report(self, filename: str) -> Dict:
+    def generate_report(self, filename: str, line_item_issues: List[Dict] | None = None,
+                        total_consistency: Dict | None = None) -> Dict:
         """
         This function combines other validator and report generator functions to get the complete report of the file.
         :param filename: Filename to generate report
+        :param line_item_issues: (Optional) Result of check_line_item_consistency, e.g. from the batch validator. It is
+                                 calculated if not given
+        :param total_consistency: (Optional) Result of check_total_consistency, it is calculated if not given
         :return: General report of the file
         """
         report_timestamp = datetime.now().isoformat()
 
-        # Basic control results
-        line_item_issues = self.check_line_item_consistency()
-        total_consistency = self.check_total_consistency()
-        price_accuracy = self.calculate_price_accuracy()
+        # Basic control results, arithmetic checks are calculated once and shared with the price accuracy
+        if line_item_issues is None:
+            line_item_issues = self.check_line_item_consistency()
+        if total_consistency is None:
+            total_consistency = self.check_total_consistency()
+        price_accuracy = self.calculate_price_accuracy(line_item_issues, total_consistency)
         po_detection = self.calculate_po_detection_accuracy()
         po_presence = self.report_missing_po_numbers()
+        return self.build_report(self.invoice_data, filename, report_timestamp, line_item_issues, total_consistency,
+                                 price_accuracy, po_detection, po_presence)
 
+    @staticmethod
+    def build_report(invoice_data: Dict, filename: str, report_timestamp: str, line_item_issues: List[Dict],
+                     total_consistency: Dict, price_accuracy: Dict, po_detection: Dict, po_presence: Dict) -> Dict:
+        """
+        This function adds the results of the checks of an invoice to a copy of the invoice as its report.
+        :param invoice_data: Analyzed invoice
+        :param filename: Filename of the invoice
+        :param report_timestamp: Time of the validation in ISO format
+        :param line_item_issues: Result of check_line_item_consistency
+        :param total_consistency: Result of check_total_consistency
+        :param price_accuracy: Result of calculate_price_accuracy
+        :param po_detection: Result of calculate_po_detection_accuracy
+        :param po_presence: Result of report_missing_po_numbers
+        :return: General report of the file
+        """
         # Report structure
         validation_report = {
             "metadata": {
@@ -282,7 +354,7 @@ class InvoiceValidator(Validator):
         }
 
         # Adding report to original invoice data
-        enriched_data = self.invoice_data.copy()
+        enriched_data = invoice_data.copy()
         enriched_data["validation_report"] = validation_report
 
         return enriched_data